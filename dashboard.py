@@ -2,7 +2,9 @@
 
 import json
 import os
+import sqlite3
 import subprocess
+import sys
 import time
 from datetime import datetime, timezone
 from pathlib import Path
@@ -12,12 +14,16 @@ from flask import Flask, jsonify, render_template, request
 app = Flask(__name__)
 
 BASE_DIR = Path(__file__).parent
-DECISIONS_LOG = BASE_DIR / "workspace" / "logs" / "decisions.jsonl"
 TRADES_CSV = BASE_DIR / "logs" / "trades.csv"
 SESSIONS_DIR = BASE_DIR / "openclaw-config" / "agents" / "main" / "sessions"
 CRON_RUNS_DIR = BASE_DIR / "openclaw-config" / "cron" / "runs"
 GATEWAY_CONTAINER = "autotrader-gateway"
 
+sys.path.insert(0, str(BASE_DIR / "workspace"))
+from lib import state_store  # noqa: E402
+from lib.decisions import load_recent_decisions  # noqa: E402
+from lib.sim_portfolio import get_trades as sim_get_trades, trade_count as sim_trade_count  # noqa: E402
+
 
 @app.route("/")
 def index():
@@ -26,16 +32,17 @@ def index():
 
 @app.route("/api/decisions")
 def api_decisions():
-    """Return recent trading decisions from decisions.jsonl."""
-    decisions = []
-    if DECISIONS_LOG.exists():
-        lines = DECISIONS_LOG.read_text(encoding="utf-8").strip().splitlines()
-        for line in reversed(lines[-100:]):
-            try:
-                decisions.append(json.loads(line))
-            except json.JSONDecodeError:
-                pass
-    return jsonify(decisions)
+    """Return the 100 most recent trading decisions (newest first, tail read)."""
+    return jsonify(list(reversed(load_recent_decisions(limit=100))))
+
+
+@app.route("/api/state")
+def api_state():
+    """Return scan state (cooldown, half-sold, peaks, message IDs) from one snapshot of state.sqlite."""
+    try:
+        return jsonify(state_store.snapshot())
+    except sqlite3.Error as e:
+        return jsonify({"error": str(e)}), 500
 
 
 @app.route("/api/cycles")
@@ -287,6 +294,8 @@ def api_sim():
         sim_data = json.loads(sim_file.read_text(encoding="utf-8"))
     except (json.JSONDecodeError, OSError) as e:
         return jsonify({"error": str(e)}), 500
+    # Files not yet migrated by a scan still carry the history inline
+    recent_trades = sim_data.get("trades", [])[-20:] or sim_get_trades(20)
 
     positions = sim_data.get("positions", {})
     if not positions:
@@ -304,7 +313,7 @@ def api_sim():
             "positions": [],
             "position_count": 0,
             "exposure_pct": 0,
-            "trades": sim_data.get("trades", [])[-20:],
+            "trades": recent_trades,
         })
 
     try:
@@ -358,7 +367,20 @@ def api_sim():
         "positions": sorted(holdings, key=lambda x: -x["market_value"]),
         "position_count": len(holdings),
         "exposure_pct": round(total_mv / equity * 100, 1) if equity > 0 else 0,
-        "trades": sim_data.get("trades", [])[-20:],
+        "trades": recent_trades,
+    })
+
+
+@app.route("/api/sim/trades")
+def api_sim_trades():
+    """Page through the sim trade ledger, newest page first (?limit=50&offset=0)."""
+    limit = min(max(request.args.get("limit", 50, type=int), 1), 500)
+    offset = max(request.args.get("offset", 0, type=int), 0)
+    return jsonify({
+        "total": sim_trade_count(),
+        "limit": limit,
+        "offset": offset,
+        "trades": sim_get_trades(limit, offset),
     })
 
 
@@ -1,23 +1,77 @@
-"""In-process Alpaca client with retries and structured logging."""
+"""In-process Alpaca client with retries and structured logging.
+
+alpaca-py is imported inside the functions that use it, so importing this
+module (and the scan entrypoint) stays cheap until a call actually goes out.
+"""
+import json
 import logging
 import os
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager, nullcontext
 from datetime import datetime, timedelta
 
-from alpaca.trading.client import TradingClient
-from alpaca.trading.requests import MarketOrderRequest, GetPortfolioHistoryRequest, GetOrdersRequest
-from alpaca.trading.enums import OrderSide, TimeInForce, QueryOrderStatus
-from alpaca.data.historical import StockHistoricalDataClient
-from alpaca.data.requests import StockBarsRequest, StockSnapshotRequest
-from alpaca.data.timeframe import TimeFrame
+from .config import LOGS_DIR
+from .retry import RetryBudget, RetryPolicy, is_retryable
 
 logger = logging.getLogger("autotrader")
 
-# Retry config
+# Retry config: transient errors only (lib.retry), exponential backoff with jitter
 MAX_ATTEMPTS = 3
-RETRY_DELAY_SEC = 2.0
+RETRY_BASE_DELAY_SEC = 0.5
+RETRY_MAX_DELAY_SEC = 8.0
+# Total retry sleep allowed per scan cycle (reset by reset_retry_budget)
+CYCLE_RETRY_BUDGET_SEC = 20.0
+
+# Broker circuit: open after this many consecutive failed calls (transient errors
+# that survived retries); stay open this long before a half-open trial
+BROKER_CIRCUIT_FILE = LOGS_DIR / "broker_circuit.json"
+CIRCUIT_FAILURE_THRESHOLD = 3
+CIRCUIT_OPEN_SEC = 120
+
+# Rate limiting: Alpaca allows 200 requests/min per account; stay under it
+RATE_LIMIT_PER_MIN = 180
+# Concurrent bar requests in get_bars_many
+BARS_MAX_WORKERS = 4
+# OrderBatch: concurrent submits, then fill polling (one get_orders call per poll)
+ORDER_MAX_WORKERS = 4
+FILL_POLL_SEC = 0.5
+FILL_TIMEOUT_SEC = 5.0
+TERMINAL_ORDER_STATUSES = {"filled", "canceled", "expired", "rejected", "done_for_day",
+                           "replaced"}
+
+
+class _RateLimiter:
+    """Thread-safe token bucket shared by every API call in this process."""
+
+    def __init__(self, per_minute):
+        self.capacity = float(per_minute)
+        self.tokens = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+_rate_limiter = _RateLimiter(RATE_LIMIT_PER_MIN)
+
 
 def _get_clients():
+    from alpaca.data.historical import StockHistoricalDataClient
+    from alpaca.trading.client import TradingClient
+
     api_key = os.environ.get("ALPACA_API_KEY")
     secret = os.environ.get("ALPACA_SECRET_KEY")
     paper = os.environ.get("ALPACA_PAPER_TRADE", "True").lower() in ("true", "1", "yes")
@@ -28,34 +82,159 @@ def _get_clients():
     return trading, data
 
 
-def _retry(fn, *args, **kwargs):
-    last_err = None
-    for attempt in range(1, MAX_ATTEMPTS + 1):
+retry_policy = RetryPolicy(max_attempts=MAX_ATTEMPTS, base_delay=RETRY_BASE_DELAY_SEC,
+                           max_delay=RETRY_MAX_DELAY_SEC,
+                           budget=RetryBudget(CYCLE_RETRY_BUDGET_SEC))
+
+
+class BrokerUnavailable(RuntimeError):
+    """Raised instead of calling the broker while the broker circuit is open."""
+
+
+class BrokerCircuit:
+    """Closed / open / half-open breaker over every broker call, persisted across runs.
+
+    closed: calls pass; consecutive transient failures are counted.
+    open: after CIRCUIT_FAILURE_THRESHOLD failures. Non-essential calls raise
+    BrokerUnavailable at once; essential ones (essential_calls()) get one attempt.
+    half_open: after CIRCUIT_OPEN_SEC. Calls pass as a trial; a success closes
+    the circuit, a transient failure re-opens it.
+    Not to be confused with the scan's daily-drawdown circuit breaker.
+    """
+
+    def __init__(self, path=BROKER_CIRCUIT_FILE, threshold=CIRCUIT_FAILURE_THRESHOLD,
+                 open_sec=CIRCUIT_OPEN_SEC):
+        self.path = path
+        self.threshold = threshold
+        self.open_sec = open_sec
+        self._lock = threading.Lock()
+        self._data = {"state": "closed", "failures": 0, "opened_at": None, "last_error": None}
+        self.load()
+
+    def load(self):
+        """Re-read persisted state (another run may have tripped or closed it)."""
         try:
-            return fn(*args, **kwargs)
-        except Exception as e:
-            last_err = e
-            logger.warning("Attempt %s/%s failed: %s", attempt, MAX_ATTEMPTS, e)
-            if attempt < MAX_ATTEMPTS:
-                time.sleep(RETRY_DELAY_SEC)
-    raise last_err
+            data = json.loads(self.path.read_text())
+        except (OSError, ValueError):
+            return self
+        with self._lock:
+            self._data.update({k: data.get(k, v) for k, v in self._data.items()})
+        return self
+
+    def _save(self):
+        try:
+            LOGS_DIR.mkdir(parents=True, exist_ok=True)
+            self.path.write_text(json.dumps(self._data))
+        except OSError as e:
+            logger.warning("Could not persist broker circuit: %s", e)
+
+    @property
+    def state(self):
+        with self._lock:
+            data = self._data
+            if (data["state"] == "open" and data["opened_at"]
+                    and time.time() - data["opened_at"] >= self.open_sec):
+                return "half_open"
+            return data["state"]
+
+    @property
+    def opened_at(self):
+        return self._data["opened_at"]
+
+    @property
+    def last_error(self):
+        return self._data["last_error"]
+
+    def allow(self, essential=False):
+        return essential or self.state != "open"
+
+    def record_success(self):
+        with self._lock:
+            if self._data["state"] == "closed" and not self._data["failures"]:
+                return
+            if self._data["state"] != "closed":
+                logger.info("Broker circuit closed")
+            self._data.update(state="closed", failures=0, opened_at=None, last_error=None)
+            self._save()
+
+    def record_failure(self, exc):
+        with self._lock:
+            self._data["failures"] += 1
+            self._data["last_error"] = str(exc)[:200]
+            was_open = self._data["state"] == "open"
+            if was_open or self._data["failures"] >= self.threshold:
+                # Tripping, or a failed half-open trial: (re)start the open window
+                self._data.update(state="open", opened_at=time.time())
+                logger.warning("Broker circuit OPEN after %d failures: %s",
+                               self._data["failures"], exc)
+            self._save()
+
+
+broker_circuit = BrokerCircuit()
+_call_scope = threading.local()
+
+
+@contextmanager
+def essential_calls():
+    """Mark broker calls made in this block (this thread) as essential.
+
+    Essential calls — the snapshot, stop-loss / trailing-stop sells and stream
+    exits — still go out while the broker circuit is open, with a single
+    attempt each.
+    """
+    prev = getattr(_call_scope, "essential", False)
+    _call_scope.essential = True
+    try:
+        yield
+    finally:
+        _call_scope.essential = prev
+
+
+def _retry(fn, *args, **kwargs):
+    essential = getattr(_call_scope, "essential", False)
+    state = broker_circuit.state
+    if not broker_circuit.allow(essential):
+        raise BrokerUnavailable(f"broker circuit open: {broker_circuit.last_error}")
+    try:
+        result = retry_policy.call(fn, *args, before_attempt=_rate_limiter.acquire,
+                                   max_attempts=1 if state == "open" else None, **kwargs)
+    except Exception as e:
+        if is_retryable(e):
+            broker_circuit.record_failure(e)
+        raise
+    broker_circuit.record_success()
+    return result
+
+
+def reset_retry_budget():
+    """Start a new cycle: refill the retry-sleep budget and zero the retry metrics."""
+    retry_policy.budget.reset()
+    retry_policy.metrics.reset()
+
+
+def retry_metrics():
+    """Retry counters since the last reset_retry_budget()."""
+    return retry_policy.metrics.snapshot()
 
 
 _trading = None
 _data = None
+_clients_lock = threading.Lock()
 
 
 def _trading_client():
     global _trading, _data
-    if _trading is None:
-        _trading, _data = _get_clients()
+    with _clients_lock:
+        if _trading is None:
+            _trading, _data = _get_clients()
     return _trading
 
 
 def _data_client():
     global _trading, _data
-    if _data is None:
-        _trading, _data = _get_clients()
+    with _clients_lock:
+        if _data is None:
+            _trading, _data = _get_clients()
     return _data
 
 
@@ -72,29 +251,58 @@ def get_account():
     return _retry(_)
 
 
-def get_open_sell_qty_by_symbol():
-    """Return dict of symbol -> total qty in open SELL orders. Used when qty_available is None."""
+def get_open_orders():
+    """Return list of open order dicts: order_id, symbol, side, qty, filled_qty, notional."""
+    from alpaca.trading.enums import OrderSide, QueryOrderStatus
+    from alpaca.trading.requests import GetOrdersRequest
+
     def _():
         req = GetOrdersRequest(status=QueryOrderStatus.OPEN)
         orders = _trading_client().get_orders(req)
-        out = {}
-        for o in orders:
-            if o.side == OrderSide.SELL and o.symbol:
-                sym = o.symbol.upper()
-                try:
-                    qty_val = int(float(o.qty or 0) - float(o.filled_qty or 0))
-                except (TypeError, ValueError):
-                    qty_val = int(o.qty or 0)
-                out[sym] = out.get(sym, 0) + max(0, qty_val)
-        return out
+        return [
+            {
+                "order_id": str(o.id),
+                "symbol": (o.symbol or "").upper(),
+                "side": "sell" if o.side == OrderSide.SELL else "buy",
+                "qty": o.qty,
+                "filled_qty": o.filled_qty,
+                "notional": float(o.notional) if o.notional else None,
+            }
+            for o in orders
+        ]
     return _retry(_)
 
 
-def get_positions():
-    """Return list of position dicts with available_qty (excludes shares held by open orders)."""
+def open_sell_qty_by_symbol(open_orders):
+    """Return dict of symbol -> total unfilled qty in the given open SELL orders."""
+    out = {}
+    for o in open_orders:
+        if o["side"] == "sell" and o["symbol"]:
+            try:
+                qty_val = int(float(o["qty"] or 0) - float(o["filled_qty"] or 0))
+            except (TypeError, ValueError):
+                qty_val = int(o["qty"] or 0)
+            out[o["symbol"]] = out.get(o["symbol"], 0) + max(0, qty_val)
+    return out
+
+
+def get_open_sell_qty_by_symbol():
+    """Return dict of symbol -> total qty in open SELL orders. Used when qty_available is None."""
+    return open_sell_qty_by_symbol(get_open_orders())
+
+
+def get_positions(open_orders=None):
+    """Return list of position dicts with available_qty (excludes shares held by open orders).
+
+    Pass open_orders (from get_open_orders) to reuse an already-fetched order list
+    instead of issuing another get_orders call.
+    """
     def _():
         positions = _trading_client().get_all_positions()
-        sell_qty_by_symbol = get_open_sell_qty_by_symbol()
+        if open_orders is None:
+            sell_qty_by_symbol = get_open_sell_qty_by_symbol()
+        else:
+            sell_qty_by_symbol = open_sell_qty_by_symbol(open_orders)
         result = []
         for p in positions:
             qty = float(p.qty)
@@ -118,13 +326,10 @@ def get_positions():
     return _retry(_)
 
 
-def get_bars(tickers, days=30):
-    """Return dict ticker -> list of bar dicts (date, open, high, low, close, volume). Sorted by date asc."""
-    if not tickers:
-        return {}
-    tickers = [t.strip().upper() for t in tickers]
-    end = datetime.now()
-    start = end - timedelta(days=days)
+def _fetch_bars(tickers, start, end):
+    """Download daily IEX bars for tickers in [start, end] from Alpaca."""
+    from alpaca.data.requests import StockBarsRequest
+    from alpaca.data.timeframe import TimeFrame
 
     def _():
         req = StockBarsRequest(
@@ -166,8 +371,68 @@ def get_bars(tickers, days=30):
     return _retry(_)
 
 
+def get_bars(tickers, days=30, use_cache=True):
+    """Return dict ticker -> list of bar dicts (date, open, high, low, close, volume). Sorted by date asc.
+
+    With use_cache, bars are served from lib.bar_cache and only the trailing days
+    (from each ticker's last cached bar, which may still be open) are downloaded.
+    Tickers whose cache doesn't reach back to the requested start get a full fetch.
+    """
+    if not tickers:
+        return {}
+    tickers = [t.strip().upper() for t in tickers]
+    end = datetime.now()
+    start = end - timedelta(days=days)
+    if not use_cache:
+        return _fetch_bars(tickers, start, end)
+
+    from . import bar_cache
+
+    start_iso = start.strftime("%Y-%m-%dT%H:%M:%S")
+    ranges = bar_cache.cached_ranges(tickers)
+    # Group tickers by fetch start so each distinct start is one request
+    by_start = {}
+    for t in tickers:
+        cov_start, last = ranges.get(t, (None, None))
+        if cov_start is not None and cov_start <= start_iso and last and last[:19] >= start_iso:
+            by_start.setdefault(last[:19], []).append(t)
+        else:
+            by_start.setdefault(None, []).append(t)
+    for fetch_from, group in by_start.items():
+        if fetch_from is None:
+            bar_cache.store(_fetch_bars(group, start, end), coverage_start=start_iso)
+        else:
+            fetched = _fetch_bars(group, datetime.fromisoformat(fetch_from), end)
+            bar_cache.store(fetched)
+    return bar_cache.load(tickers, start_iso)
+
+
+def get_bars_many(groups, days=30, max_workers=BARS_MAX_WORKERS):
+    """Fetch bars for several ticker groups concurrently; return one merged dict.
+
+    Each group is one get_bars request. Requests run on a bounded thread pool and
+    share the process-wide rate limiter. A group that fails after retries is
+    logged and skipped so one bad request doesn't drop the whole watchlist.
+    """
+    groups = [g for g in groups if g]
+    if not groups:
+        return {}
+    result = {}
+    workers = max(1, min(max_workers, len(groups)))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [(g, pool.submit(get_bars, g, days)) for g in groups]
+        for group, fut in futures:
+            try:
+                result.update(fut.result())
+            except Exception as e:
+                logger.error("Bars fetch failed for %s: %s", ",".join(group), e)
+    return result
+
+
 def get_snapshot(ticker):
     """Return dict with latest_trade_price, etc."""
+    from alpaca.data.requests import StockSnapshotRequest
+
     def _():
         req = StockSnapshotRequest(symbol_or_symbols=[ticker.upper()], feed="iex")
         snaps = _data_client().get_stock_snapshot(req)
@@ -184,6 +449,8 @@ def get_snapshot(ticker):
 
 def get_snapshots_batch(tickers):
     """Fetch snapshots for multiple tickers in one request."""
+    from alpaca.data.requests import StockSnapshotRequest
+
     if not tickers:
         return {}
     tickers = [t.strip().upper() for t in tickers]
@@ -205,6 +472,9 @@ def get_snapshots_batch(tickers):
 
 def buy(symbol, qty):
     """Place market buy by share quantity. Return order info dict."""
+    from alpaca.trading.enums import OrderSide, TimeInForce
+    from alpaca.trading.requests import MarketOrderRequest
+
     def _():
         req = MarketOrderRequest(
             symbol=symbol.upper(),
@@ -220,6 +490,9 @@ def buy(symbol, qty):
 
 def buy_notional(symbol, dollar_amount):
     """Place market buy by dollar amount (fractional shares). Return order info dict."""
+    from alpaca.trading.enums import OrderSide, TimeInForce
+    from alpaca.trading.requests import MarketOrderRequest
+
     def _():
         req = MarketOrderRequest(
             symbol=symbol.upper(),
@@ -236,6 +509,9 @@ def buy_notional(symbol, dollar_amount):
 
 def sell(symbol, qty):
     """Place market sell. Return order info dict."""
+    from alpaca.trading.enums import OrderSide, TimeInForce
+    from alpaca.trading.requests import MarketOrderRequest
+
     def _():
         req = MarketOrderRequest(
             symbol=symbol.upper(),
@@ -249,6 +525,122 @@ def sell(symbol, qty):
     return _retry(_)
 
 
+def _order_status(o):
+    status = getattr(o.status, "value", o.status)
+    return {
+        "status": str(status).lower(),
+        "filled_qty": float(o.filled_qty or 0),
+        "filled_avg_price": float(o.filled_avg_price) if o.filled_avg_price else None,
+    }
+
+
+def reconcile_orders(results, timeout=FILL_TIMEOUT_SEC, poll=FILL_POLL_SEC):
+    """Poll submitted orders until all are terminal or timeout; update results in place.
+
+    results: dicts with "order_id" (from OrderBatch.submit / sell / buy_notional).
+    Each poll is a single get_orders request covering every pending order.
+    Adds status, filled_qty, filled_avg_price; entries without an order_id are skipped.
+    """
+    from alpaca.trading.enums import QueryOrderStatus
+    from alpaca.trading.requests import GetOrdersRequest
+
+    pending = {r["order_id"]: r for r in results if r.get("order_id")}
+    if not pending:
+        return results
+    since = datetime.utcnow() - timedelta(minutes=5)
+    deadline = time.monotonic() + timeout
+    while True:
+        req = GetOrdersRequest(status=QueryOrderStatus.ALL, after=since,
+                               symbols=sorted({r["symbol"] for r in pending.values()}),
+                               limit=500)
+        try:
+            orders = _retry(lambda: _trading_client().get_orders(req))
+        except Exception as e:
+            logger.warning("Fill reconcile failed: %s", e)
+            break
+        for o in orders:
+            r = pending.get(str(o.id))
+            if r is None:
+                continue
+            r.update(_order_status(o))
+            if r["status"] in TERMINAL_ORDER_STATUSES:
+                del pending[str(o.id)]
+        if not pending or time.monotonic() >= deadline:
+            break
+        time.sleep(poll)
+    if pending:
+        logger.info("Fill reconcile: %d order(s) still open after %.0fs", len(pending), timeout)
+    return results
+
+
+class OrderBatch:
+    """Queue a cycle's market orders, submit them concurrently, then reconcile fills.
+
+    Each queued order goes through the same retry + rate limiter as sell() /
+    buy_notional(), with up to max_workers submits in flight. submit() returns
+    one result dict per order, in queue order: status "submitted" with order_id,
+    or "error" with the exception text.
+    """
+
+    def __init__(self, max_workers=ORDER_MAX_WORKERS):
+        self.max_workers = max_workers
+        self._queue = []
+        self.results = []
+
+    def sell(self, symbol, qty, essential=False):
+        """Queue a sell; essential ones go out even while the broker circuit is open."""
+        self._queue.append(("sell", symbol, qty, essential))
+
+    def buy_notional(self, symbol, dollar_amount):
+        self._queue.append(("buy", symbol, dollar_amount, False))
+
+    def __len__(self):
+        return len(self._queue)
+
+    @staticmethod
+    def _submit_one(item, essential=False):
+        side, symbol, amount, item_essential = item
+        try:
+            with essential_calls() if essential or item_essential else nullcontext():
+                if side == "sell":
+                    return sell(symbol, amount)
+                return buy_notional(symbol, amount)
+        except Exception as e:
+            key = "qty" if side == "sell" else "notional"
+            return {"status": "error", "symbol": symbol.upper(), "side": side,
+                    key: amount, "error": str(e)}
+
+    def submit(self):
+        """Submit every queued order concurrently. Returns results in queue order."""
+        if not self._queue:
+            return []
+        workers = max(1, min(self.max_workers, len(self._queue)))
+        # Worker threads don't inherit the caller's essential_calls() scope
+        essential = getattr(_call_scope, "essential", False)
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            self.results = list(pool.map(lambda item: self._submit_one(item, essential),
+                                         self._queue))
+        self._queue = []
+        return self.results
+
+    def reconcile(self, timeout=FILL_TIMEOUT_SEC, poll=FILL_POLL_SEC):
+        """Poll fills for submitted orders (see reconcile_orders)."""
+        return reconcile_orders(self.results, timeout=timeout, poll=poll)
+
+
+def get_clock():
+    """Return market clock dict: is_open, next_open, next_close, timestamp (ISO strings)."""
+    def _():
+        clock = _trading_client().get_clock()
+        return {
+            "is_open": bool(clock.is_open),
+            "timestamp": clock.timestamp.isoformat(),
+            "next_open": clock.next_open.isoformat(),
+            "next_close": clock.next_close.isoformat(),
+        }
+    return _retry(_)
+
+
 def get_portfolio_history(period="1M", timeframe="1D"):
     """
     Return portfolio history (equity curve) from Alpaca.
@@ -256,6 +648,8 @@ def get_portfolio_history(period="1M", timeframe="1D"):
     timeframe: "1Min", "5Min", "15Min", "1H", "1D"
     Returns dict with timestamp[], equity[], profit_loss[], profit_loss_pct[], base_value, timeframe.
     """
+    from alpaca.trading.requests import GetPortfolioHistoryRequest
+
     def _():
         req = GetPortfolioHistoryRequest(period=period, timeframe=timeframe)
         hist = _trading_client().get_portfolio_history(history_filter=req)
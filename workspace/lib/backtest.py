@@ -0,0 +1,248 @@
+"""Backtester: replays the scan's Phase 1/1b/2/3 rules over daily bars.
+
+Each simulated day runs lib.strategy.evaluate_cycle (the same decision core
+scan_autotrader.main uses) against a SimBroker that fills every order at that
+day's close. Indicators are computed once for the whole dataset (lib.indicators) and
+nothing is written to disk, so a year of daily bars for hundreds of symbols
+replays in seconds.
+
+Differences from live trading: fills at the close (optional slippage) and no
+PDT limit. RSI is seeded from the full history, as the scan's persisted
+RSIState is once it has run since the same start; a fresh state seeds from
+the 60-day bar window.
+"""
+import json
+import math
+from pathlib import Path
+
+import numpy as np
+
+from .indicators import rolling_mean, rsi_matrix
+from .market_state import MarketState
+from .strategy import DEFAULT_PARAMS, CycleContext, apply_fill, evaluate_cycle, mark_price
+
+TRADING_DAYS_PER_YEAR = 252
+
+
+class BarMatrix:
+    """Daily closes/volumes aligned on one date axis, shaped (tickers, dates).
+
+    Days before a ticker's first bar are NaN; interior gaps are forward-filled
+    (volume 0) so a missing print doesn't read as a price move.
+    """
+
+    def __init__(self, tickers, dates, close, volume):
+        self.tickers = list(tickers)
+        self.dates = list(dates)
+        self.close = close
+        self.volume = volume
+        valid = ~np.isnan(close)
+        # First column with data per ticker (n_dates if none)
+        self.first = np.where(valid.any(axis=1), valid.argmax(axis=1), len(self.dates))
+
+    @classmethod
+    def from_bars(cls, bars_by_ticker):
+        """Build from {ticker: [bar dict, ...]} (get_bars / bar_cache format)."""
+        tickers = [t for t, bars in bars_by_ticker.items() if bars]
+        dates = sorted({b["date"][:10] for t in tickers for b in bars_by_ticker[t]})
+        col = {d: i for i, d in enumerate(dates)}
+        close = np.full((len(tickers), len(dates)), np.nan)
+        volume = np.zeros((len(tickers), len(dates)))
+        for r, t in enumerate(tickers):
+            for b in bars_by_ticker[t]:
+                c = col[b["date"][:10]]
+                close[r, c] = float(b["close"])
+                volume[r, c] = float(b.get("volume") or 0)
+        for c in range(1, len(dates)):
+            gap = np.isnan(close[:, c]) & ~np.isnan(close[:, c - 1])
+            close[gap, c] = close[gap, c - 1]
+        return cls(tickers, dates, close, volume)
+
+    @classmethod
+    def load_json(cls, path):
+        """Load a {ticker: [bar dict, ...]} JSON file (e.g. alpaca_tool.py bars output)."""
+        return cls.from_bars(json.loads(Path(path).read_text(encoding="utf-8")))
+
+
+def _by_start(values, first, fn):
+    """Apply fn to each group of rows sharing a first-valid column; NaN before it."""
+    out = np.full(values.shape, np.nan)
+    for start in np.unique(first):
+        if start >= values.shape[1]:
+            continue
+        rows = np.nonzero(first == start)[0]
+        out[rows, start:] = fn(values[rows, start:])
+    return out
+
+
+def compute_signals(matrix, params=DEFAULT_PARAMS, rsi_period=14, volume_period=20):
+    """Indicator arrays for every (ticker, date): rsi, sma, avg_volume."""
+    return {
+        "rsi": _by_start(matrix.close, matrix.first, lambda a: rsi_matrix(a, rsi_period)),
+        "sma": _by_start(matrix.close, matrix.first,
+                         lambda a: rolling_mean(a, params.sma_period)),
+        "avg_volume": _by_start(matrix.volume, matrix.first,
+                                lambda a: rolling_mean(a, volume_period)),
+    }
+
+
+def _opt(x):
+    return None if math.isnan(x) else float(x)
+
+
+class SimBroker:
+    """In-memory broker: cash + position dicts shaped like alpaca_client.get_positions()."""
+
+    def __init__(self, cash, slippage=0.0):
+        self.cash = float(cash)
+        self.slippage = slippage
+        self.positions = {}
+        self.trades = []
+
+    def mark(self, prices):
+        """Reprice every position from {ticker: price}; missing/NaN prices keep the last mark."""
+        for t, pos in self.positions.items():
+            price = prices.get(t)
+            if price is not None and not math.isnan(price):
+                mark_price(pos, price)
+
+    def market_value(self):
+        return sum(p["market_value"] for p in self.positions.values())
+
+    def equity(self):
+        return self.cash + self.market_value()
+
+    def snapshot(self):
+        """MarketState view (copied positions) for evaluate_cycle."""
+        state = MarketState()
+        state.account = {"equity": self.equity(), "buying_power": self.cash, "cash": self.cash}
+        state.positions = [dict(p) for p in self.positions.values()]
+        return state
+
+    def fill(self, order, date):
+        """Fill a lib.strategy.Order at its reference price."""
+        if order.side == "sell":
+            self.sell(order.ticker, order.qty, order.price, date, order.kind)
+        else:
+            self.buy(order.ticker, order.notional, order.price, date, order.kind)
+
+    def buy(self, ticker, notional, price, date, reason):
+        fill = price * (1 + self.slippage)
+        shares = notional / fill
+        pos = self.positions.get(ticker)
+        if pos:
+            total = pos["qty"] + shares
+            pos["avg_entry"] = (pos["avg_entry"] * pos["qty"] + notional) / total
+            pos["qty"] = pos["available_qty"] = total
+        else:
+            pos = {"ticker": ticker, "qty": shares, "available_qty": shares,
+                   "avg_entry": fill}
+            self.positions[ticker] = pos
+        mark_price(pos, price)
+        self.cash -= notional
+        self.trades.append({"date": date, "side": "buy", "ticker": ticker, "qty": shares,
+                            "price": fill, "notional": notional, "reason": reason, "pnl": 0.0})
+
+    def sell(self, ticker, qty, price, date, reason):
+        pos = self.positions.get(ticker)
+        if not pos:
+            return
+        qty = min(qty, pos["qty"])
+        fill = price * (1 - self.slippage)
+        proceeds = qty * fill
+        pnl = qty * (fill - pos["avg_entry"])
+        self.cash += proceeds
+        remaining = pos["qty"] - qty
+        if remaining < 0.0001:
+            del self.positions[ticker]
+        else:
+            pos["qty"] = pos["available_qty"] = remaining
+            mark_price(pos, price)
+        self.trades.append({"date": date, "side": "sell", "ticker": ticker, "qty": qty,
+                            "price": fill, "notional": proceeds, "reason": reason, "pnl": pnl})
+
+
+class BacktestResult:
+    def __init__(self, dates, equity, trades, initial_cash):
+        self.dates = dates
+        self.equity = equity
+        self.trades = trades
+        self.initial_cash = initial_cash
+
+    def summary(self):
+        return summarize(self.equity, self.trades, self.initial_cash)
+
+
+def summarize(equity, trades, initial_cash):
+    """Total return, annualized Sharpe (daily, rf=0), max drawdown, trade count, win rate."""
+    equity = np.asarray(equity, dtype=float)
+    if len(equity) == 0:
+        return {"total_return": 0.0, "sharpe": 0.0, "max_drawdown": 0.0,
+                "trades": 0, "win_rate": None, "final_equity": initial_cash}
+    curve = np.concatenate([[initial_cash], equity])
+    rets = curve[1:] / curve[:-1] - 1
+    std = rets.std()
+    sharpe = float(rets.mean() / std * math.sqrt(TRADING_DAYS_PER_YEAR)) if std > 0 else 0.0
+    drawdown = curve / np.maximum.accumulate(curve) - 1
+    sells = [t for t in trades if t["side"] == "sell"]
+    wins = sum(1 for t in sells if t["pnl"] > 0)
+    return {
+        "total_return": float(curve[-1] / initial_cash - 1),
+        "sharpe": sharpe,
+        "max_drawdown": float(drawdown.min()),
+        "trades": len(trades),
+        "win_rate": wins / len(sells) if sells else None,
+        "final_equity": float(curve[-1]),
+    }
+
+
+def run_backtest(matrix, params=DEFAULT_PARAMS, initial_cash=100_000.0, slippage=0.0,
+                 signals=None):
+    """Replay the strategy day by day over matrix. Returns a BacktestResult.
+
+    signals: precomputed compute_signals(matrix, params) to reuse across runs
+    that share indicator settings.
+    """
+    if signals is None:
+        signals = compute_signals(matrix, params)
+    rsi_all, sma_all, vol_avg_all = signals["rsi"], signals["sma"], signals["avg_volume"]
+    tickers = matrix.tickers
+    row_of = {t: r for r, t in enumerate(tickers)}
+    broker = SimBroker(initial_cash, slippage)
+    peaks = {}
+    equity_curve = np.empty(len(matrix.dates))
+    prev_equity = float(initial_cash)
+
+    for d, date in enumerate(matrix.dates):
+        closes = matrix.close[:, d]
+        broker.mark({t: closes[row_of[t]] for t in broker.positions})
+        equity = broker.equity()
+        day_drawdown = (equity - prev_equity) / prev_equity if prev_equity > 0 else 0
+        ctx = CycleContext(today=date, equity=equity, peaks=peaks,
+                           buys_halted=day_drawdown <= params.daily_drawdown_halt)
+
+        # Only tickers that can act today: held, or RSI under the buy threshold
+        rsi_col = rsi_all[:, d]
+        valid = ~np.isnan(rsi_col)
+        rows = set(np.nonzero(valid & (rsi_col < params.rsi_buy_threshold))[0].tolist())
+        rows.update(row_of[t] for t in broker.positions if valid[row_of[t]])
+        indicators = {}
+        for r in sorted(rows):
+            indicators[tickers[r]] = {
+                "rsi": float(rsi_col[r]),
+                "rsi_prev": _opt(rsi_all[r, d - 1]) if d > 0 else None,
+                "sma": _opt(sma_all[r, d]),
+                "avg_volume": _opt(vol_avg_all[r, d]),
+                "close": float(closes[r]),
+                "volume": float(matrix.volume[r, d]),
+                "n_bars": d - int(matrix.first[r]) + 1,
+            }
+
+        for order in evaluate_cycle(broker.snapshot(), None, params, ctx, indicators=indicators):
+            broker.fill(order, date)
+            apply_fill(order, ctx.partial_sell_today, ctx.cooldown_tickers, peaks)
+
+        equity_curve[d] = broker.equity()
+        prev_equity = equity_curve[d]
+
+    return BacktestResult(matrix.dates, equity_curve, broker.trades, initial_cash)
@@ -0,0 +1,97 @@
+"""On-disk daily bar cache (SQLite) so scans only download the trailing bars.
+
+Rows are keyed by (ticker, date) where date is the bar timestamp ISO string
+as returned by get_bars. A per-ticker coverage start records how far back the
+cache has been filled, so a request for a longer window than before triggers
+a full fetch instead of silently returning a short history.
+"""
+import logging
+import sqlite3
+
+from .config import LOGS_DIR
+
+logger = logging.getLogger("autotrader")
+
+BAR_CACHE_PATH = LOGS_DIR / "bar_cache.sqlite"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS bars (
+    ticker TEXT NOT NULL,
+    date TEXT NOT NULL,
+    open REAL, high REAL, low REAL, close REAL, volume REAL,
+    PRIMARY KEY (ticker, date)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS coverage (
+    ticker TEXT PRIMARY KEY,
+    start TEXT NOT NULL
+);
+"""
+
+
+def _connect():
+    LOGS_DIR.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(BAR_CACHE_PATH, timeout=10)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(_SCHEMA)
+    return conn
+
+
+def cached_ranges(tickers):
+    """Return {ticker: (coverage_start, last_bar_date)} for tickers present in the cache."""
+    if not tickers:
+        return {}
+    marks = ",".join("?" * len(tickers))
+    conn = _connect()
+    try:
+        rows = conn.execute(
+            f"SELECT c.ticker, c.start, MAX(b.date) FROM coverage c "
+            f"LEFT JOIN bars b ON b.ticker = c.ticker "
+            f"WHERE c.ticker IN ({marks}) GROUP BY c.ticker",
+            list(tickers),
+        ).fetchall()
+    finally:
+        conn.close()
+    return {t: (start, last) for t, start, last in rows}
+
+
+def store(bars_by_ticker, coverage_start=None):
+    """Upsert bars; if coverage_start is given, extend each ticker's coverage back to it."""
+    conn = _connect()
+    try:
+        with conn:
+            for ticker, bars in bars_by_ticker.items():
+                conn.executemany(
+                    "INSERT OR REPLACE INTO bars VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    [(ticker, b["date"], b["open"], b["high"], b["low"],
+                      b["close"], b["volume"]) for b in bars],
+                )
+                if coverage_start is not None:
+                    conn.execute(
+                        "INSERT INTO coverage VALUES (?, ?) ON CONFLICT(ticker) "
+                        "DO UPDATE SET start = MIN(start, excluded.start)",
+                        (ticker, coverage_start),
+                    )
+    finally:
+        conn.close()
+
+
+def load(tickers, since):
+    """Return {ticker: [bar dict, ...]} with date >= since (ISO string), sorted ascending."""
+    result = {t: [] for t in tickers}
+    if not tickers:
+        return result
+    marks = ",".join("?" * len(tickers))
+    conn = _connect()
+    try:
+        rows = conn.execute(
+            f"SELECT ticker, date, open, high, low, close, volume FROM bars "
+            f"WHERE ticker IN ({marks}) AND date >= ? ORDER BY ticker, date",
+            list(tickers) + [since],
+        ).fetchall()
+    finally:
+        conn.close()
+    for ticker, date, o, h, low, c, v in rows:
+        result[ticker].append({"date": date, "open": o, "high": h, "low": low,
+                               "close": c, "volume": v})
+    return result
@@ -1,51 +1,115 @@
-"""Generate portfolio charts from Alpaca data."""
+"""Generate portfolio charts from Alpaca data.
+
+ChartRenderer keeps one Agg figure per process: matplotlib is imported on
+the first render, and later renders update the line data in place instead of
+building a new figure. The daemon and stream processes reuse the module-level
+renderer for every chart post. history_digest() is stdlib-only, so a caller
+can tell that the history hasn't changed since the last PNG and skip
+rendering (and the matplotlib import) entirely.
+"""
+import hashlib
 import io
+import json
 import logging
 from datetime import datetime
-from pathlib import Path
 from typing import Optional
 
 logger = logging.getLogger("autotrader.chart")
 
+LINE_COLOR = "#5865F2"
 
-def equity_chart_png(equity_data: dict, width: int = 800, height: int = 400) -> Optional[bytes]:
-    """
-    Generate an equity curve PNG from portfolio history.
-    equity_data: dict with timestamp[], equity[], profit_loss_pct[]
-    Returns PNG bytes or None on failure.
-    """
-    try:
-        import matplotlib
-        matplotlib.use("Agg")
-        import matplotlib.pyplot as plt
-        import matplotlib.dates as mdates
-    except ImportError:
-        logger.warning("matplotlib not installed, cannot generate chart")
-        return None
 
+def _series(equity_data: dict):
+    """(timestamps, equity) if the history can be charted, else None."""
     timestamps = equity_data.get("timestamp") or []
     equity = equity_data.get("equity") or []
     if not timestamps or not equity or len(timestamps) != len(equity):
-        logger.warning("Insufficient portfolio history data for chart")
         return None
+    return timestamps, equity
+
+
+def history_digest(equity_data: dict, width: int = 800, height: int = 400) -> Optional[str]:
+    """Content hash of the charted series and size; None if there is nothing to chart."""
+    series = _series(equity_data)
+    if series is None:
+        return None
+    payload = json.dumps([width, height, *series], separators=(",", ":"))
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class ChartRenderer:
+    """Equity-curve renderer with a reusable figure/canvas and a last-PNG cache."""
 
-    # Convert Unix timestamps to datetime
-    dates = [datetime.utcfromtimestamp(ts) for ts in timestamps]
-
-    fig, ax = plt.subplots(figsize=(width / 100, height / 100), dpi=100)
-    ax.plot(dates, equity, color="#5865F2", linewidth=2, label="Equity")
-    ax.fill_between(dates, equity, alpha=0.2, color="#5865F2")
-    ax.xaxis.set_major_formatter(mdates.DateFormatter("%m/%d"))
-    ax.xaxis.set_major_locator(mdates.AutoDateLocator())
-    plt.xticks(rotation=45)
-    ax.set_ylabel("Equity ($)")
-    ax.set_title("AutoTrader Portfolio — Equity Curve")
-    ax.grid(True, alpha=0.3)
-    ax.legend(loc="upper left")
-    fig.tight_layout()
-
-    buf = io.BytesIO()
-    fig.savefig(buf, format="png", bbox_inches="tight", facecolor="white")
-    plt.close(fig)
-    buf.seek(0)
-    return buf.read()
+    def __init__(self):
+        self._fig = None
+        self._canvas = None
+        self._ax = None
+        self._line = None
+        self._fill = None
+        self._date2num = None
+        self.digest = None
+        self.png = None
+
+    def _setup(self, width, height) -> bool:
+        try:
+            import matplotlib
+            matplotlib.use("Agg")
+            import matplotlib.dates as mdates
+            from matplotlib.backends.backend_agg import FigureCanvasAgg
+            from matplotlib.figure import Figure
+        except ImportError:
+            logger.warning("matplotlib not installed, cannot generate chart")
+            return False
+        fig = Figure(figsize=(width / 100, height / 100), dpi=100)
+        self._canvas = FigureCanvasAgg(fig)
+        ax = fig.add_subplot()
+        ax.xaxis_date()
+        (self._line,) = ax.plot([], [], color=LINE_COLOR, linewidth=2, label="Equity")
+        ax.xaxis.set_major_formatter(mdates.DateFormatter("%m/%d"))
+        ax.xaxis.set_major_locator(mdates.AutoDateLocator())
+        ax.tick_params(axis="x", labelrotation=45)
+        ax.set_ylabel("Equity ($)")
+        ax.set_title("AutoTrader Portfolio — Equity Curve")
+        ax.grid(True, alpha=0.3)
+        ax.legend(loc="upper left")
+        self._fig, self._ax, self._date2num = fig, ax, mdates.date2num
+        return True
+
+    def render(self, equity_data: dict, width: int = 800, height: int = 400) -> Optional[bytes]:
+        """PNG bytes for the history; the cached PNG if it is unchanged since the last render."""
+        digest = history_digest(equity_data, width, height)
+        if digest is None:
+            logger.warning("Insufficient portfolio history data for chart")
+            return None
+        if digest == self.digest:
+            return self.png
+        if self._fig is None and not self._setup(width, height):
+            return None
+        timestamps, equity = _series(equity_data)
+        x = self._date2num([datetime.utcfromtimestamp(ts) for ts in timestamps])
+        self._fig.set_size_inches(width / 100, height / 100)
+        self._line.set_data(x, equity)
+        if self._fill is not None:
+            self._fill.remove()
+        self._ax.relim()
+        # fill_between extends the data limits to its own extent (down to 0)
+        self._fill = self._ax.fill_between(x, equity, alpha=0.2, color=LINE_COLOR)
+        self._ax.autoscale_view()
+        self._fig.tight_layout()
+
+        buf = io.BytesIO()
+        self._fig.savefig(buf, format="png", bbox_inches="tight", facecolor="white")
+        self.digest, self.png = digest, buf.getvalue()
+        return self.png
+
+
+_renderer = ChartRenderer()
+
+
+def equity_chart_png(equity_data: dict, width: int = 800, height: int = 400) -> Optional[bytes]:
+    """
+    Generate an equity curve PNG from portfolio history.
+    equity_data: dict with timestamp[], equity[], profit_loss_pct[]
+    Returns PNG bytes or None on failure.
+    """
+    return _renderer.render(equity_data, width, height)
@@ -9,6 +9,8 @@ WORKSPACE_ROOT = Path(__file__).resolve().parent.parent
 CONFIG_DIR = WORKSPACE_ROOT / "config"
 LOGS_DIR = WORKSPACE_ROOT / "logs"
 WATCHLIST_PATH = CONFIG_DIR / "watchlist.json"
+# Incremental RSI state per ticker (lib.rsi.RSIState), persisted between runs
+RSI_STATE_PATH = LOGS_DIR / "rsi_state.json"
 
 # Decisions log retention: keep this many days (None = no rotation)
 DECISIONS_RETENTION_DAYS = 90
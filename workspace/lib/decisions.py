@@ -1,50 +1,225 @@
-"""Decision logging, retention, and self-improvement outcomes."""
+"""Decision logging, retention, and self-improvement outcomes.
+
+Decisions are stored one file per UTC date, logs/decisions/YYYY-MM-DD.jsonl.
+A date query opens only that day's file, "last N" tails the newest files
+backwards (tail_lines), and retention just unlinks whole days, so no line is
+ever rewritten and concurrent appends can't be lost. A legacy single-file
+logs/decisions.jsonl is split into segments on first use.
+"""
 import json
 import logging
+import os
+import re
+from collections import Counter
 from datetime import datetime, timedelta
-from pathlib import Path
 
 from .config import LOGS_DIR, DECISIONS_RETENTION_DAYS
 
 logger = logging.getLogger("autotrader")
-DECISIONS_PATH = LOGS_DIR / "decisions.jsonl"
+DECISIONS_DIR = LOGS_DIR / "decisions"
+LEGACY_DECISIONS_PATH = LOGS_DIR / "decisions.jsonl"
 OUTCOMES_PATH = LOGS_DIR / "outcomes.jsonl"
 REVIEW_PATH = LOGS_DIR / "daily_review.jsonl"
+_DAY_RE = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+_SEGMENT_RE = re.compile(r"^(\d{4}-\d{2}-\d{2})\.jsonl$")
+_TAIL_BLOCK = 64 * 1024
+
+
+def segment_path(day):
+    """File holding decisions logged on day (YYYY-MM-DD)."""
+    return DECISIONS_DIR / f"{day}.jsonl"
+
+
+def _entry_day(entry):
+    day = str(entry.get("timestamp", ""))[:10]
+    return day if _DAY_RE.match(day) else datetime.utcnow().strftime("%Y-%m-%d")
 
 
 def log_decision(entry):
-    LOGS_DIR.mkdir(parents=True, exist_ok=True)
-    with open(DECISIONS_PATH, "a") as f:
+    DECISIONS_DIR.mkdir(parents=True, exist_ok=True)
+    with open(segment_path(_entry_day(entry)), "a") as f:
         f.write(json.dumps(entry) + "\n")
 
 
-def load_recent_decisions(limit=200, since_date=None):
-    """Load most recent decisions (newest last in list). Optionally filter since_date (date string YYYY-MM-DD)."""
-    if not DECISIONS_PATH.exists():
+def _migrate_legacy():
+    """Split a legacy decisions.jsonl into date segments (once; the rename makes it exclusive)."""
+    if not LEGACY_DECISIONS_PATH.exists():
+        return
+    claimed = LEGACY_DECISIONS_PATH.with_suffix(".jsonl.migrating")
+    try:
+        os.replace(LEGACY_DECISIONS_PATH, claimed)
+    except FileNotFoundError:
+        return
+    DECISIONS_DIR.mkdir(parents=True, exist_ok=True)
+    files = {}
+    try:
+        with open(claimed, "rb") as src:
+            for line in src:
+                if not line.strip():
+                    continue
+                try:
+                    day = _entry_day(json.loads(line))
+                except (json.JSONDecodeError, AttributeError):
+                    continue
+                if day not in files:
+                    files[day] = open(segment_path(day), "ab")
+                files[day].write(line if line.endswith(b"\n") else line + b"\n")
+    finally:
+        for f in files.values():
+            f.close()
+    claimed.unlink()
+    # Offset sidecar from the single-file layout
+    (LOGS_DIR / "decisions.idx.json").unlink(missing_ok=True)
+    logger.info("Split decisions.jsonl into %d daily segments", len(files))
+
+
+def segment_days():
+    """Dates that have a decisions segment, oldest first."""
+    _migrate_legacy()
+    if not DECISIONS_DIR.exists():
+        return []
+    days = []
+    for entry in os.scandir(DECISIONS_DIR):
+        m = _SEGMENT_RE.match(entry.name)
+        if m:
+            days.append(m.group(1))
+    return sorted(days)
+
+
+def tail_lines(path, n, block=_TAIL_BLOCK):
+    """Last n non-empty lines of path (bytes, oldest first), reading backwards in blocks."""
+    if n <= 0:
+        return []
+    try:
+        f = open(path, "rb")
+    except FileNotFoundError:
         return []
-    lines = DECISIONS_PATH.read_text(encoding="utf-8").strip().splitlines()
-    decisions = []
-    for line in reversed(lines[-limit:]):
+    with f:
+        pos = f.seek(0, os.SEEK_END)
+        buf = b""
+        while pos > 0 and buf.count(b"\n") <= n:
+            step = min(block, pos)
+            pos -= step
+            f.seek(pos)
+            buf = f.read(step) + buf
+    lines = [ln for ln in buf.splitlines() if ln.strip()]
+    return lines[-n:]
+
+
+def _parse(lines):
+    out = []
+    for line in lines:
         try:
-            d = json.loads(line)
-            if since_date and d.get("timestamp", "")[:10] < since_date:
-                continue
-            decisions.append(d)
+            out.append(json.loads(line))
         except json.JSONDecodeError:
             continue
-    return list(reversed(decisions))
+    return out
+
+
+def iter_decisions(since_date=None, until_date=None):
+    """Yield decisions from since_date..until_date (inclusive), oldest first, one segment at a time."""
+    for day in segment_days():
+        if since_date and day < since_date:
+            continue
+        if until_date and day > until_date:
+            break
+        try:
+            with open(segment_path(day), "rb") as f:
+                yield from _parse(f)
+        except FileNotFoundError:
+            continue  # unlinked by retention mid-iteration
+
+
+def load_recent_decisions(limit=200, since_date=None):
+    """Load most recent decisions (newest last in list). Optionally filter since_date (date string YYYY-MM-DD)."""
+    chunks = []
+    need = limit
+    for day in reversed(segment_days()):
+        if need <= 0 or (since_date and day < since_date):
+            break
+        lines = tail_lines(segment_path(day), need)
+        chunks.append(_parse(lines))
+        need -= len(lines)
+    return [d for chunk in reversed(chunks) for d in chunk]
+
+
+def load_decisions_since(since_date, until_date=None):
+    """Decisions dated since_date..until_date (inclusive, YYYY-MM-DD), oldest first."""
+    return list(iter_decisions(since_date, until_date))
+
+
+def load_decisions_for_date(day):
+    """All decisions logged on day (YYYY-MM-DD), oldest first. Reads only that day's segment."""
+    _migrate_legacy()
+    try:
+        with open(segment_path(day), "rb") as f:
+            return _parse(f)
+    except FileNotFoundError:
+        return []
+
+
+class DecisionIndex:
+    """One day's decisions keyed by (date, ticker, side), for per-cycle lookups.
+
+    Built once from the day's segment (load) and kept current with add() as
+    the executor logs new decisions, so the circuit breaker, PDT checks and
+    daily review share one pass over the log. Entries for other dates are ignored.
+    """
+
+    def __init__(self, day, decisions=(), opens_at=None):
+        self.day = day
+        # portfolio_value on the first decision at/after opens_at (session open, aware UTC)
+        self.day_open_equity = None
+        self._opens_at = opens_at.strftime("%Y-%m-%dT%H:%M:%S") if opens_at else ""
+        self.counts = Counter()       # {action: n}
+        self._keys = set()            # {(date, ticker, side)}
+        self._n = 0
+        for d in decisions:
+            self.add(d)
+
+    @classmethod
+    def load(cls, day, opens_at=None):
+        return cls(day, load_decisions_for_date(day), opens_at)
+
+    def add(self, entry):
+        ts = str(entry.get("timestamp", ""))
+        if ts[:10] != self.day:
+            return
+        if (self.day_open_equity is None and ts[:19] >= self._opens_at
+                and entry.get("portfolio_value") is not None):
+            self.day_open_equity = float(entry["portfolio_value"])
+        self._n += 1
+        action = entry.get("action")
+        self.counts[action] += 1
+        self._keys.add((self.day, entry.get("ticker"), action))
+
+    def __len__(self):
+        return self._n
+
+    def has(self, ticker, side) -> bool:
+        return (self.day, ticker, side) in self._keys
+
+    def has_opposite(self, ticker, side) -> bool:
+        """True if ticker was traded on the other side today (a trade now would be a round trip)."""
+        return self.has(ticker, "buy" if side == "sell" else "sell")
 
 
 def rotate_decisions_log():
-    """Keep only last DECISIONS_RETENTION_DAYS. Call periodically (e.g. daily)."""
-    if DECISIONS_RETENTION_DAYS is None or not DECISIONS_PATH.exists():
+    """Keep only last DECISIONS_RETENTION_DAYS by unlinking older daily segments."""
+    if DECISIONS_RETENTION_DAYS is None:
         return
     cutoff = (datetime.utcnow() - timedelta(days=DECISIONS_RETENTION_DAYS)).strftime("%Y-%m-%d")
-    lines = DECISIONS_PATH.read_text(encoding="utf-8").strip().splitlines()
-    kept = [ln for ln in lines if ln.strip() and ln.strip()[:26].split("Z")[0][:10] >= cutoff]
-    if len(kept) < len(lines):
-        DECISIONS_PATH.write_text("\n".join(kept) + ("\n" if kept else ""))
-        logger.info("Rotated decisions log: kept %s lines since %s", len(kept), cutoff)
+    dropped = 0
+    for day in segment_days():
+        if day >= cutoff:
+            break
+        try:
+            segment_path(day).unlink()
+            dropped += 1
+        except FileNotFoundError:
+            pass
+    if dropped:
+        logger.info("Rotated decisions log: removed %s day(s) before %s", dropped, cutoff)
 
 
 def log_outcome(entry):
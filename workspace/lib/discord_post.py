@@ -6,6 +6,8 @@ import urllib.request
 import urllib.error
 from pathlib import Path
 
+from . import state_store
+
 logger = logging.getLogger("autotrader.discord")
 
 TRADES_CHANNEL_ID = os.environ.get("DISCORD_TRADES_CHANNEL_ID", "1474503672951079024")
@@ -15,8 +17,6 @@ CHARTS_CHANNEL_ID = os.environ.get("DISCORD_CHARTS_CHANNEL_ID", "147450261139358
 DASHBOARD_WEBHOOK_URL = os.environ.get("DISCORD_DASHBOARD_WEBHOOK_URL", "")
 TRADES_WEBHOOK_URL = os.environ.get("DISCORD_TRADES_WEBHOOK_URL", "")
 BASE = "https://discord.com/api/v10"
-DASHBOARD_STATE_FILE = Path(__file__).resolve().parent.parent / "config" / "dashboard_message_id.json"
-CHART_STATE_FILE = Path(__file__).resolve().parent.parent / "config" / "chart_message_id.json"
 
 # Load .env if token missing (cron subprocess may not inherit env)
 def _ensure_env():
@@ -187,6 +187,18 @@ def post_image(channel_id: str, image_bytes: bytes, filename: str = "chart.png",
     return _post_image_and_get_id(channel_id, image_bytes, filename, content) is not None
 
 
+def _saved_message_id(key, channel_id):
+    """Message ID saved under key, if it was posted to channel_id."""
+    try:
+        state = state_store.get(key) or {}
+    except Exception as e:
+        logger.warning("State store read failed (%s): %s", key, e)
+        return None
+    if state.get("channel_id") == channel_id:
+        return state.get("message_id")
+    return None
+
+
 def update_chart(image_bytes: bytes, content: str = "📈 Portfolio equity") -> bool:
     """
     Update the chart in the charts channel. Same logic as dashboard: delete old message,
@@ -198,28 +210,15 @@ def update_chart(image_bytes: bytes, content: str = "📈 Portfolio equity") ->
     if not headers:
         return False
 
-    msg_id = None
-    if CHART_STATE_FILE.exists():
-        try:
-            state = json.loads(CHART_STATE_FILE.read_text())
-            if state.get("channel_id") == channel_id:
-                msg_id = state.get("message_id")
-        except Exception:
-            pass
+    msg_id = _saved_message_id(state_store.CHART_MESSAGE, channel_id)
     if msg_id:
         _delete_message(channel_id, str(msg_id))
-        try:
-            CHART_STATE_FILE.unlink()
-        except Exception:
-            pass
+        state_store.delete(state_store.CHART_MESSAGE)
 
     new_id = _post_image_and_get_id(channel_id, image_bytes, "equity.png", content)
     if new_id:
-        CHART_STATE_FILE.parent.mkdir(parents=True, exist_ok=True)
-        CHART_STATE_FILE.write_text(json.dumps({
-            "channel_id": channel_id,
-            "message_id": str(new_id),
-        }, indent=2))
+        state_store.put(state_store.CHART_MESSAGE,
+                        {"channel_id": channel_id, "message_id": str(new_id)})
         return True
     return False
 
@@ -279,34 +278,21 @@ def update_dashboard(content: str) -> bool:
         logger.warning("Dashboard: no bot token, skipping")
         return False
 
-    # Try to edit existing message (state file persists message_id across runs)
+    # Try to edit existing message (state store persists message_id across runs)
     # Only use msg_id from bot state (channel_id), not webhook state (bot can't edit webhook msgs)
-    msg_id = None
-    if DASHBOARD_STATE_FILE.exists():
-        try:
-            state = json.loads(DASHBOARD_STATE_FILE.read_text())
-            if state.get("channel_id") == channel_id:
-                msg_id = state.get("message_id")
-        except Exception:
-            pass
+    msg_id = _saved_message_id(state_store.DASHBOARD_MESSAGE, channel_id)
     if msg_id:
         msg_id_str = str(msg_id)
         if _edit(channel_id, msg_id_str, content):
             return True
         logger.warning("Dashboard edit failed (msg %s), posting new", msg_id_str[:20])
-        try:
-            DASHBOARD_STATE_FILE.unlink()
-        except Exception:
-            pass
+        state_store.delete(state_store.DASHBOARD_MESSAGE)
 
     # Post new message and save its ID for next cycle
     new_id = _post_and_get_id(channel_id, content)
     if new_id:
-        DASHBOARD_STATE_FILE.parent.mkdir(parents=True, exist_ok=True)
-        DASHBOARD_STATE_FILE.write_text(json.dumps({
-            "channel_id": channel_id,
-            "message_id": str(new_id),
-        }, indent=2))
+        state_store.put(state_store.DASHBOARD_MESSAGE,
+                        {"channel_id": channel_id, "message_id": str(new_id)})
         return True
     logger.warning("Dashboard post to channel %s failed", channel_id)
     return False
@@ -0,0 +1,166 @@
+"""Order execution for scan cycles: submit what evaluate_cycle decided, then record it.
+
+Also owns the per-day strategy memory (stop-loss cooldown, half-sold tickers,
+trailing peaks) that lib.strategy.evaluate_cycle reads through CycleContext.
+It lives in lib.state_store and is saved in one transaction per cycle. Orders
+are applied to the memory only after fill reconciliation, so a sell the broker
+rejects or cancels doesn't leave a stale cooldown or lose a peak.
+"""
+import logging
+
+from . import state_store
+from .alpaca_client import OrderBatch, reconcile_orders
+from .decisions import log_decision, log_outcome
+from .pdt import record_day_trade
+from .strategy import PROTECTIVE_EXITS, CycleContext, apply_fill
+
+logger = logging.getLogger("autotrader")
+
+
+def _day_set(data, today: str) -> set:
+    if isinstance(data, dict) and data.get("date") == today:
+        return set(data.get("tickers", []))
+    return set()
+
+
+def _day_value(today: str, tickers: set) -> dict:
+    return {"date": today, "tickers": sorted(tickers)}
+
+
+def load_partial_sell_today(today: str) -> set:
+    """Tickers already half-sold today. Prevents the halving spiral when scan runs repeatedly."""
+    return _day_set(state_store.get(state_store.PARTIAL_SELL_TODAY), today)
+
+
+def save_partial_sell_today(today: str, tickers: set):
+    state_store.put(state_store.PARTIAL_SELL_TODAY, _day_value(today, tickers))
+
+
+def load_cooldown(today: str) -> set:
+    """Load tickers on stop-loss cooldown today. Resets automatically on new day."""
+    return _day_set(state_store.get(state_store.COOLDOWN), today)
+
+
+def save_cooldown(today: str, tickers: set):
+    state_store.put(state_store.COOLDOWN, _day_value(today, tickers))
+
+
+def load_peaks() -> dict:
+    """Load trailing-stop peak prices {ticker: peak_price}."""
+    return state_store.get(state_store.TRAILING_PEAKS) or {}
+
+
+def save_peaks(peaks: dict):
+    state_store.put(state_store.TRAILING_PEAKS, peaks)
+
+
+def load_context(today: str, equity: float) -> CycleContext:
+    """CycleContext with today's persisted cooldown, half-sold set and trailing peaks."""
+    saved = state_store.get_many([state_store.TRAILING_PEAKS, state_store.PARTIAL_SELL_TODAY,
+                                  state_store.COOLDOWN])
+    return CycleContext(today=today, equity=equity,
+                        peaks=saved.get(state_store.TRAILING_PEAKS) or {},
+                        partial_sell_today=_day_set(saved.get(state_store.PARTIAL_SELL_TODAY),
+                                                    today),
+                        cooldown_tickers=_day_set(saved.get(state_store.COOLDOWN), today))
+
+
+def save_context(ctx: CycleContext):
+    """Persist peaks, half-sold set and cooldown in one transaction."""
+    with state_store.StateBatch() as batch:
+        batch.put(state_store.TRAILING_PEAKS, ctx.peaks)
+        batch.put(state_store.PARTIAL_SELL_TODAY, _day_value(ctx.today, ctx.partial_sell_today))
+        batch.put(state_store.COOLDOWN, _day_value(ctx.today, ctx.cooldown_tickers))
+
+
+class ExecutionReport:
+    """What went out this cycle, in the (ticker, qty|notional, rsi, label) shape the summary uses.
+
+    results: per-order broker result dicts (status, order_id, filled_qty, ...).
+    """
+
+    def __init__(self):
+        self.sells = []
+        self.buys = []
+        self.errors = []
+        self.results = []
+
+
+def _unfilled(result) -> bool:
+    """True if the broker ended the order without filling any of it."""
+    return (result.get("status") in ("rejected", "canceled", "expired")
+            and not float(result.get("filled_qty") or 0))
+
+
+def execute_orders(orders, state, ctx, now, report=None, reconcile=True):
+    """Submit orders, reconcile fills, then record the ones that went through and persist ctx.
+
+    Sells go out first as one concurrent OrderBatch, then buys as another, so
+    exits are never queued behind entries. Fills are polled in one pass, and
+    only then are orders applied to state and ctx and logged: an order the
+    broker rejects, cancels or expires unfilled is reported in report.errors
+    and leaves no cooldown, peak, day trade or decision behind. Orders still
+    open after reconcile (or with reconcile=False) count as accepted.
+    """
+    report = report or ExecutionReport()
+    accepted = []
+    try:
+        for side in ("sell", "buy"):
+            group = [o for o in orders if o.side == side]
+            if not group:
+                continue
+            batch = OrderBatch()
+            for order in group:
+                if side == "sell":
+                    batch.sell(order.ticker, order.qty, essential=order.kind in PROTECTIVE_EXITS)
+                else:
+                    batch.buy_notional(order.ticker, order.notional)
+            for order, result in zip(group, batch.submit()):
+                report.results.append(result)
+                if result["status"] == "error":
+                    _report_failure(order, result["error"], report)
+                    continue
+                accepted.append((order, result))
+        if reconcile and accepted:
+            reconcile_orders([r for _, r in accepted])
+    finally:
+        for order, result in accepted:
+            if _unfilled(result):
+                _report_failure(order, result["status"], report)
+                continue
+            if order.side == "sell":
+                state.apply_sell(order.ticker, order.qty)
+                report.sells.append((order.ticker, order.qty, order.rsi, order.label))
+            else:
+                state.apply_buy(order.ticker, order.notional, price=order.price)
+                report.buys.append((order.ticker, order.notional, order.rsi, order.label))
+            _record(order, ctx, now, result.get("order_id"))
+        save_context(ctx)
+    return report
+
+
+def _report_failure(order, err, report):
+    if order.side == "sell":
+        logger.error("SELL FAILED %s x%s (%s): %s", order.ticker, order.qty, order.kind, err)
+        report.errors.append(f"SELL FAILED {order.ticker} ×{order.qty} ({order.kind}): {err}")
+        return
+    suffix = f" ({order.kind})" if order.kind != "rsi-buy" else ""
+    logger.error("BUY FAILED %s $%.2f%s: %s", order.ticker, order.notional, suffix, err)
+    report.errors.append(f"BUY FAILED {order.ticker} ${order.notional:,.2f}{suffix}: {err}")
+
+
+def _record(order, ctx, now, order_id=None):
+    apply_fill(order, ctx.partial_sell_today, ctx.cooldown_tickers, ctx.peaks)
+    if order.day_trade:
+        if ctx.pdt is not None:
+            ctx.pdt.record_day_trade(order.ticker, ctx.today)
+        else:
+            record_day_trade(order.ticker, ctx.today)
+    entry = {"timestamp": now, "action": order.side, "ticker": order.ticker,
+             **order.decision, "order_id": order_id}
+    log_decision(entry)
+    if ctx.decisions is not None:
+        ctx.decisions.add(entry)
+    log_outcome({"timestamp": now, "ticker": order.ticker, "action": order.side,
+                 **order.outcome})
+    logger.info("%s %s: %s", order.kind.upper(), order.ticker, order.label)
@@ -0,0 +1,113 @@
+"""Vectorized RSI / SMA / volume indicators over a whole watchlist at once.
+
+Inputs are 2-D arrays shaped (tickers, bars), oldest bar first. Wilder
+smoothing is recursive in time, so the time axis is still a loop, but each
+step updates every ticker at once; the cost is O(bars) NumPy ops instead of
+O(tickers x bars) Python ops. Results match lib.rsi exactly: the seed average
+and the SMA are summed left-to-right like Python's sum().
+"""
+import numpy as np
+
+
+def rsi_matrix(closes, period=14):
+    """RSI series for each row of closes. Columns before index `period` are NaN."""
+    closes = np.asarray(closes, dtype=float)
+    n_rows, n_bars = closes.shape
+    out = np.full((n_rows, n_bars), np.nan)
+    if n_bars < period + 1:
+        return out
+    change = np.diff(closes, axis=1)
+    gains = np.maximum(change, 0.0)
+    losses = np.abs(np.minimum(change, 0.0))
+    avg_gain = np.zeros(n_rows)
+    avg_loss = np.zeros(n_rows)
+    for i in range(period):
+        avg_gain += gains[:, i]
+        avg_loss += losses[:, i]
+    avg_gain /= period
+    avg_loss /= period
+    out[:, period] = _rsi_from_avgs(avg_gain, avg_loss)
+    for i in range(period, n_bars - 1):
+        avg_gain = (avg_gain * (period - 1) + gains[:, i]) / period
+        avg_loss = (avg_loss * (period - 1) + losses[:, i]) / period
+        out[:, i + 1] = _rsi_from_avgs(avg_gain, avg_loss)
+    return out
+
+
+def _rsi_from_avgs(avg_gain, avg_loss):
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rsi = 100 - (100 / (1 + avg_gain / avg_loss))
+    return np.where(avg_loss == 0, 100.0, rsi)
+
+
+def trailing_mean(values, period):
+    """Mean of the last `period` columns of each row (NaN if too few columns)."""
+    values = np.asarray(values, dtype=float)
+    if values.shape[1] < period:
+        return np.full(values.shape[0], np.nan)
+    return np.cumsum(values[:, -period:], axis=1)[:, -1] / period
+
+
+def rolling_mean(values, period):
+    """Trailing `period`-column mean at every column (NaN until `period` columns exist).
+
+    Uses cumulative-sum differences, so values can differ from trailing_mean in
+    the last few ulps; intended for backtests over long histories.
+    """
+    values = np.asarray(values, dtype=float)
+    out = np.full(values.shape, np.nan)
+    if values.shape[1] < period:
+        return out
+    c = np.cumsum(values, axis=1)
+    out[:, period - 1] = c[:, period - 1] / period
+    out[:, period:] = (c[:, period:] - c[:, :-period]) / period
+    return out
+
+
+def compute_indicators(bars_by_ticker, rsi_period=14, sma_period=20, volume_period=20,
+                       rsi_states=None):
+    """Compute scan indicators for every ticker in one pass.
+
+    bars_by_ticker: {ticker: [bar dict, ...]} as returned by get_bars.
+    Returns {ticker: {"rsi", "rsi_prev", "sma", "avg_volume", "close",
+    "volume", "n_bars"}}; values are None where history is too short.
+    Tickers are bucketed by bar count so each bucket is a dense array.
+    With rsi_states ({ticker: lib.rsi.RSIState}, updated in place), RSI comes
+    from advancing each state by its new bars and the RSI matrix is skipped.
+    """
+    state_rsi = None
+    if rsi_states is not None:
+        from .rsi import advance_rsi
+        state_rsi = advance_rsi(rsi_states, bars_by_ticker, rsi_period)
+    buckets = {}
+    for ticker, bars in bars_by_ticker.items():
+        if bars:
+            buckets.setdefault(len(bars), []).append(ticker)
+    result = {}
+    for n_bars, tickers in buckets.items():
+        closes = np.array([[float(b["close"]) for b in bars_by_ticker[t]] for t in tickers])
+        volumes = np.array([[float(b.get("volume") or 0) for b in bars_by_ticker[t]]
+                            for t in tickers])
+        rsi = rsi_matrix(closes, rsi_period) if state_rsi is None else None
+        sma = trailing_mean(closes, sma_period)
+        vol_avg = trailing_mean(volumes, volume_period)
+        for row, ticker in enumerate(tickers):
+            if state_rsi is None:
+                rsi_now = _opt(rsi[row, -1])
+                rsi_prev = _opt(rsi[row, -2]) if n_bars >= 2 else None
+            else:
+                rsi_now, rsi_prev = state_rsi[ticker]
+            result[ticker] = {
+                "rsi": rsi_now,
+                "rsi_prev": rsi_prev,
+                "sma": _opt(sma[row]),
+                "avg_volume": _opt(vol_avg[row]),
+                "close": float(closes[row, -1]),
+                "volume": float(volumes[row, -1]),
+                "n_bars": n_bars,
+            }
+    return result
+
+
+def _opt(x):
+    return None if np.isnan(x) else float(x)
@@ -0,0 +1,154 @@
+"""NYSE trading calendar from a bundled static table (no broker call).
+
+Sessions are weekdays that aren't exchange holidays; regular hours are
+09:30-16:00 America/New_York, 13:00 close on early-close days. The table is
+expanded once into a sorted session list plus a per-calendar-day array
+mapping every date in range to the latest session on or before it, so
+session_index() and the window helpers are O(1). Dates outside the table's
+years fall back to plain weekdays.
+
+Update HOLIDAYS / EARLY_CLOSES each year from the NYSE holiday page.
+"""
+import functools
+from datetime import date, datetime, time, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+ET = ZoneInfo("America/New_York")
+OPEN_TIME = time(9, 30)
+CLOSE_TIME = time(16, 0)
+EARLY_CLOSE_TIME = time(13, 0)
+
+HOLIDAYS = {
+    2025: ["2025-01-01", "2025-01-09", "2025-01-20", "2025-02-17", "2025-04-18",
+           "2025-05-26", "2025-06-19", "2025-07-04", "2025-09-01", "2025-11-27",
+           "2025-12-25"],
+    2026: ["2026-01-01", "2026-01-19", "2026-02-16", "2026-04-03", "2026-05-25",
+           "2026-06-19", "2026-07-03", "2026-09-07", "2026-11-26", "2026-12-25"],
+    2027: ["2027-01-01", "2027-01-18", "2027-02-15", "2027-03-26", "2027-05-31",
+           "2027-06-18", "2027-07-05", "2027-09-06", "2027-11-25", "2027-12-24"],
+}
+EARLY_CLOSES = {
+    2025: ["2025-07-03", "2025-11-28", "2025-12-24"],
+    2026: ["2026-11-27", "2026-12-24"],
+    2027: ["2027-11-26"],
+}
+
+
+class _Table:
+    def __init__(self, first_year, last_year):
+        self.first = date(first_year, 1, 1)
+        self.last = date(last_year, 12, 31)
+        holidays = {d for days in HOLIDAYS.values() for d in days}
+        self.early = {d for days in EARLY_CLOSES.values() for d in days}
+        self.sessions = []        # ISO dates, ascending
+        self.at_or_before = []    # per calendar day from self.first: index into sessions (-1 = none)
+        day = self.first
+        while day <= self.last:
+            iso = day.isoformat()
+            if day.weekday() < 5 and iso not in holidays:
+                self.sessions.append(iso)
+            self.at_or_before.append(len(self.sessions) - 1)
+            day += timedelta(days=1)
+        self.index = {iso: i for i, iso in enumerate(self.sessions)}
+
+
+@functools.lru_cache(maxsize=1)
+def _table():
+    years = sorted(HOLIDAYS)
+    return _Table(years[0], years[-1])
+
+
+def as_date(day):
+    """date for a date, ISO date/timestamp string, or datetime (aware ones in New York time)."""
+    if isinstance(day, datetime):
+        return day.astimezone(ET).date() if day.tzinfo else day.date()
+    if isinstance(day, date):
+        return day
+    text = str(day)
+    if len(text) > 10:
+        return as_date(datetime.fromisoformat(text.replace("Z", "+00:00")))
+    return date.fromisoformat(text)
+
+
+def _weekdays_back(day, n):
+    """Fallback outside the table: step n weekdays back from the weekday on/before day."""
+    while day.weekday() >= 5:
+        day -= timedelta(days=1)
+    while n > 0:
+        day -= timedelta(days=1)
+        if day.weekday() < 5:
+            n -= 1
+    return day
+
+
+def is_session(day) -> bool:
+    """True if day (date, ISO string or datetime) is a trading day."""
+    d = as_date(day)
+    t = _table()
+    if t.first <= d <= t.last:
+        return d.isoformat() in t.index
+    return d.weekday() < 5
+
+
+def session_index(day) -> int:
+    """Index of the latest session on or before day (O(1)); -1 before the table starts.
+
+    Datetimes are converted to New York time first, so a timestamp maps to
+    the session date it falls on.
+    """
+    d = as_date(day)
+    t = _table()
+    if d < t.first:
+        return -1
+    if d > t.last:
+        d = t.last
+    return t.at_or_before[(d - t.first).days]
+
+
+def sessions_back(day, n) -> str:
+    """ISO date of the session n sessions before the latest session on or before day."""
+    d = as_date(day)
+    t = _table()
+    if t.first <= d <= t.last:
+        i = session_index(d) - n
+        if i >= 0:
+            return t.sessions[i]
+    return _weekdays_back(d, n).isoformat()
+
+
+def session_bounds(day):
+    """(open, close) as aware UTC datetimes for session day; None if day isn't a session."""
+    d = as_date(day)
+    if not is_session(d):
+        return None
+    close = EARLY_CLOSE_TIME if d.isoformat() in _table().early else CLOSE_TIME
+    return (datetime.combine(d, OPEN_TIME, ET).astimezone(timezone.utc),
+            datetime.combine(d, close, ET).astimezone(timezone.utc))
+
+
+def is_open(ts=None) -> bool:
+    """True if ts (aware datetime, default now) is within regular trading hours."""
+    ts = ts or datetime.now(timezone.utc)
+    bounds = session_bounds(ts)
+    return bounds is not None and bounds[0] <= ts < bounds[1]
+
+
+def next_open(ts=None):
+    """Open of the next session starting after ts (or now), as an aware UTC datetime."""
+    ts = ts or datetime.now(timezone.utc)
+    d = as_date(ts)
+    for _ in range(15):
+        bounds = session_bounds(d)
+        if bounds and bounds[0] > ts:
+            return bounds[0]
+        d += timedelta(days=1)
+    return None
+
+
+def next_close(ts=None):
+    """Close of the session in progress at ts (or now), else None."""
+    ts = ts or datetime.now(timezone.utc)
+    bounds = session_bounds(ts)
+    if bounds and bounds[0] <= ts < bounds[1]:
+        return bounds[1]
+    return None
@@ -0,0 +1,120 @@
+"""Cycle-scoped snapshot of account, positions and open orders.
+
+One scan cycle used to call get_account()/get_positions() after every phase
+(and get_account() once per buy candidate). MarketState fetches all three once,
+then applies each submitted order locally so later phases see the effect
+without another REST round trip. Call refresh() only where broker truth is
+required (e.g. the end-of-cycle summary).
+"""
+import logging
+
+logger = logging.getLogger("autotrader")
+
+# Positions below this share count are treated as closed after a local sell
+_DUST_QTY = 0.0001
+
+
+class MarketState:
+    """Account + positions + open orders, fetched once and updated locally."""
+
+    def __init__(self):
+        self.account = {}
+        self.positions = []
+        self.open_orders = []
+
+    def refresh(self):
+        """Fetch account, open orders and positions from the broker (3 calls)."""
+        # Imported here so backtests can build a MarketState without the broker SDK
+        from .alpaca_client import get_account, get_open_orders, get_positions
+
+        self.account = get_account() or {}
+        self.open_orders = get_open_orders()
+        self.positions = get_positions(open_orders=self.open_orders)
+        return self
+
+    # ── Read helpers ──────────────────────────────────────────────────────────
+
+    @property
+    def equity(self) -> float:
+        return float(self.account.get("equity", 0))
+
+    @property
+    def buying_power(self) -> float:
+        return float(self.account.get("buying_power", 0))
+
+    @property
+    def cash(self) -> float:
+        return float(self.account.get("cash", 0))
+
+    def position(self, ticker):
+        """Return the position dict for ticker, or None if not held."""
+        for p in self.positions:
+            if p["ticker"] == ticker:
+                return p
+        return None
+
+    def held_tickers(self) -> set:
+        return {p["ticker"] for p in self.positions}
+
+    def total_market_value(self) -> float:
+        return sum(float(p.get("market_value", 0)) for p in self.positions)
+
+    # ── Local updates after order submission ─────────────────────────────────
+
+    def apply_sell(self, ticker, qty):
+        """Reflect a submitted market sell of qty shares: shrink the position, credit proceeds.
+
+        Proceeds (qty x current price) go to buying power and cash, as the
+        account re-fetch after Phase 1 sells used to show, so entries later in
+        the same cycle can spend them.
+        """
+        pos = self.position(ticker)
+        if not pos or qty <= 0:
+            return
+        old_qty = float(pos["qty"])
+        sold = min(qty, old_qty)
+        price = float(pos.get("current_price", 0) or 0)
+        if price <= 0 and old_qty > 0:
+            price = float(pos.get("market_value", 0)) / old_qty
+        proceeds = sold * price
+        self.account["buying_power"] = self.buying_power + proceeds
+        self.account["cash"] = self.cash + proceeds
+        new_qty = max(0.0, old_qty - qty)
+        if new_qty < _DUST_QTY:
+            self.positions.remove(pos)
+            return
+        frac = new_qty / old_qty if old_qty > 0 else 0
+        pos["qty"] = new_qty
+        pos["available_qty"] = max(0.0, float(pos.get("available_qty", old_qty)) - qty)
+        pos["market_value"] = float(pos.get("market_value", 0)) * frac
+        pos["unrealized_pl"] = float(pos.get("unrealized_pl", 0)) * frac
+
+    def apply_buy(self, ticker, notional, price=None):
+        """Reflect a submitted notional buy: spend buying power/cash, grow the position.
+
+        price is used to estimate shares for a new position; without it the
+        buying power is still reserved but no position is added.
+        """
+        if notional <= 0:
+            return
+        self.account["buying_power"] = max(0.0, self.buying_power - notional)
+        self.account["cash"] = self.cash - notional
+        pos = self.position(ticker)
+        if pos:
+            cur_price = float(pos.get("current_price", 0)) or (price or 0)
+            added = notional / cur_price if cur_price > 0 else 0
+            pos["qty"] = float(pos["qty"]) + added
+            pos["available_qty"] = float(pos.get("available_qty", 0)) + added
+            pos["market_value"] = float(pos.get("market_value", 0)) + notional
+        elif price and price > 0:
+            shares = notional / price
+            self.positions.append({
+                "ticker": ticker,
+                "qty": shares,
+                "available_qty": shares,
+                "avg_entry": price,
+                "current_price": price,
+                "unrealized_pl": 0.0,
+                "unrealized_plpc": 0.0,
+                "market_value": notional,
+            })
@@ -1,18 +1,25 @@
 """Pattern Day Trader (PDT) protection for accounts under $25K.
 
 FINRA rule: accounts under $25K are limited to 3 day trades in any rolling
-5-business-day window. A "day trade" is opening and closing the same symbol
-on the same calendar day.
-
-This module tracks day trades in a JSONL file and exposes helpers to check
-whether a new buy or sell would trigger a day trade, and whether the PDT
-limit has been reached.
+5-business-day window (NYSE sessions, per lib.market_calendar). A "day
+trade" is opening and closing the same symbol on the same calendar day.
+
+This module tracks day trades in an append-only JSONL file and exposes
+helpers to check whether a new buy or sell would trigger a day trade, and
+whether the PDT limit has been reached. PDTLedger reads the file once per
+cycle and keeps the in-window trades in a deque, so remaining-trade queries
+don't re-read or re-parse it.
 """
 import json
 import logging
-from datetime import datetime, timedelta
+import os
+import tempfile
+from collections import deque
+from datetime import date, datetime
 from pathlib import Path
 
+from . import market_calendar
+
 logger = logging.getLogger("autotrader.pdt")
 
 _PDT_FILE = Path(__file__).resolve().parent.parent / "logs" / "pdt_trades.jsonl"
@@ -26,40 +33,115 @@ def is_pdt_restricted(equity: float) -> bool:
     return equity < PDT_EQUITY_THRESHOLD
 
 
-def _load_recent_trades() -> list:
-    """Load day-trade records from the last PDT_WINDOW_DAYS."""
-    if not _PDT_FILE.exists():
-        return []
-    cutoff = (datetime.utcnow() - timedelta(days=PDT_WINDOW_DAYS + 2)).strftime("%Y-%m-%d")
-    records = []
-    for line in _PDT_FILE.read_text(encoding="utf-8").strip().splitlines():
+def window_start(today: str) -> str:
+    """First session date (YYYY-MM-DD) of the PDT window ending on today: the latest
+    session on or before today plus the previous PDT_WINDOW_DAYS - 1 sessions."""
+    return market_calendar.sessions_back(today, PDT_WINDOW_DAYS - 1)
+
+
+class PDTLedger:
+    """Day trades in the current window, loaded once from _PDT_FILE.
+
+    Trades are kept oldest-first in a deque; count() drops anything that has
+    left the window and returns its length. record() appends one line to the
+    file (never rewrites it); compact() drops out-of-window lines and only
+    rewrites the file when there are any.
+    """
+
+    def __init__(self, today: str = None, path: Path = None):
+        self.today = today or datetime.utcnow().strftime("%Y-%m-%d")
+        self.path = path or _PDT_FILE
+        self.trades = deque()
+        self.stale_lines = 0
+
+    @classmethod
+    def load(cls, today: str = None, path: Path = None) -> "PDTLedger":
+        ledger = cls(today, path)
+        start = window_start(ledger.today)
         try:
-            rec = json.loads(line)
-            if rec.get("date", "") >= cutoff:
-                records.append(rec)
-        except json.JSONDecodeError:
-            continue
-    return records
+            f = open(ledger.path, encoding="utf-8")
+        except FileNotFoundError:
+            return ledger
+        with f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    rec = json.loads(line)
+                    day = str(rec["date"])
+                    date.fromisoformat(day)
+                except (ValueError, KeyError, TypeError):
+                    logger.warning("PDT: skipping malformed record: %s", line.strip()[:80])
+                    ledger.stale_lines += 1
+                    continue
+                if day >= start:
+                    ledger.trades.append(rec)
+                else:
+                    ledger.stale_lines += 1
+        if any(ledger.trades[i]["date"] > ledger.trades[i + 1]["date"]
+               for i in range(len(ledger.trades) - 1)):
+            ledger.trades = deque(sorted(ledger.trades, key=lambda r: r["date"]))
+        return ledger
+
+    def _expire(self):
+        start = window_start(self.today)
+        while self.trades and self.trades[0]["date"] < start:
+            self.trades.popleft()
+            self.stale_lines += 1
+
+    def advance(self, today: str):
+        """Move the window forward (long-running processes crossing midnight)."""
+        if today != self.today:
+            self.today = today
+            self._expire()
+
+    def count(self) -> int:
+        self._expire()
+        return len(self.trades)
+
+    def remaining(self) -> int:
+        return max(0, PDT_LIMIT - self.count())
+
+    def record(self, ticker: str, today: str = None):
+        """Append a day trade to the file and the in-memory window."""
+        if today:
+            self.advance(today)
+        entry = {"date": self.today, "ticker": ticker,
+                 "timestamp": datetime.utcnow().isoformat() + "Z"}
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry) + "\n")
+        self.trades.append(entry)
+        logger.warning("PDT: recorded day trade for %s (total: %d/%d in window)",
+                       ticker, self.count(), PDT_LIMIT)
+
+    def compact(self):
+        """Rewrite the file with only in-window trades, if anything is stale (atomic rename)."""
+        self._expire()
+        if not self.stale_lines or not self.path.exists():
+            return
+        fd, tmp = tempfile.mkstemp(dir=self.path.parent, prefix=".pdt_trades.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.writelines(json.dumps(rec) + "\n" for rec in self.trades)
+            os.replace(tmp, self.path)
+        except BaseException:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+            raise
+        self.stale_lines = 0
 
 
 def count_day_trades() -> int:
     """Count day trades in the rolling 5-business-day window."""
-    records = _load_recent_trades()
-    cutoff = datetime.utcnow() - timedelta(days=PDT_WINDOW_DAYS + 2)
-    count = 0
-    for rec in records:
-        try:
-            dt = datetime.strptime(rec["date"], "%Y-%m-%d")
-            if dt >= cutoff:
-                count += 1
-        except (KeyError, ValueError):
-            continue
-    return count
+    return PDTLedger.load().count()
 
 
 def day_trades_remaining() -> int:
     """How many day trades are still allowed in the current window."""
-    return max(0, PDT_LIMIT - count_day_trades())
+    return PDTLedger.load().remaining()
 
 
 def would_be_day_trade(ticker: str, side: str, today: str,
@@ -80,24 +162,51 @@ def would_be_day_trade(ticker: str, side: str, today: str,
     return False
 
 
+class PDTBudget:
+    """In-memory day-trade check for one cycle (no file I/O).
+
+    remaining: day trades left in the window (PDTLedger.remaining()).
+    decisions: today's lib.decisions.DecisionIndex, for O(1) round-trip
+    lookups; the executor adds each submitted trade to it.
+    ledger: the cycle's PDTLedger, if any. Allowed day trades are deducted
+    here; the caller persists them with record_day_trade once the order is
+    actually submitted.
+    """
+
+    def __init__(self, remaining: int, decisions, ledger=None):
+        self.remaining = remaining
+        self.decisions = decisions
+        self.ledger = ledger
+
+    @classmethod
+    def from_ledger(cls, ledger, decisions) -> "PDTBudget":
+        return cls(ledger.remaining(), decisions, ledger)
+
+    def record_day_trade(self, ticker: str, today: str):
+        """Persist a submitted day trade (through the cycle's ledger when there is one)."""
+        if self.ledger is not None:
+            self.ledger.record(ticker, today)
+        else:
+            record_day_trade(ticker, today)
+
+    def check(self, ticker: str, side: str):
+        """Return (allowed, is_day_trade) for a trade."""
+        if not self.decisions.has_opposite(ticker, side):
+            return True, False
+        if self.remaining <= 0:
+            logger.warning("PDT BLOCKED %s %s: 0 day trades remaining", side.upper(), ticker)
+            return False, True
+        logger.warning("PDT: %s %s would use day trade (%d remaining)",
+                       side.upper(), ticker, self.remaining)
+        self.remaining -= 1
+        return True, True
+
+
 def record_day_trade(ticker: str, today: str):
     """Record that a day trade occurred."""
-    _PDT_FILE.parent.mkdir(parents=True, exist_ok=True)
-    entry = {"date": today, "ticker": ticker,
-             "timestamp": datetime.utcnow().isoformat() + "Z"}
-    with open(_PDT_FILE, "a") as f:
-        f.write(json.dumps(entry) + "\n")
-    logger.warning("PDT: recorded day trade for %s (total: %d/%d in window)",
-                   ticker, count_day_trades(), PDT_LIMIT)
+    PDTLedger.load(today).record(ticker)
 
 
 def cleanup_old_records():
     """Remove records older than the PDT window."""
-    if not _PDT_FILE.exists():
-        return
-    cutoff = (datetime.utcnow() - timedelta(days=PDT_WINDOW_DAYS + 2)).strftime("%Y-%m-%d")
-    lines = _PDT_FILE.read_text(encoding="utf-8").strip().splitlines()
-    kept = [ln for ln in lines
-            if ln.strip() and json.loads(ln).get("date", "") >= cutoff]
-    if len(kept) < len(lines):
-        _PDT_FILE.write_text("\n".join(kept) + ("\n" if kept else ""))
+    PDTLedger.load().compact()
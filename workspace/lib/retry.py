@@ -0,0 +1,163 @@
+"""Retry policy for broker API calls.
+
+Errors are classified before retrying: network failures, timeouts, 429 and
+5xx are retried; other HTTP errors (insufficient buying power, bad symbol, auth)
+and local errors fail immediately. Retries back off exponentially with full
+jitter, or wait the server's Retry-After when it sends one. All retry sleeps in
+a cycle draw from one shared budget so an outage can't stall a scan for long;
+once it is spent, failures are raised on first error until the next reset.
+"""
+import logging
+import random
+import threading
+import time
+
+logger = logging.getLogger("autotrader.retry")
+
+RETRYABLE_STATUS = {408, 425, 429, 500, 502, 503, 504}
+
+
+def status_code(exc):
+    """HTTP status from an alpaca APIError / requests HTTPError, else None."""
+    try:
+        code = getattr(exc, "status_code", None)
+    except Exception:
+        code = None
+    if code is None:
+        code = getattr(getattr(exc, "response", None), "status_code", None)
+    return code
+
+
+def is_retryable(exc) -> bool:
+    """True for transient failures: network errors, timeouts, 429 and 5xx."""
+    code = status_code(exc)
+    if code is not None:
+        return code in RETRYABLE_STATUS
+    # requests' ConnectionError/Timeout subclass OSError; so do socket errors
+    return isinstance(exc, (OSError, TimeoutError, ConnectionError))
+
+
+def retry_after(exc):
+    """Seconds from a Retry-After header on the error's response, or None."""
+    try:
+        headers = getattr(getattr(exc, "response", None), "headers", None) or {}
+        value = headers.get("Retry-After")
+    except Exception:
+        return None
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    from email.utils import parsedate_to_datetime  # HTTP-date form only; rare
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class RetryMetrics:
+    """Thread-safe counters: calls, retries, sleep seconds, terminal / exhausted failures."""
+
+    FIELDS = ("calls", "retries", "retry_sleep_sec", "terminal_errors", "exhausted",
+              "budget_exhausted")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._counts = dict.fromkeys(self.FIELDS, 0)
+            self._by_status = {}
+
+    def add(self, name, value=1):
+        with self._lock:
+            self._counts[name] += value
+
+    def add_status(self, code):
+        with self._lock:
+            key = str(code or "network")
+            self._by_status[key] = self._by_status.get(key, 0) + 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            out = dict(self._counts)
+            out["retry_sleep_sec"] = round(out["retry_sleep_sec"], 2)
+            out["by_status"] = dict(self._by_status)
+            return out
+
+
+class RetryBudget:
+    """Total seconds of retry sleep allowed until the next reset (shared across threads)."""
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self._lock = threading.Lock()
+        self.remaining = seconds
+
+    def reset(self, seconds=None):
+        with self._lock:
+            if seconds is not None:
+                self.seconds = seconds
+            self.remaining = self.seconds
+
+    def take(self, delay):
+        """Reserve delay seconds; returns False (and reserves nothing) if it doesn't fit."""
+        with self._lock:
+            if delay > self.remaining:
+                return False
+            self.remaining -= delay
+            return True
+
+
+class RetryPolicy:
+    """Exponential backoff with full jitter, Retry-After, budget and metrics."""
+
+    def __init__(self, max_attempts=3, base_delay=0.5, max_delay=8.0, budget=None,
+                 metrics=None):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.budget = budget
+        self.metrics = metrics or RetryMetrics()
+
+    def delay(self, attempt, exc):
+        """Sleep before retry number `attempt` (1-based)."""
+        server = retry_after(exc)
+        if server is not None:
+            return server
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+    def call(self, fn, *args, before_attempt=None, max_attempts=None, **kwargs):
+        """Run fn with retries; raises the last error when not retryable or out of attempts/budget."""
+        max_attempts = max_attempts or self.max_attempts
+        self.metrics.add("calls")
+        for attempt in range(1, max_attempts + 1):
+            if before_attempt:
+                before_attempt()
+            try:
+                return fn(*args, **kwargs)
+            except Exception as e:
+                code = status_code(e)
+                if not is_retryable(e):
+                    self.metrics.add("terminal_errors")
+                    logger.warning("Not retrying (%s): %s", code or type(e).__name__, e)
+                    raise
+                self.metrics.add_status(code)
+                if attempt == max_attempts:
+                    self.metrics.add("exhausted")
+                    logger.warning("Attempt %s/%s failed: %s", attempt, max_attempts, e)
+                    raise
+                wait = self.delay(attempt, e)
+                if self.budget is not None and not self.budget.take(wait):
+                    self.metrics.add("budget_exhausted")
+                    logger.warning("Retry budget spent, giving up after attempt %s: %s",
+                                   attempt, e)
+                    raise
+                self.metrics.add("retries")
+                self.metrics.add("retry_sleep_sec", wait)
+                logger.warning("Attempt %s/%s failed (%s), retrying in %.1fs: %s",
+                               attempt, max_attempts, code or "network", wait, e)
+                time.sleep(wait)
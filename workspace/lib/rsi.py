@@ -1,5 +1,16 @@
 """RSI(14) with Wilder smoothing + helpers for trend/momentum confirmation.
-Expects closes sorted by date ascending."""
+Expects closes sorted by date ascending.
+
+Single-series reference implementation; the scan uses lib.indicators, which
+computes the same values for the whole watchlist in one vectorized pass.
+RSIState carries the Wilder averages between scans (logs/rsi_state.json), so
+the scan's RSI only folds in bars newer than the last run."""
+import json
+import os
+import tempfile
+from pathlib import Path
+
+from .config import RSI_STATE_PATH
 
 
 def compute_rsi(close_prices, period=14):
@@ -83,3 +94,161 @@ def rsi_turning_up(close_prices, period=14):
     if cur is None or prev is None:
         return False
     return cur > prev
+
+
+class RSIState:
+    """Incremental Wilder RSI for one ticker: O(1) per new close.
+
+    Holds avg_gain/avg_loss, the last committed close and the last two RSI
+    values. update(close) commits a bar; peek(close) previews the RSI an
+    uncommitted (e.g. still-open intraday) bar would give. Values match
+    compute_rsi_series for the same closes. Serializable via to_dict/from_dict.
+    """
+
+    def __init__(self, period=14):
+        self.period = period
+        self.avg_gain = None
+        self.avg_loss = None
+        self.last_close = None
+        self.last_date = None
+        self.rsi = None
+        self.prev_rsi = None
+        # Gains/losses collected until the first `period` changes seed the averages
+        self._seed = []
+
+    def _step(self, close):
+        """Return (avg_gain, avg_loss, seed) after adding close, without mutating."""
+        change = close - self.last_close
+        gain = max(change, 0)
+        loss = abs(min(change, 0))
+        if self.avg_gain is not None:
+            avg_gain = (self.avg_gain * (self.period - 1) + gain) / self.period
+            avg_loss = (self.avg_loss * (self.period - 1) + loss) / self.period
+            return avg_gain, avg_loss, None
+        seed = self._seed + [(gain, loss)]
+        if len(seed) < self.period:
+            return None, None, seed
+        avg_gain = sum(g for g, _ in seed) / self.period
+        avg_loss = sum(lo for _, lo in seed) / self.period
+        return avg_gain, avg_loss, None
+
+    @staticmethod
+    def _rsi(avg_gain, avg_loss):
+        if avg_gain is None:
+            return None
+        if avg_loss == 0:
+            return 100.0
+        return 100 - (100 / (1 + avg_gain / avg_loss))
+
+    def update(self, close, date=None):
+        """Commit a completed bar's close. Returns the new RSI (None while warming up)."""
+        close = float(close)
+        if self.last_close is not None:
+            avg_gain, avg_loss, seed = self._step(close)
+            self.avg_gain, self.avg_loss = avg_gain, avg_loss
+            self._seed = seed or []
+            rsi = self._rsi(avg_gain, avg_loss)
+            if rsi is not None:
+                self.prev_rsi, self.rsi = self.rsi, rsi
+        self.last_close = close
+        if date is not None:
+            self.last_date = date
+        return self.rsi
+
+    def peek(self, close):
+        """RSI if close were the next bar, without committing it."""
+        if self.last_close is None:
+            return None
+        avg_gain, avg_loss, _ = self._step(float(close))
+        return self._rsi(avg_gain, avg_loss)
+
+    def advance(self, bars):
+        """Commit every completed bar newer than last_date and peek at the last one.
+
+        bars: bar dicts sorted ascending; the final bar is treated as possibly
+        still open (today's daily bar) and is only previewed. Returns
+        (rsi_now, rsi_prev) where rsi_prev is the RSI of the last completed bar.
+        """
+        if not bars:
+            return None, None
+        if self.last_date is not None and bars[0]["date"] > self.last_date:
+            # Bars between last_date and this window are missing: replay from scratch
+            self.__init__(self.period)
+        for b in bars[:-1]:
+            if self.last_date is None or b["date"] > self.last_date:
+                self.update(b["close"], b["date"])
+        return self.peek(bars[-1]["close"]), self.rsi
+
+    @classmethod
+    def from_closes(cls, close_prices, period=14):
+        state = cls(period)
+        for c in close_prices:
+            state.update(c)
+        return state
+
+    def to_dict(self):
+        return {
+            "period": self.period, "avg_gain": self.avg_gain, "avg_loss": self.avg_loss,
+            "last_close": self.last_close, "last_date": self.last_date,
+            "rsi": self.rsi, "prev_rsi": self.prev_rsi, "seed": self._seed,
+        }
+
+    @classmethod
+    def from_dict(cls, d):
+        state = cls(d.get("period", 14))
+        state.avg_gain = d.get("avg_gain")
+        state.avg_loss = d.get("avg_loss")
+        state.last_close = d.get("last_close")
+        state.last_date = d.get("last_date")
+        state.rsi = d.get("rsi")
+        state.prev_rsi = d.get("prev_rsi")
+        state._seed = [tuple(x) for x in d.get("seed", [])]
+        return state
+
+
+def load_rsi_states(path=RSI_STATE_PATH):
+    """Load {ticker: RSIState} from a JSON file written by save_rsi_states."""
+    path = Path(path)
+    if not path.exists():
+        return {}
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+        return {t: RSIState.from_dict(d) for t, d in data.items()}
+    except (json.JSONDecodeError, OSError, AttributeError, TypeError):
+        return {}
+
+
+def save_rsi_states(states, path=RSI_STATE_PATH):
+    """Write states atomically (temp file + rename)."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump({t: s.to_dict() for t, s in states.items()}, f, separators=(",", ":"))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+
+def advance_rsi(states, bars_by_ticker, period=14):
+    """Advance each ticker's state (created as needed) with its new bars only.
+
+    Returns {ticker: (rsi, rsi_prev)} like compute_indicators' rsi/rsi_prev:
+    today's bar previewed, and the last completed bar.
+    """
+    result = {}
+    for ticker, bars in bars_by_ticker.items():
+        if not bars:
+            continue
+        state = states.get(ticker)
+        if state is None or state.period != period:
+            state = states[ticker] = RSIState(period)
+        result[ticker] = state.advance(bars)
+    return result
@@ -0,0 +1,117 @@
+"""Single-instance guard for scan runs (cron one-shot, daemon cycles, stream exits).
+
+Uses flock on logs/scan.lock: the kernel releases the lock when the holder
+exits, so a crashed run can't leave it stuck. The lock file also records the
+holder's pid, mode and start time. A run that finds the lock taken can then
+report how long the holder has been running. It also flags a holder that is
+past STUCK_AFTER_SEC, or whose pid is gone while the lock is still held.
+Skipped runs are appended to logs/scan_skips.jsonl.
+"""
+import fcntl
+import json
+import logging
+import os
+import time
+from datetime import datetime
+
+from .config import LOGS_DIR
+
+logger = logging.getLogger("autotrader.lock")
+
+SCAN_LOCK_FILE = LOGS_DIR / "scan.lock"
+SCAN_SKIPS_FILE = LOGS_DIR / "scan_skips.jsonl"
+STUCK_AFTER_SEC = 300
+_POLL_SEC = 0.2
+
+
+def _pid_alive(pid) -> bool:
+    try:
+        os.kill(int(pid), 0)
+    except (ProcessLookupError, ValueError, TypeError):
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class ScanLock:
+    """Exclusive, non-reentrant scan lock (acquire()/release())."""
+
+    def __init__(self, mode="scan", path=SCAN_LOCK_FILE):
+        self.mode = mode
+        self.path = path
+        self._fd = None
+
+    def acquire(self, wait=0.0) -> bool:
+        """Take the lock, polling up to `wait` seconds. False if another run holds it."""
+        LOGS_DIR.mkdir(parents=True, exist_ok=True)
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        deadline = time.monotonic() + wait
+        while True:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                break
+            except BlockingIOError:
+                if time.monotonic() >= deadline:
+                    os.close(fd)
+                    return False
+                time.sleep(_POLL_SEC)
+        info = {"pid": os.getpid(), "mode": self.mode, "started": time.time(),
+                "started_at": datetime.utcnow().isoformat() + "Z"}
+        os.ftruncate(fd, 0)
+        os.pwrite(fd, json.dumps(info).encode(), 0)
+        self._fd = fd
+        return True
+
+    def release(self):
+        if self._fd is None:
+            return
+        try:
+            os.ftruncate(self._fd, 0)
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+        finally:
+            os.close(self._fd)
+            self._fd = None
+
+    def holder(self) -> dict:
+        """Who holds the lock: pid, mode, runtime_sec, and stale/stuck flags ({} if unknown)."""
+        try:
+            info = json.loads(self.path.read_text() or "{}")
+        except (OSError, ValueError):
+            return {}
+        if not info:
+            return {}
+        runtime = time.time() - float(info.get("started", time.time()))
+        info["runtime_sec"] = round(runtime, 1)
+        info["stale"] = not _pid_alive(info.get("pid"))
+        info["stuck"] = runtime > STUCK_AFTER_SEC
+        return info
+
+
+def record_skip(lock, waited=0.0) -> dict:
+    """Append a skip record for `lock` (the run that couldn't start) and return it."""
+    holder = lock.holder()
+    rec = {
+        "timestamp": datetime.utcnow().isoformat() + "Z",
+        "mode": lock.mode,
+        "pid": os.getpid(),
+        "waited_sec": round(waited, 1),
+        "holder_pid": holder.get("pid"),
+        "holder_mode": holder.get("mode"),
+        "holder_runtime_sec": holder.get("runtime_sec"),
+        "holder_stale": holder.get("stale", False),
+        "holder_stuck": holder.get("stuck", False),
+    }
+    if rec["holder_stale"]:
+        logger.warning("Scan lock held but holder pid %s is not running (inherited fd?)",
+                       rec["holder_pid"])
+    elif rec["holder_stuck"]:
+        logger.warning("Scan lock holder pid %s has run %.0fs (> %ss) — possibly stuck",
+                       rec["holder_pid"], rec["holder_runtime_sec"], STUCK_AFTER_SEC)
+    try:
+        LOGS_DIR.mkdir(parents=True, exist_ok=True)
+        with open(SCAN_SKIPS_FILE, "a", encoding="utf-8") as f:
+            f.write(json.dumps(rec) + "\n")
+    except OSError as e:
+        logger.warning("Could not record scan skip: %s", e)
+    return rec
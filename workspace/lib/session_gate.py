@@ -0,0 +1,118 @@
+"""Market-hours gate for scan runs: local calendar first, broker clock only to confirm.
+
+check() decides from lib.market_calendar plus the last Alpaca clock cached in
+logs/market_clock.json (valid until its next_open / next_close). It is
+stdlib-only, so an off-hours cron run can exit before the broker SDK is
+imported. When the calendar says open but no cached clock covers now,
+the decision comes back with verify=True; the caller fetches get_clock() and
+passes it to confirm(), which caches it. That is one clock call per session
+transition, and it catches closures the static table doesn't know about.
+
+Modes widen the window: "pre" adds 04:00 ET to the open, "post" adds the close
+to 20:00 ET, "extended" adds both. Market orders sent outside regular hours
+queue until the open.
+"""
+import json
+import logging
+from collections import namedtuple
+from datetime import datetime, time, timedelta, timezone
+
+from . import market_calendar
+from .config import LOGS_DIR
+
+logger = logging.getLogger("autotrader")
+
+CLOCK_CACHE_FILE = LOGS_DIR / "market_clock.json"
+SESSION_MODES = ("regular", "pre", "post", "extended")
+PRE_MARKET_OPEN = time(4, 0)
+POST_MARKET_CLOSE = time(20, 0)
+
+# open: run the scan; until: when the answer can next change (aware UTC, or None);
+# verify: calendar-only "open", confirm with the broker clock
+GateDecision = namedtuple("GateDecision", "open reason until verify")
+
+
+def window(day, mode="regular"):
+    """(start, end) aware UTC datetimes the gate is open on session day, else None."""
+    bounds = market_calendar.session_bounds(day)
+    if bounds is None:
+        return None
+    start, end = bounds
+    d = market_calendar.as_date(day)
+    if mode in ("pre", "extended"):
+        start = datetime.combine(d, PRE_MARKET_OPEN, market_calendar.ET).astimezone(timezone.utc)
+    if mode in ("post", "extended"):
+        end = datetime.combine(d, POST_MARKET_CLOSE, market_calendar.ET).astimezone(timezone.utc)
+    return start, end
+
+
+def _next_window_start(now, mode):
+    d = market_calendar.as_date(now)
+    for _ in range(15):
+        win = window(d, mode)
+        if win and win[0] > now:
+            return win[0]
+        d += timedelta(days=1)
+    return None
+
+
+def _boundary(clock):
+    return datetime.fromisoformat(clock["next_close" if clock["is_open"] else "next_open"])
+
+
+def load_clock(now=None):
+    """Cached broker clock if it is still valid at now, else None."""
+    now = now or datetime.now(timezone.utc)
+    try:
+        clock = json.loads(CLOCK_CACHE_FILE.read_text())
+        if now < _boundary(clock):
+            return clock
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+    return None
+
+
+def save_clock(clock):
+    try:
+        LOGS_DIR.mkdir(parents=True, exist_ok=True)
+        CLOCK_CACHE_FILE.write_text(json.dumps(clock))
+    except OSError as e:
+        logger.warning("Could not cache market clock: %s", e)
+
+
+def check(mode="regular", now=None) -> GateDecision:
+    """Gate decision without network or SDK imports."""
+    now = now or datetime.now(timezone.utc)
+    clock = load_clock(now)
+    if mode == "regular" and clock is not None:
+        if clock["is_open"]:
+            return GateDecision(True, "market open", _boundary(clock), False)
+        return GateDecision(False, f"market closed, next open {clock['next_open']}",
+                            _boundary(clock), False)
+    if mode == "regular":
+        if market_calendar.is_open(now):
+            return GateDecision(True, "market open (calendar)", market_calendar.next_close(now),
+                                clock is None)
+        start = market_calendar.next_open(now)
+    else:
+        win = window(now, mode)
+        if win and win[0] <= now < win[1]:
+            return GateDecision(True, "market open (calendar)", win[1], clock is None)
+        start = _next_window_start(now, mode)
+    label = "market" if mode == "regular" else f"{mode}-market session"
+    return GateDecision(False, f"{label} closed, next open "
+                        f"{start.astimezone(market_calendar.ET).isoformat() if start else '?'}",
+                        start, False)
+
+
+def confirm(clock, mode="regular", now=None) -> GateDecision:
+    """Cache a freshly fetched broker clock and decide from it."""
+    now = now or datetime.now(timezone.utc)
+    save_clock(clock)
+    if clock["is_open"]:
+        return GateDecision(True, "market open", _boundary(clock), False)
+    if mode == "regular" or market_calendar.is_open(now):
+        # Closed when the calendar expected a session (unscheduled closure)
+        return GateDecision(False, f"market closed (broker clock), next open {clock['next_open']}",
+                            _boundary(clock), False)
+    return check(mode, now)
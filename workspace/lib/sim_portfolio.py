@@ -4,14 +4,29 @@ Maintains a JSON file that tracks positions, cash, and P&L independently
 from the real Alpaca account. This lets the dashboard show how the bot
 performs on a small simulated balance (e.g. $100) while the real paper
 account has $100K.
+
+Trades go through a SimSession: the file is loaded once, any number of trades
+are applied in memory, and commit() writes it once via a temp file + rename,
+so a crash mid-write leaves the previous portfolio intact.
+
+The state file holds only cash, positions and realized P&L. Trade history is
+appended to sim_trades.jsonl, with sim_trades.idx holding one fixed-width
+(8-byte) byte offset per trade, so get_trades() can seek straight to any page
+without reading the whole history.
 """
 import json
 import logging
+import os
+import struct
+import tempfile
 from pathlib import Path
 
 logger = logging.getLogger("autotrader.sim")
 
 SIM_FILE = Path(__file__).resolve().parent.parent / "logs" / "sim_portfolio.json"
+TRADES_FILE = SIM_FILE.with_name("sim_trades.jsonl")
+TRADES_INDEX = SIM_FILE.with_name("sim_trades.idx")
+_OFFSET = struct.Struct(">Q")
 
 
 def _load() -> dict:
@@ -24,8 +39,229 @@ def _load() -> dict:
 
 
 def _save(data: dict):
+    """Atomically replace SIM_FILE: write a temp file in the same directory, fsync, rename."""
+    SIM_FILE.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=SIM_FILE.parent, prefix=".sim_portfolio.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f, separators=(",", ":"))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, SIM_FILE)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+
+def _rebuild_index():
+    """Recreate TRADES_INDEX by scanning TRADES_FILE (after a crash between the two appends)."""
+    offsets = []
+    if TRADES_FILE.exists():
+        with open(TRADES_FILE, "rb") as f:
+            pos = 0
+            for line in f:
+                if line.strip():
+                    offsets.append(pos)
+                pos += len(line)
+    with open(TRADES_INDEX, "wb") as f:
+        f.write(b"".join(_OFFSET.pack(o) for o in offsets))
+    logger.warning("SIM: rebuilt trade index (%d trades)", len(offsets))
+
+
+def _index_in_sync() -> bool:
+    """True if the index covers every line of TRADES_FILE (checks only the last entry)."""
+    n = trade_count()
+    if not TRADES_FILE.exists():
+        return n == 0
+    size = TRADES_FILE.stat().st_size
+    if n == 0:
+        return size == 0
+    with open(TRADES_INDEX, "rb") as idx:
+        idx.seek((n - 1) * _OFFSET.size)
+        (last,) = _OFFSET.unpack(idx.read(_OFFSET.size))
+    with open(TRADES_FILE, "rb") as f:
+        f.seek(last)
+        line = f.readline()
+    return last + len(line) == size and line.endswith(b"\n")
+
+
+def _append_trades(trades: list):
+    """Append trades to the ledger: data lines first, then their offsets."""
+    if not trades:
+        return
     SIM_FILE.parent.mkdir(parents=True, exist_ok=True)
-    SIM_FILE.write_text(json.dumps(data, indent=2))
+    if not _index_in_sync():
+        _rebuild_index()
+    offsets = []
+    with open(TRADES_FILE, "ab") as f:
+        pos = f.seek(0, os.SEEK_END)
+        for t in trades:
+            line = (json.dumps(t, separators=(",", ":")) + "\n").encode()
+            offsets.append(pos)
+            f.write(line)
+            pos += len(line)
+        f.flush()
+        os.fsync(f.fileno())
+    with open(TRADES_INDEX, "ab") as idx:
+        idx.write(b"".join(_OFFSET.pack(o) for o in offsets))
+
+
+def trade_count() -> int:
+    """Number of indexed trades in the ledger."""
+    try:
+        return TRADES_INDEX.stat().st_size // _OFFSET.size
+    except OSError:
+        return 0
+
+
+def get_trades(limit: int = 20, offset: int = 0) -> list:
+    """Page of trades, oldest first: skip the newest `offset`, return up to `limit` before them."""
+    total = trade_count()
+    end = max(total - max(offset, 0), 0)
+    start = max(end - max(limit, 0), 0)
+    if start >= end or not TRADES_FILE.exists():
+        return []
+    with open(TRADES_INDEX, "rb") as idx:
+        idx.seek(start * _OFFSET.size)
+        (first,) = _OFFSET.unpack(idx.read(_OFFSET.size))
+    trades = []
+    with open(TRADES_FILE, "rb") as f:
+        f.seek(first)
+        for _ in range(end - start):
+            line = f.readline()
+            if not line:
+                break
+            try:
+                trades.append(json.loads(line))
+            except json.JSONDecodeError:
+                logger.warning("SIM: skipping malformed ledger line at %d", f.tell() - len(line))
+    return trades
+
+
+def _reset_ledger():
+    for path in (TRADES_FILE, TRADES_INDEX):
+        try:
+            path.unlink()
+        except FileNotFoundError:
+            pass
+
+
+class SimSession:
+    """Load the sim portfolio once, apply trades in memory, write once on commit().
+
+    As a context manager it commits on a clean exit and discards on error.
+    """
+
+    def __init__(self):
+        self.data = _load()
+        self.new_trades = []
+        # Legacy files kept the full history inline; move it to the ledger on next commit
+        legacy = self.data.pop("trades", None)
+        self.dirty = legacy is not None
+        if legacy and trade_count() == 0:
+            self.new_trades.extend(legacy)
+
+    def buy(self, ticker: str, notional: float, price: float, timestamp: str):
+        """Record a notional buy."""
+        data = self.data
+        if not data:
+            return
+        if notional > data.get("cash", 0):
+            logger.warning("SIM: buy %s $%.2f exceeds cash $%.2f, capping",
+                           ticker, notional, data["cash"])
+            notional = data["cash"]
+        if notional <= 0:
+            return
+        shares = notional / price if price > 0 else 0
+        positions = data.get("positions", {})
+        if ticker in positions:
+            old = positions[ticker]
+            old_shares = old["shares"]
+            old_cost = old["avg_entry"] * old_shares
+            new_shares = old_shares + shares
+            new_avg = (old_cost + notional) / new_shares if new_shares > 0 else price
+            positions[ticker] = {
+                "shares": round(new_shares, 6),
+                "avg_entry": round(new_avg, 4),
+                "notional_cost": round(old.get("notional_cost", old_cost) + notional, 2),
+            }
+        else:
+            positions[ticker] = {
+                "shares": round(shares, 6),
+                "avg_entry": round(price, 4),
+                "notional_cost": round(notional, 2),
+            }
+        data["cash"] = round(data.get("cash", 0) - notional, 2)
+        data["positions"] = positions
+        self.new_trades.append({
+            "timestamp": timestamp, "action": "buy", "ticker": ticker,
+            "notional": round(notional, 2), "shares": round(shares, 6),
+            "price": round(price, 4),
+        })
+        self.dirty = True
+
+    def sell(self, ticker: str, qty: float, price: float, timestamp: str):
+        """Record a sell. qty = share count to sell."""
+        data = self.data
+        if not data:
+            return
+        positions = data.get("positions", {})
+        if ticker not in positions:
+            return
+        pos = positions[ticker]
+        sell_qty = min(qty, pos["shares"])
+        if sell_qty <= 0:
+            return
+        proceeds = sell_qty * price
+        cost_basis = sell_qty * pos["avg_entry"]
+        pl = proceeds - cost_basis
+        data["realized_pl"] = round(data.get("realized_pl", 0) + pl, 2)
+        data["cash"] = round(data.get("cash", 0) + proceeds, 2)
+        remaining = pos["shares"] - sell_qty
+        if remaining < 0.0001:
+            del positions[ticker]
+        else:
+            positions[ticker] = {
+                "shares": round(remaining, 6),
+                "avg_entry": pos["avg_entry"],
+                "notional_cost": round(
+                    pos.get("notional_cost", 0) * (remaining / pos["shares"]), 2),
+            }
+        data["positions"] = positions
+        self.new_trades.append({
+            "timestamp": timestamp, "action": "sell", "ticker": ticker,
+            "shares": round(sell_qty, 6), "price": round(price, 4),
+            "pl": round(pl, 2),
+        })
+        self.dirty = True
+
+    def summary(self, current_prices: dict) -> dict:
+        """get_summary() for the in-memory state, including trades not yet committed."""
+        return _summarize(self.data, current_prices, self.new_trades)
+
+    def commit(self):
+        """Append new trades to the ledger, then replace the state file."""
+        if not self.dirty:
+            return
+        _append_trades(self.new_trades)
+        _save(self.data)
+        self.new_trades = []
+        self.dirty = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        if exc_type is None:
+            self.commit()
+        return False
+
+
+def session() -> SimSession:
+    return SimSession()
 
 
 def init(starting_balance: float):
@@ -37,8 +273,8 @@ def init(starting_balance: float):
             "cash": starting_balance,
             "positions": {},
             "realized_pl": 0.0,
-            "trades": [],
         }
+        _reset_ledger()
         _save(data)
         logger.info("SIM: initialized portfolio with $%.2f", starting_balance)
     return data
@@ -50,79 +286,15 @@ def get_portfolio() -> dict:
 
 
 def record_buy(ticker: str, notional: float, price: float, timestamp: str):
-    """Record a notional buy in the sim portfolio."""
-    data = _load()
-    if not data:
-        return
-    if notional > data.get("cash", 0):
-        logger.warning("SIM: buy %s $%.2f exceeds cash $%.2f, capping",
-                       ticker, notional, data["cash"])
-        notional = data["cash"]
-    if notional <= 0:
-        return
-    shares = notional / price if price > 0 else 0
-    positions = data.get("positions", {})
-    if ticker in positions:
-        old = positions[ticker]
-        old_shares = old["shares"]
-        old_cost = old["avg_entry"] * old_shares
-        new_shares = old_shares + shares
-        new_avg = (old_cost + notional) / new_shares if new_shares > 0 else price
-        positions[ticker] = {
-            "shares": round(new_shares, 6),
-            "avg_entry": round(new_avg, 4),
-            "notional_cost": round(old.get("notional_cost", old_cost) + notional, 2),
-        }
-    else:
-        positions[ticker] = {
-            "shares": round(shares, 6),
-            "avg_entry": round(price, 4),
-            "notional_cost": round(notional, 2),
-        }
-    data["cash"] = round(data.get("cash", 0) - notional, 2)
-    data["positions"] = positions
-    data.setdefault("trades", []).append({
-        "timestamp": timestamp, "action": "buy", "ticker": ticker,
-        "notional": round(notional, 2), "shares": round(shares, 6),
-        "price": round(price, 4),
-    })
-    _save(data)
+    """Record a notional buy in the sim portfolio (one-trade session)."""
+    with SimSession() as sim:
+        sim.buy(ticker, notional, price, timestamp)
 
 
 def record_sell(ticker: str, qty: float, price: float, timestamp: str):
     """Record a sell in the sim portfolio. qty = share count to sell."""
-    data = _load()
-    if not data:
-        return
-    positions = data.get("positions", {})
-    if ticker not in positions:
-        return
-    pos = positions[ticker]
-    sell_qty = min(qty, pos["shares"])
-    if sell_qty <= 0:
-        return
-    proceeds = sell_qty * price
-    cost_basis = sell_qty * pos["avg_entry"]
-    pl = proceeds - cost_basis
-    data["realized_pl"] = round(data.get("realized_pl", 0) + pl, 2)
-    data["cash"] = round(data.get("cash", 0) + proceeds, 2)
-    remaining = pos["shares"] - sell_qty
-    if remaining < 0.0001:
-        del positions[ticker]
-    else:
-        positions[ticker] = {
-            "shares": round(remaining, 6),
-            "avg_entry": pos["avg_entry"],
-            "notional_cost": round(
-                pos.get("notional_cost", 0) * (remaining / pos["shares"]), 2),
-        }
-    data["positions"] = positions
-    data.setdefault("trades", []).append({
-        "timestamp": timestamp, "action": "sell", "ticker": ticker,
-        "shares": round(sell_qty, 6), "price": round(price, 4),
-        "pl": round(pl, 2),
-    })
-    _save(data)
+    with SimSession() as sim:
+        sim.sell(ticker, qty, price, timestamp)
 
 
 def get_summary(current_prices: dict) -> dict:
@@ -131,7 +303,10 @@ def get_summary(current_prices: dict) -> dict:
     current_prices: {ticker: current_price}
     Returns dict with equity, cash, positions, P&L, etc.
     """
-    data = _load()
+    return SimSession().summary(current_prices)
+
+
+def _summarize(data: dict, current_prices: dict, pending=()) -> dict:
     if not data:
         return {}
     starting = data.get("starting_balance", 0)
@@ -174,5 +349,5 @@ def get_summary(current_prices: dict) -> dict:
         "positions": sorted(holdings, key=lambda x: -x["market_value"]),
         "position_count": len(holdings),
         "exposure_pct": round(total_market_value / equity * 100, 1) if equity > 0 else 0,
-        "trades": data.get("trades", [])[-20:],
+        "trades": (get_trades(20) + list(pending))[-20:],
     }
@@ -0,0 +1,222 @@
+"""Scan state store: one SQLite (WAL) key/value table under LOGS_DIR.
+
+Replaces cooldown.json, partial_sell_today.json, trailing_peaks.json,
+last_chart_post.txt and the Discord message-id files in config/. Values are
+JSON. Per-cycle writes go through a StateBatch and commit in one transaction
+(one fsync). A torn write can't corrupt a file, and readers — including the
+dashboard — always see a committed snapshot. Legacy files are imported once
+and left in place (some are tracked in git); the legacy_import table records
+which keys were handled, so a key deleted later (e.g. a stale Discord
+message id) isn't imported again.
+"""
+import json
+import logging
+import sqlite3
+import time
+
+from .config import CONFIG_DIR, LOGS_DIR
+
+logger = logging.getLogger("autotrader")
+
+STATE_DB_PATH = LOGS_DIR / "state.sqlite"
+
+# Keys
+COOLDOWN = "cooldown"                      # {"date", "tickers"}
+PARTIAL_SELL_TODAY = "partial_sell_today"  # {"date", "tickers"}
+TRAILING_PEAKS = "trailing_peaks"          # {ticker: peak_price}
+LAST_CHART_POST = "last_chart_post"        # unix ts
+DAY_OPEN_EQUITY = "day_open_equity"        # {"date", "equity"} at the session open
+CHART_DIGEST = "chart.equity_digest"       # lib.chart.history_digest of the last posted chart
+DASHBOARD_MESSAGE = "discord.dashboard_message"  # {"channel_id", "message_id"}
+CHART_MESSAGE = "discord.chart_message"          # {"channel_id", "message_id"}
+
+_LEGACY_FILES = {
+    COOLDOWN: LOGS_DIR / "cooldown.json",
+    PARTIAL_SELL_TODAY: LOGS_DIR / "partial_sell_today.json",
+    TRAILING_PEAKS: LOGS_DIR / "trailing_peaks.json",
+    LAST_CHART_POST: LOGS_DIR / "last_chart_post.txt",
+    DASHBOARD_MESSAGE: CONFIG_DIR / "dashboard_message_id.json",
+    CHART_MESSAGE: CONFIG_DIR / "chart_message_id.json",
+}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS kv (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    updated REAL NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS legacy_import (
+    key TEXT PRIMARY KEY
+) WITHOUT ROWID;
+"""
+
+_migrated = False
+
+
+def _connect():
+    global _migrated
+    LOGS_DIR.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(STATE_DB_PATH, timeout=10)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(_SCHEMA)
+    if not _migrated:
+        _migrate_legacy(conn)
+        _migrated = True
+    return conn
+
+
+def _migrate_legacy(conn):
+    """Import legacy state files for keys never handled before; the files stay put."""
+    have = {k for (k,) in conn.execute("SELECT key FROM kv")}
+    handled = {k for (k,) in conn.execute("SELECT key FROM legacy_import")}
+    rows = []
+    marks = []
+    for key, path in _LEGACY_FILES.items():
+        if key in handled or not path.exists():
+            continue
+        marks.append((key,))
+        if key in have:
+            continue
+        try:
+            text = path.read_text().strip()
+            value = float(text) if key == LAST_CHART_POST else json.loads(text)
+        except (OSError, ValueError) as e:
+            logger.warning("State store: skipping unreadable legacy %s: %s", path.name, e)
+            continue
+        rows.append((key, json.dumps(value), time.time()))
+    if marks:
+        with conn:
+            conn.executemany("INSERT OR IGNORE INTO kv (key, value, updated) VALUES (?, ?, ?)",
+                             rows)
+            conn.executemany("INSERT OR IGNORE INTO legacy_import (key) VALUES (?)", marks)
+    if rows:
+        logger.info("State store: imported %s", ", ".join(r[0] for r in rows))
+
+
+def get_many(keys):
+    """Return {key: value} for the keys present, read in one snapshot."""
+    keys = list(keys)
+    if not keys:
+        return {}
+    conn = _connect()
+    try:
+        rows = conn.execute(
+            f"SELECT key, value FROM kv WHERE key IN ({','.join('?' * len(keys))})", keys
+        ).fetchall()
+    finally:
+        conn.close()
+    return {k: json.loads(v) for k, v in rows}
+
+
+def get(key, default=None):
+    return get_many([key]).get(key, default)
+
+
+def updated(key):
+    """Unix time key was last written, or None if it isn't stored."""
+    conn = _connect()
+    try:
+        row = conn.execute("SELECT updated FROM kv WHERE key = ?", (key,)).fetchone()
+    finally:
+        conn.close()
+    return row[0] if row else None
+
+
+def update(key, fn, default=None):
+    """Read-modify-write one key in a single write transaction; returns the stored value.
+
+    fn gets the current value (default if missing) and returns the new one;
+    returning None leaves the key untouched.
+    """
+    conn = _connect()
+    conn.isolation_level = None
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT value FROM kv WHERE key = ?", (key,)).fetchone()
+            value = json.loads(row[0]) if row else default
+            new = fn(value)
+            if new is not None:
+                conn.execute(
+                    "INSERT INTO kv (key, value, updated) VALUES (?, ?, ?) "
+                    "ON CONFLICT(key) DO UPDATE SET value = excluded.value, "
+                    "updated = excluded.updated",
+                    (key, json.dumps(new), time.time()))
+                value = new
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+    finally:
+        conn.close()
+    return value
+
+
+def snapshot(prefix=""):
+    """{key: {"value", "updated"}} for every key (optionally under prefix), from one read.
+
+    Opens the database read-only and never creates or migrates it, so other
+    processes (the dashboard) can call it safely; {} if there is no store yet.
+    """
+    if not STATE_DB_PATH.exists():
+        return {}
+    conn = sqlite3.connect(f"file:{STATE_DB_PATH}?mode=ro", uri=True, timeout=5)
+    try:
+        rows = conn.execute("SELECT key, value, updated FROM kv WHERE key LIKE ? ORDER BY key",
+                            (prefix + "%",)).fetchall()
+    finally:
+        conn.close()
+    return {k: {"value": json.loads(v), "updated": u} for k, v, u in rows}
+
+
+class StateBatch:
+    """Stage puts/deletes and commit them in a single transaction."""
+
+    def __init__(self):
+        self._puts = {}
+        self._deletes = set()
+
+    def put(self, key, value):
+        self._deletes.discard(key)
+        self._puts[key] = value
+        return self
+
+    def delete(self, key):
+        self._puts.pop(key, None)
+        self._deletes.add(key)
+        return self
+
+    def commit(self):
+        if not self._puts and not self._deletes:
+            return
+        now = time.time()
+        conn = _connect()
+        try:
+            with conn:
+                conn.executemany(
+                    "INSERT INTO kv (key, value, updated) VALUES (?, ?, ?) "
+                    "ON CONFLICT(key) DO UPDATE SET value = excluded.value, "
+                    "updated = excluded.updated",
+                    [(k, json.dumps(v), now) for k, v in self._puts.items()])
+                conn.executemany("DELETE FROM kv WHERE key = ?", [(k,) for k in self._deletes])
+        finally:
+            conn.close()
+        self._puts.clear()
+        self._deletes.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        if exc_type is None:
+            self.commit()
+        return False
+
+
+def put(key, value):
+    StateBatch().put(key, value).commit()
+
+
+def delete(key):
+    StateBatch().delete(key).commit()
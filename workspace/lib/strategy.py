@@ -0,0 +1,521 @@
+"""Strategy parameters and pure decision rules (no I/O).
+
+Shared by the minute scan, streaming exits and the backtester so every path
+applies the same rules. Functions here only read their inputs (plus the
+trailing-stop peak tracker they are given) and return decisions; submitting
+orders and persisting state is left to the caller.
+"""
+import copy
+import logging
+from collections import namedtuple
+from dataclasses import dataclass, field, replace
+
+
+logger = logging.getLogger("autotrader")
+
+# ── Strategy parameters (v3) ────────────────────────────────────────────────
+# Risk management
+MAX_EXPOSURE_PCT = 1.00        # Max 100% equity deployed (no margin)
+MAX_POSITIONS = 12             # Hard cap on concurrent positions
+ALLOC_STRONG = 0.08            # RSI < 15: 8% of equity per position
+ALLOC_NORMAL = 0.05            # RSI < 25: 5% of equity per position
+BUY_BUFFER = 0.97              # Reserve 3% of BP for slippage
+DUST_THRESHOLD_PCT = 0.005     # Auto-sell positions < 0.5% of portfolio
+
+# Entry filters
+RSI_BUY_THRESHOLD = 30         # Buy below this RSI (widened from 25 — was too tight)
+RSI_STRONG_THRESHOLD = 20      # Larger allocation below this
+SMA_PERIOD = 20                # SMA(20) — short enough for IEX data availability
+VOLUME_SPIKE_RATIO = 0.8       # Volume >= 80% of 20-day avg (IEX underreports volume)
+MIN_BARS_FOR_SMA = 20          # Skip SMA filter if fewer bars available
+
+# Add-to-winners: deploy idle cash into best existing positions
+ADD_TO_WINNERS_CASH_PCT = 0.40  # Trigger when cash > 40% of equity
+ADD_TO_WINNER_MIN_PLPC = 0.02  # Position must be +2% or better
+ADD_TO_WINNER_ALLOC = 0.04     # Add 4% equity per top-up
+ADD_TO_WINNER_MAX_PCT = 0.15   # Don't grow any position beyond 15% of portfolio
+
+# Exit — profit taking
+PROFIT_TAKE_FULL_PCT = 0.08    # +8% → sell entire position
+PROFIT_TAKE_HALF_PCT = 0.04    # +4% → sell half
+TRAILING_ACTIVATE_PCT = 0.05   # Activate trailing stop once +5% reached
+TRAILING_STOP_PCT = 0.02       # Trail -2% from peak once activated
+
+# Exit — stop loss
+STOP_LOSS_PCT = -0.03          # -3% → sell all
+
+# RSI-based exits
+RSI_SELL_ALL = 70              # RSI > 70 → sell all
+RSI_SELL_HALF = 60             # RSI > 60 → sell half
+
+# Circuit breaker
+DAILY_DRAWDOWN_HALT = -0.02    # Halt buys if down >2% intraday
+
+
+@dataclass(frozen=True)
+class StrategyParams:
+    """Tunable strategy parameters; defaults are the module constants above."""
+    max_exposure_pct: float = MAX_EXPOSURE_PCT
+    max_positions: int = MAX_POSITIONS
+    alloc_strong: float = ALLOC_STRONG
+    alloc_normal: float = ALLOC_NORMAL
+    buy_buffer: float = BUY_BUFFER
+    dust_threshold_pct: float = DUST_THRESHOLD_PCT
+    rsi_buy_threshold: float = RSI_BUY_THRESHOLD
+    rsi_strong_threshold: float = RSI_STRONG_THRESHOLD
+    sma_period: int = SMA_PERIOD
+    sma_max_drawdown: float = 0.05
+    volume_spike_ratio: float = VOLUME_SPIKE_RATIO
+    min_bars_for_sma: int = MIN_BARS_FOR_SMA
+    require_rsi_turning_up: bool = True
+    add_to_winners_cash_pct: float = ADD_TO_WINNERS_CASH_PCT
+    add_to_winner_min_plpc: float = ADD_TO_WINNER_MIN_PLPC
+    add_to_winner_alloc: float = ADD_TO_WINNER_ALLOC
+    add_to_winner_max_pct: float = ADD_TO_WINNER_MAX_PCT
+    profit_take_full_pct: float = PROFIT_TAKE_FULL_PCT
+    profit_take_half_pct: float = PROFIT_TAKE_HALF_PCT
+    trailing_activate_pct: float = TRAILING_ACTIVATE_PCT
+    trailing_stop_pct: float = TRAILING_STOP_PCT
+    stop_loss_pct: float = STOP_LOSS_PCT
+    rsi_sell_all: float = RSI_SELL_ALL
+    rsi_sell_half: float = RSI_SELL_HALF
+    daily_drawdown_halt: float = DAILY_DRAWDOWN_HALT
+
+    def for_sim(self):
+        """Looser entry filters used with SIMULATED_BALANCE so the small sim stays active."""
+        return replace(self, rsi_buy_threshold=35, sma_max_drawdown=0.15,
+                       volume_spike_ratio=0.25, require_rsi_turning_up=False)
+
+
+DEFAULT_PARAMS = StrategyParams()
+
+# kind: outcome reason ("stop-loss", ...); reason: decision-log text;
+# label: text shown in the #trades / cycle summary; needs_pdt: PDT-check before selling
+Exit = namedtuple("Exit", "kind qty reason label needs_pdt")
+
+
+def update_peak(ticker, plpc, cur_price, peaks, params=DEFAULT_PARAMS):
+    """Track the trailing-stop peak price: start once +activate reached, drop when red."""
+    if plpc >= params.trailing_activate_pct:
+        prev_peak = peaks.get(ticker, cur_price)
+        peaks[ticker] = max(prev_peak, cur_price)
+    elif ticker in peaks and plpc < 0:
+        del peaks[ticker]
+
+
+def exit_signal(pos, peaks, partial_sell_today, params=DEFAULT_PARAMS):
+    """Phase 1 exit check for one position: stop-loss, trailing stop, profit-take.
+
+    Updates peaks (trailing tracker) for the position, then returns an Exit or
+    None. Positions with no available shares never exit.
+    """
+    ticker = pos["ticker"]
+    qty = float(pos["qty"])
+    available_qty = pos.get("available_qty", qty)
+    plpc = float(pos.get("unrealized_plpc", 0) or 0)
+    cur_price = float(pos.get("current_price", 0))
+    if available_qty <= 0:
+        return None
+
+    update_peak(ticker, plpc, cur_price, peaks, params)
+
+    # Hard stop-loss
+    if plpc < params.stop_loss_pct:
+        return Exit("stop-loss", min(qty, available_qty),
+                    f"stop-loss {params.stop_loss_pct * 100:.0f}%", "stop-loss", False)
+
+    # Trailing stop: price dropped more than trailing_stop_pct from tracked peak
+    if ticker in peaks and cur_price > 0:
+        peak = peaks[ticker]
+        drop_from_peak = (cur_price - peak) / peak
+        if drop_from_peak < -params.trailing_stop_pct:
+            reason = f"trailing-stop (peak ${peak:.2f}, now ${cur_price:.2f})"
+            return Exit("trailing-stop", min(qty, available_qty), reason, reason, False)
+
+    # Profit-take full (PDT-checked — skip if it would waste a day trade)
+    if plpc >= params.profit_take_full_pct:
+        return Exit("profit-take-full", min(qty, available_qty),
+                    f"profit-take +{params.profit_take_full_pct * 100:.0f}%",
+                    "profit-take-full", True)
+
+    # Profit-take half (PDT-checked, max once per ticker per day)
+    if plpc >= params.profit_take_half_pct:
+        if ticker in partial_sell_today:
+            logger.info("Skipping profit-take-half %s: already half-sold today", ticker)
+            return None
+        sell_qty = min(qty / 2, available_qty)
+        if sell_qty > 0.0001:
+            return Exit("profit-take-half", sell_qty,
+                        f"profit-take +{params.profit_take_half_pct * 100:.0f}% half",
+                        "profit-take-half", True)
+    return None
+
+
+def mark_price(pos, price):
+    """Reprice a position dict in place from a live trade/bar price."""
+    qty = float(pos["qty"])
+    avg_entry = float(pos.get("avg_entry", 0))
+    pos["current_price"] = price
+    pos["market_value"] = qty * price
+    pos["unrealized_pl"] = qty * (price - avg_entry)
+    pos["unrealized_plpc"] = (price / avg_entry - 1) if avg_entry > 0 else 0.0
+    return pos
+
+
+def is_dust(pos, equity, params=DEFAULT_PARAMS):
+    """Phase 1b: position too small to manage (< dust_threshold_pct of equity)."""
+    qty = float(pos["qty"])
+    available_qty = pos.get("available_qty", qty)
+    mv = float(pos.get("market_value", 0))
+    return mv < equity * params.dust_threshold_pct and available_qty > 0 and qty > 0
+
+
+def rsi_exit_signal(pos, rsi, partial_sell_today, params=DEFAULT_PARAMS):
+    """Phase 2 overbought exit for a held ticker: sell all above rsi_sell_all, half above rsi_sell_half."""
+    ticker = pos["ticker"]
+    qty = float(pos["qty"])
+    available_qty = pos.get("available_qty", qty)
+    if available_qty <= 0:
+        logger.warning("Skipping RSI sell %s: %d shares held by open orders", ticker, qty)
+        return None
+    sell_qty = 0
+    reason = ""
+    if rsi > params.rsi_sell_all:
+        sell_qty = min(qty, available_qty)
+        reason = f"RSI sell-all ({rsi:.1f})"
+    elif rsi > params.rsi_sell_half:
+        if ticker in partial_sell_today:
+            logger.info("Skipping RSI sell-half %s: already half-sold today", ticker)
+        else:
+            sell_qty = min(qty / 2, available_qty)
+            reason = f"RSI sell-half ({rsi:.1f})"
+    if sell_qty > 0.0001:
+        return Exit(reason, sell_qty, reason, reason, True)
+    return None
+
+
+def entry_skip_reason(ticker, ind, equity, n_positions, current_exposure,
+                      cooldown_tickers, buys_halted, params=DEFAULT_PARAMS):
+    """Phase 2 entry filters for a ticker already below rsi_buy_threshold.
+
+    ind: indicator row from lib.indicators.compute_indicators.
+    Returns None if every filter passes, else a short skip code
+    (cooldown, circuit_breaker, max_pos, exposure, below_sma, low_vol, rsi_falling).
+    """
+    rsi = ind["rsi"]
+    if ticker in cooldown_tickers:
+        logger.info("Skipping buy %s: on stop-loss cooldown today", ticker)
+        return "cooldown"
+    if buys_halted:
+        logger.info("Skipping buy %s: circuit breaker active", ticker)
+        return "circuit_breaker"
+    if n_positions >= params.max_positions:
+        logger.info("Skipping buy %s: at max %d positions", ticker, params.max_positions)
+        return "max_pos"
+    if current_exposure >= equity * params.max_exposure_pct:
+        logger.info("Skipping buy %s: exposure %.1f%% >= %.0f%% cap",
+                    ticker, current_exposure / equity * 100, params.max_exposure_pct * 100)
+        return "exposure"
+
+    # SMA trend filter: only buy dips in uptrends (skip if insufficient data)
+    sma = ind["sma"] if ind["n_bars"] >= params.min_bars_for_sma else None
+    cur_close = ind["close"]
+    if sma and cur_close < sma * (1 - params.sma_max_drawdown):
+        logger.info("Skipping buy %s: price $%.2f > %.0f%% below SMA%d $%.2f",
+                    ticker, cur_close, params.sma_max_drawdown * 100, params.sma_period, sma)
+        return "below_sma"
+
+    # Volume confirmation
+    vol_avg = ind["avg_volume"]
+    last_vol = ind["volume"]
+    if vol_avg and vol_avg > 0 and last_vol < vol_avg * params.volume_spike_ratio:
+        logger.info("Skipping buy %s: volume %d < %.0f (%.1fx avg required)",
+                    ticker, last_vol, vol_avg * params.volume_spike_ratio,
+                    params.volume_spike_ratio)
+        return "low_vol"
+
+    # RSI momentum: must be turning up (sim params allow flat/falling)
+    if params.require_rsi_turning_up and not rsi_turning_up(ind):
+        logger.info("Skipping buy %s: RSI %.1f still falling", ticker, rsi)
+        return "rsi_falling"
+    return None
+
+
+def rsi_turning_up(ind):
+    """True if current RSI > prior-bar RSI."""
+    return ind["rsi_prev"] is not None and ind["rsi"] > ind["rsi_prev"]
+
+
+def entry_notional(ticker, rsi, equity, current_exposure, buying_power, params=DEFAULT_PARAMS):
+    """Size a new entry in dollars. Returns (notional, alloc_pct) or (None, skip code)."""
+    alloc_pct = params.alloc_strong if rsi < params.rsi_strong_threshold else params.alloc_normal
+    max_new_exposure = equity * params.max_exposure_pct - current_exposure
+    if max_new_exposure <= 0:
+        return None, "exposure"
+    notional = min(equity * alloc_pct, max_new_exposure, buying_power * params.buy_buffer)
+    if notional < 1.0:
+        logger.info("Skipping buy %s: notional $%.2f too small", ticker, notional)
+        return None, "notional<1"
+    return notional, alloc_pct
+
+
+def winner_candidates(positions, params=DEFAULT_PARAMS):
+    """Phase 3: top 3 positions at or above add_to_winner_min_plpc, best first."""
+    winners = [p for p in positions
+               if float(p.get("unrealized_plpc", 0) or 0) >= params.add_to_winner_min_plpc]
+    winners.sort(key=lambda x: -float(x.get("unrealized_plpc", 0) or 0))
+    return winners[:3]
+
+
+def winner_topup_notional(pos, equity, current_exposure, cash, params=DEFAULT_PARAMS):
+    """Dollar top-up for a winner, or None if capped / too small."""
+    mv = float(pos.get("market_value", 0))
+    if mv >= equity * params.add_to_winner_max_pct:
+        return None
+    if float(pos.get("current_price", 0)) <= 0:
+        return None
+    notional = min(
+        equity * params.add_to_winner_alloc,
+        equity * params.add_to_winner_max_pct - mv,
+        equity * params.max_exposure_pct - current_exposure,
+        cash * params.buy_buffer)
+    if notional < 1.0:
+        return None
+    return notional
+
+
+# ── Whole-cycle evaluation ───────────────────────────────────────────────────
+
+# Sell kinds that mark a ticker half-sold for the day / reset its trailing peak
+PARTIAL_SELL_KINDS = {"profit-take-half", "rsi-sell-half"}
+PEAK_RESET_KINDS = {"stop-loss", "trailing-stop", "profit-take-full", "dust-cleanup"}
+# Exits still sent (one attempt) while the broker circuit is open: capital protection
+PROTECTIVE_EXITS = {"stop-loss", "trailing-stop"}
+
+
+@dataclass
+class Order:
+    """One order decided by evaluate_cycle; lib.executor submits and records it."""
+    side: str                     # "buy" | "sell"
+    ticker: str
+    kind: str                     # stop-loss, trailing-stop, profit-take-*, dust-cleanup,
+                                  # rsi-sell-all, rsi-sell-half, rsi-buy, add-to-winner
+    label: str                    # text for #trades / cycle summary
+    qty: float = 0.0              # shares (sells)
+    notional: float = 0.0         # dollars (buys)
+    price: float = 0.0            # reference price at decision time
+    rsi: float = 0.0
+    day_trade: bool = False       # uses a PDT day trade
+    decision: dict = field(default_factory=dict)  # decision-log fields
+    outcome: dict = field(default_factory=dict)   # outcome-log fields
+
+
+@dataclass
+class CycleContext:
+    """Per-cycle inputs to evaluate_cycle besides the broker snapshot.
+
+    peaks, partial_sell_today and cooldown_tickers are the persisted per-day
+    memory; evaluate_cycle only ratchets peaks and fills skip_reasons, the
+    executor applies fills (apply_fill). buying_power / exposure / n_positions
+    / held override the broker snapshot for Phase 2/3 limits (sim portfolio).
+    """
+    today: str
+    equity: float
+    buys_halted: bool = False
+    peaks: dict = field(default_factory=dict)
+    partial_sell_today: set = field(default_factory=set)
+    cooldown_tickers: set = field(default_factory=set)
+    pdt: object = None            # lib.pdt.PDTBudget, or None when PDT doesn't apply
+    decisions: object = None      # lib.decisions.DecisionIndex for today (live runs only)
+    sim_mode: bool = False
+    buying_power: float = None
+    exposure: float = None
+    n_positions: int = None
+    held: set = None
+    watchlist: list = None        # scan order; defaults to indicator order
+    skip_reasons: list = field(default_factory=list)  # [(ticker, rsi, code)] for "why no buy"
+
+
+def apply_fill(order, partial_sell_today, cooldown_tickers, peaks=None):
+    """Record a filled sell in the per-day memory: half-sold marker, cooldown, peak reset."""
+    if order.side != "sell":
+        return
+    if order.kind in PARTIAL_SELL_KINDS:
+        partial_sell_today.add(order.ticker)
+    elif peaks is not None and order.kind in PEAK_RESET_KINDS:
+        peaks.pop(order.ticker, None)
+    if order.kind == "stop-loss":
+        cooldown_tickers.add(order.ticker)
+
+
+def _pdt_check(pdt, ticker, side):
+    if pdt is None:
+        return True, False
+    return pdt.check(ticker, side)
+
+
+def exit_order(sig, pos, equity, day_trade=False):
+    """Order for a Phase 1 Exit signal on pos."""
+    plpc = float(pos.get("unrealized_plpc", 0) or 0)
+    price = float(pos.get("current_price", 0))
+    return Order("sell", pos["ticker"], sig.kind, sig.label, qty=sig.qty, price=price,
+                 day_trade=day_trade,
+                 decision={"shares": sig.qty, "reason": sig.reason, "plpc": plpc,
+                           "price": price, "portfolio_value": equity},
+                 outcome={"reason": sig.kind, "plpc": plpc, "shares": sig.qty})
+
+
+def evaluate_cycle(state, bars, params, ctx, indicators=None):
+    """Decide one scan cycle (Phases 1, 1b, 2, 3) without network or disk I/O.
+
+    state: MarketState-like snapshot (positions, account, apply_sell/apply_buy);
+    it is copied, never modified. bars: {ticker: [bar]} for the watchlist, or
+    None when indicators (compute_indicators output) are passed directly.
+    Returns Orders in decision order; later decisions assume earlier orders fill.
+    """
+    if indicators is None:
+        from .indicators import compute_indicators  # numpy; not needed by exits-only callers
+        indicators = compute_indicators(bars, sma_period=params.sma_period, volume_period=20)
+    book = copy.deepcopy(state)
+    partial = set(ctx.partial_sell_today)
+    cooldown = set(ctx.cooldown_tickers)
+    pdt = copy.copy(ctx.pdt)
+    equity = ctx.equity
+    ctx.skip_reasons = []
+    orders = []
+
+    def _fill(order):
+        orders.append(order)
+        apply_fill(order, partial, cooldown)
+        if order.side == "sell":
+            book.apply_sell(order.ticker, order.qty)
+        else:
+            book.apply_buy(order.ticker, order.notional, price=order.price)
+
+    # Phase 1: stop-loss, trailing stop, profit-taking
+    for pos in list(book.positions):
+        ticker = pos["ticker"]
+        qty = float(pos["qty"])
+        if pos.get("available_qty", qty) <= 0:
+            logger.warning("Skipping %s: %d shares held by open orders", ticker, qty)
+            continue
+        sig = exit_signal(pos, ctx.peaks, partial, params)
+        if not sig:
+            continue
+        day_trade = False
+        if sig.needs_pdt:
+            ok, day_trade = _pdt_check(pdt, ticker, "sell")
+            if not ok:
+                continue
+        _fill(exit_order(sig, pos, equity, day_trade))
+
+    # Phase 1b: dust cleanup
+    for pos in list(book.positions):
+        if not is_dust(pos, equity, params):
+            continue
+        qty = float(pos["qty"])
+        sell_qty = min(qty, pos.get("available_qty", qty))
+        plpc = float(pos.get("unrealized_plpc", 0) or 0)
+        price = float(pos.get("current_price", 0))
+        _fill(Order("sell", pos["ticker"], "dust-cleanup", "dust-cleanup", qty=sell_qty,
+                    price=price,
+                    decision={"shares": sell_qty, "reason": "dust-cleanup (< 0.5% of portfolio)",
+                              "plpc": plpc, "price": price, "portfolio_value": equity},
+                    outcome={"reason": "dust-cleanup", "plpc": plpc, "shares": sell_qty}))
+
+    # Phase 2: RSI-based sells and buys
+    held = set(ctx.held) if ctx.held is not None else book.held_tickers()
+    remaining_bp = ctx.buying_power if ctx.buying_power is not None else book.buying_power
+    current_exposure = (ctx.exposure if ctx.exposure is not None
+                        else book.total_market_value())
+    n_positions = ctx.n_positions if ctx.n_positions is not None else len(book.positions)
+    for ticker in (ctx.watchlist if ctx.watchlist is not None else list(indicators)):
+        ind = indicators.get(ticker)
+        if not ind or ind["rsi"] is None:
+            continue
+        rsi = ind["rsi"]
+        if ticker in held:
+            pos = book.position(ticker)
+            if not pos:
+                continue
+            sig = rsi_exit_signal(pos, rsi, partial, params)
+            if not sig:
+                continue
+            ok, day_trade = _pdt_check(pdt, ticker, "sell")
+            if not ok:
+                continue
+            price = float(pos.get("current_price", 0))
+            _fill(Order("sell", ticker, "rsi-sell-half" if "half" in sig.reason else "rsi-sell-all",
+                        sig.label, qty=sig.qty, price=price, rsi=rsi, day_trade=day_trade,
+                        decision={"shares": sig.qty, "reason": sig.reason, "rsi": rsi,
+                                  "price": price, "portfolio_value": equity},
+                        outcome={"reason": sig.reason, "rsi": rsi, "shares": sig.qty}))
+            continue
+
+        if rsi >= params.rsi_buy_threshold:
+            continue
+        skip = entry_skip_reason(ticker, ind, equity, n_positions, current_exposure,
+                                 cooldown, ctx.buys_halted, params)
+        if skip:
+            ctx.skip_reasons.append((ticker, rsi, skip))
+            continue
+        if ctx.sim_mode and not rsi_turning_up(ind):
+            # Sim params still allow the buy so the small sim stays active
+            ctx.skip_reasons.append((ticker, rsi, "rsi_falling"))
+
+        # Sim mode sizes from sim cash only; otherwise also cap by broker buying power
+        buying_power = (remaining_bp if ctx.sim_mode
+                        else min(remaining_bp, book.buying_power))
+        notional, alloc_pct = entry_notional(ticker, rsi, equity, current_exposure, buying_power,
+                                             params)
+        if notional is None:  # alloc_pct holds the skip code
+            ctx.skip_reasons.append((ticker, rsi, alloc_pct))
+            continue
+        ok, day_trade = _pdt_check(pdt, ticker, "buy")
+        if not ok:
+            ctx.skip_reasons.append((ticker, rsi, "pdt"))
+            continue
+        sma = ind["sma"] if ind["n_bars"] >= params.min_bars_for_sma else None
+        vol_avg = ind["avg_volume"]
+        _fill(Order("buy", ticker, "rsi-buy", f"RSI buy ${notional:.0f} ({rsi:.1f})",
+                    notional=notional, price=ind["close"], rsi=rsi, day_trade=day_trade,
+                    decision={"notional": round(notional, 2), "rsi": rsi,
+                              "allocation_pct": alloc_pct, "portfolio_value": equity,
+                              "filters": {
+                                  "sma": round(sma, 2) if sma else None,
+                                  "vol_ratio": (round(ind["volume"] / vol_avg, 2)
+                                                if vol_avg else None),
+                              }},
+                    outcome={"reason": f"RSI {rsi:.1f}", "notional": round(notional, 2)}))
+        remaining_bp = max(0, remaining_bp - notional)
+        current_exposure += notional
+        n_positions += 1
+        if ctx.sim_mode:
+            held.add(ticker)
+
+    # Phase 3: add to winners when cash is too high
+    if ctx.buys_halted:
+        return orders
+    cash_now = remaining_bp if ctx.sim_mode else book.cash
+    if not ctx.sim_mode:
+        current_exposure = book.total_market_value()
+    if cash_now <= equity * params.add_to_winners_cash_pct:
+        return orders
+    candidates = (book.positions if not ctx.sim_mode
+                  else [p for p in book.positions if p["ticker"] in held])
+    for pos in winner_candidates(candidates, params):
+        if current_exposure >= equity * params.max_exposure_pct:
+            break
+        notional = winner_topup_notional(pos, equity, current_exposure, cash_now, params)
+        if notional is None:
+            continue
+        plpc = float(pos.get("unrealized_plpc", 0) or 0)
+        _fill(Order("buy", pos["ticker"], "add-to-winner",
+                    f"add-to-winner ${notional:.0f} ({plpc * 100:+.1f}%)",
+                    notional=notional, price=float(pos.get("current_price", 0)),
+                    decision={"notional": round(notional, 2),
+                              "reason": f"add-to-winner (cash {cash_now / equity * 100:.0f}%)",
+                              "portfolio_value": equity},
+                    outcome={"reason": "add-to-winner", "notional": round(notional, 2)}))
+        current_exposure += notional
+    return orders
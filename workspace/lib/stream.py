@@ -0,0 +1,138 @@
+"""Live price feed from Alpaca's websocket data stream (or a local replay).
+
+PriceFeed subscribes to minute bars for every symbol and to trades for the
+symbols that need tick-level reaction (held positions), and calls
+on_price(symbol, price, timestamp) for each event. on_price runs on one worker
+thread, never on the websocket's event loop, so blocking REST calls or lock
+attempts can't starve the loop of pings; while it is busy, only the newest
+price per symbol is kept. ReplayStream implements the same
+subscribe/run/stop surface over a list of recorded events, so exit logic can
+be exercised without a network connection.
+"""
+import asyncio
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+logger = logging.getLogger("autotrader.stream")
+
+
+def alpaca_stream():
+    """Build an alpaca-py StockDataStream on the IEX feed."""
+    from alpaca.data.enums import DataFeed
+    from alpaca.data.live import StockDataStream
+
+    api_key = os.environ.get("ALPACA_API_KEY")
+    secret = os.environ.get("ALPACA_SECRET_KEY")
+    if not api_key or not secret:
+        raise ValueError("ALPACA_API_KEY and ALPACA_SECRET_KEY must be set")
+    return StockDataStream(api_key, secret, feed=DataFeed.IEX)
+
+
+class ReplayStream:
+    """Replays recorded events through the StockDataStream handler interface.
+
+    events: list of dicts {"type": "bar"|"trade", "symbol", "price", "timestamp"}.
+    Bar events are delivered with .close, trade events with .price.
+    """
+
+    def __init__(self, events):
+        self.events = list(events)
+        self._handlers = {"bar": {}, "trade": {}}
+        self._stopped = False
+
+    def subscribe_bars(self, handler, *symbols):
+        for s in symbols:
+            self._handlers["bar"][s] = handler
+
+    def subscribe_trades(self, handler, *symbols):
+        for s in symbols:
+            self._handlers["trade"][s] = handler
+
+    def unsubscribe_trades(self, *symbols):
+        for s in symbols:
+            self._handlers["trade"].pop(s, None)
+
+    def run(self):
+        asyncio.run(self._run())
+
+    async def _run(self):
+        for ev in self.events:
+            if self._stopped:
+                break
+            handler = self._handlers.get(ev["type"], {}).get(ev["symbol"])
+            if handler is None:
+                continue
+            msg = SimpleNamespace(symbol=ev["symbol"], timestamp=ev.get("timestamp"),
+                                  close=ev["price"], price=ev["price"])
+            await handler(msg)
+
+    def stop(self):
+        self._stopped = True
+
+
+class PriceFeed:
+    """Bar/trade subscriptions feeding on_price(symbol, price, timestamp) off the event loop.
+
+    Exceptions raised by on_price are logged and swallowed so one bad event
+    doesn't tear down the websocket.
+    """
+
+    def __init__(self, on_price, stream=None):
+        self.on_price = on_price
+        self.stream = stream or alpaca_stream()
+        self.trade_symbols = set()
+        self._pending = {}
+        self._pending_lock = threading.Lock()
+        self._worker = ThreadPoolExecutor(max_workers=1, thread_name_prefix="price-feed")
+
+    def _submit(self, symbol, price, ts):
+        with self._pending_lock:
+            queued = symbol in self._pending
+            self._pending[symbol] = (price, ts)
+        if not queued:
+            self._worker.submit(self._dispatch, symbol)
+
+    def _dispatch(self, symbol):
+        with self._pending_lock:
+            price, ts = self._pending.pop(symbol)
+        try:
+            self.on_price(symbol, float(price), ts)
+        except Exception:
+            logger.exception("Stream handler failed for %s", symbol)
+
+    async def _on_bar(self, bar):
+        self._submit(bar.symbol, bar.close, bar.timestamp)
+
+    async def _on_trade(self, trade):
+        self._submit(trade.symbol, trade.price, trade.timestamp)
+
+    def set_trade_symbols(self, symbols):
+        """Subscribe trades for new symbols and drop ones no longer listed."""
+        symbols = set(symbols)
+        added, removed = symbols - self.trade_symbols, self.trade_symbols - symbols
+        if removed:
+            self.stream.unsubscribe_trades(*sorted(removed))
+        if added:
+            self.stream.subscribe_trades(self._on_trade, *sorted(added))
+        if added or removed:
+            logger.info("Trade subscriptions: +%s -%s", sorted(added), sorted(removed))
+        self.trade_symbols = symbols
+
+    def run(self, bar_symbols, trade_symbols):
+        """Subscribe and block until the stream stops and queued events are handled."""
+        if bar_symbols:
+            self.stream.subscribe_bars(self._on_bar, *sorted(bar_symbols))
+        if trade_symbols:
+            self.stream.subscribe_trades(self._on_trade, *sorted(trade_symbols))
+            self.trade_symbols = set(trade_symbols)
+        logger.info("Streaming bars for %d symbols, trades for %d",
+                    len(bar_symbols), len(trade_symbols))
+        try:
+            self.stream.run()
+        finally:
+            self._worker.shutdown(wait=True)
+        return self.stream
+
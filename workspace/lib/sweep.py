@@ -0,0 +1,110 @@
+"""Parameter sweep: run the backtester over a grid of StrategyParams in parallel.
+
+The bar matrix is written once as .npy files and every worker process opens
+them with mmap_mode="r", so N workers share one copy of the data through the
+page cache instead of each unpickling their own. Indicator arrays depend only
+on sma_period, so each worker caches them per period.
+"""
+import csv
+import itertools
+import json
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import fields, replace
+from pathlib import Path
+
+import numpy as np
+
+from .backtest import BarMatrix, compute_signals, run_backtest
+from .strategy import DEFAULT_PARAMS, StrategyParams
+
+PARAM_TYPES = {f.name: f.type for f in fields(StrategyParams)}
+SUMMARY_COLUMNS = ["sharpe", "total_return", "max_drawdown", "trades", "win_rate", "final_equity"]
+
+# Per-worker state, set by _init_worker
+_matrix = None
+_signals = {}
+_run_kwargs = {}
+
+
+def share_matrix(matrix, directory):
+    """Write matrix to directory as close.npy / volume.npy / meta.json."""
+    directory = Path(directory)
+    np.save(directory / "close.npy", np.ascontiguousarray(matrix.close))
+    np.save(directory / "volume.npy", np.ascontiguousarray(matrix.volume))
+    (directory / "meta.json").write_text(
+        json.dumps({"tickers": matrix.tickers, "dates": matrix.dates}), encoding="utf-8")
+
+
+def load_shared(directory):
+    """Open a share_matrix directory as a BarMatrix backed by read-only memory maps."""
+    directory = Path(directory)
+    meta = json.loads((directory / "meta.json").read_text(encoding="utf-8"))
+    return BarMatrix(meta["tickers"], meta["dates"],
+                     np.load(directory / "close.npy", mmap_mode="r"),
+                     np.load(directory / "volume.npy", mmap_mode="r"))
+
+
+def parse_value(name, raw):
+    """Convert a CLI string to the StrategyParams field type."""
+    if name not in PARAM_TYPES:
+        raise ValueError(f"Unknown strategy parameter: {name}")
+    kind = PARAM_TYPES[name]
+    if kind in (bool, "bool"):
+        return raw.strip().lower() in ("1", "true", "yes")
+    if kind in (int, "int"):
+        return int(raw)
+    return float(raw)
+
+
+def expand_grid(spec):
+    """{param: [values]} -> list of override dicts (cartesian product)."""
+    for name in spec:
+        if name not in PARAM_TYPES:
+            raise ValueError(f"Unknown strategy parameter: {name}")
+    names = list(spec)
+    return [dict(zip(names, combo)) for combo in itertools.product(*(spec[n] for n in names))]
+
+
+def _init_worker(directory, base, initial_cash, slippage):
+    global _matrix, _run_kwargs
+    _matrix = load_shared(directory)
+    _signals.clear()
+    _run_kwargs = {"base": base, "initial_cash": initial_cash, "slippage": slippage}
+
+
+def _run_one(overrides):
+    params = replace(_run_kwargs["base"], **overrides)
+    signals = _signals.get(params.sma_period)
+    if signals is None:
+        signals = _signals[params.sma_period] = compute_signals(_matrix, params)
+    result = run_backtest(_matrix, params, initial_cash=_run_kwargs["initial_cash"],
+                          slippage=_run_kwargs["slippage"], signals=signals)
+    return {**overrides, **result.summary()}
+
+
+def run_sweep(matrix, combos, workers=None, base=DEFAULT_PARAMS, initial_cash=100_000.0,
+              slippage=0.0):
+    """Backtest every override dict in combos. Returns rows ranked by Sharpe (best first)."""
+    workers = workers or os.cpu_count() or 1
+    # Group by sma_period so each worker reuses its cached indicators
+    combos = sorted(combos, key=lambda c: c.get("sma_period", base.sma_period))
+    chunksize = max(1, len(combos) // (workers * 8))
+    with tempfile.TemporaryDirectory(prefix="sweep-") as directory:
+        share_matrix(matrix, directory)
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(directory, base, initial_cash, slippage)) as pool:
+            rows = list(pool.map(_run_one, combos, chunksize=chunksize))
+    rows.sort(key=lambda r: r["sharpe"], reverse=True)
+    return rows
+
+
+def write_results(rows, path, param_names):
+    """Write ranked rows to CSV: rank, swept params, then summary columns."""
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["rank"] + list(param_names) + SUMMARY_COLUMNS)
+        for rank, row in enumerate(rows, 1):
+            writer.writerow([rank] + [row[n] for n in param_names]
+                            + [row[c] for c in SUMMARY_COLUMNS])
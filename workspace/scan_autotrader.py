@@ -13,10 +13,13 @@ Live-trading safeguards (GATEWAY_MODE=live):
 - Skips expensive tickers when allocation rounds to 0 shares
 - Logs every order with reason for auditability
 """
-import json
+import argparse
 import logging
+import signal
 import sys
-from datetime import datetime
+import threading
+import time
+from datetime import datetime, timezone
 
 import os
 from pathlib import Path
@@ -42,29 +45,83 @@ if not os.environ.get("SIMULATED_BALANCE") or not os.environ.get("GATEWAY_MODE")
                 pass
             break
 
+from lib import session_gate  # stdlib only; keep it ahead of the imports below
+
+# Daemon mode (--daemon): seconds between cycles, and max sleep while market is closed
+DAEMON_INTERVAL_SEC = 60
+DAEMON_MAX_IDLE_SEC = 900
+
+
+def _parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="AutoTrader RSI scan")
+    parser.add_argument("--daemon", action="store_true",
+                        help="run as a resident process, scanning every --interval seconds while the market is open")
+    parser.add_argument("--interval", type=float, default=DAEMON_INTERVAL_SEC,
+                        help="seconds between daemon cycles (default %(default)s)")
+    parser.add_argument("--stream", action="store_true",
+                        help="react to streamed prices with stop-loss/trailing/profit-take exits")
+    parser.add_argument("--wait", type=float, default=0.0,
+                        help="if another scan holds the lock, wait up to this many seconds instead of skipping")
+    parser.add_argument("--session", choices=session_gate.SESSION_MODES,
+                        default=os.environ.get("SCAN_SESSION", "regular"),
+                        help="hours to scan in: regular (default), pre, post or extended")
+    parser.add_argument("--force", action="store_true",
+                        help="scan even when the market-hours gate says closed")
+    return parser.parse_args(argv)
+
+
+# Market-hours gate: off-hours one-shot runs exit here, before the broker SDK loads
+if __name__ == "__main__":
+    _args = _parse_args()
+    _gate = None
+    if not (_args.daemon or _args.stream or _args.force):
+        _gate = session_gate.check(_args.session)
+        if not _gate.open:
+            print(f"Skipped: {_gate.reason}")
+            sys.exit(0)
+
 from lib.config import validate_env, load_watchlist
-from lib.alpaca_client import (get_account, get_positions, get_bars,
-                               buy_notional, sell, get_portfolio_history)
-from lib.rsi import compute_rsi, compute_sma, avg_volume, rsi_turning_up
-from lib.decisions import log_decision, load_recent_decisions, rotate_decisions_log, log_outcome, append_daily_review
+from lib.alpaca_client import (get_bars_many, get_portfolio_history, get_clock,
+                               reset_retry_budget, retry_metrics, broker_circuit,
+                               essential_calls)
+from lib.market_state import MarketState
+from lib.strategy import (DEFAULT_PARAMS, PROTECTIVE_EXITS, evaluate_cycle, exit_order,
+                          exit_signal, mark_price)
+from lib.executor import execute_orders, load_context
+from lib.run_lock import ScanLock, record_skip
+from lib import state_store
+from lib.decisions import DecisionIndex, rotate_decisions_log, append_daily_review
 from lib.config import LOGS_DIR
-from lib.pdt import (is_pdt_restricted, count_day_trades, day_trades_remaining,
-                     would_be_day_trade, record_day_trade, cleanup_old_records)
-from lib.sim_portfolio import (init as sim_init, record_buy as sim_buy,
-                               record_sell as sim_sell, get_summary as sim_get_summary,
-                               get_portfolio as sim_get_portfolio)
-
-try:
-    from lib.discord_post import post_trades, update_dashboard, update_chart
-except ImportError:
-    def post_trades(_):
-        return False
+from lib.pdt import PDTBudget, PDTLedger, is_pdt_restricted
+from lib.market_calendar import session_bounds
+from lib.sim_portfolio import init as sim_init, session as sim_session
 
-    def update_dashboard(_):
-        return False
 
-    def update_chart(*a, **k):
-        return False
+# Heavy or rarely needed modules (numpy via lib.indicators, asyncio via lib.stream,
+# urllib/ssl via lib.discord_post) are imported on first use; see scripts/bench_startup.py.
+def _discord(name):
+    """lib.discord_post function, imported on first use; None if unavailable."""
+    try:
+        from lib import discord_post
+    except ImportError:
+        return None
+    return getattr(discord_post, name)
+
+
+def post_trades(text):
+    fn = _discord("post_trades")
+    return fn(text) if fn else False
+
+
+def update_dashboard(text):
+    fn = _discord("update_dashboard")
+    return fn(text) if fn else False
+
+
+def update_chart(*args, **kwargs):
+    fn = _discord("update_chart")
+    return fn(*args, **kwargs) if fn else False
+
 
 logging.basicConfig(
     level=logging.INFO,
@@ -82,183 +139,161 @@ LIVE_MODE = os.environ.get("GATEWAY_MODE", "paper").lower() == "live"
 # Set SIMULATED_BALANCE=100 in .env to test as if you only have $100
 SIMULATED_BALANCE = float(os.environ.get("SIMULATED_BALANCE", "0"))
 
-# ── Strategy parameters (v3) ────────────────────────────────────────────────
-# Risk management
-MAX_EXPOSURE_PCT = 1.00        # Max 100% equity deployed (no margin)
-MAX_POSITIONS = 12             # Hard cap on concurrent positions
-ALLOC_STRONG = 0.08            # RSI < 15: 8% of equity per position
-ALLOC_NORMAL = 0.05            # RSI < 25: 5% of equity per position
-BUY_BUFFER = 0.97              # Reserve 3% of BP for slippage
-DUST_THRESHOLD_PCT = 0.005     # Auto-sell positions < 0.5% of portfolio
-
-# Entry filters
-RSI_BUY_THRESHOLD = 30         # Buy below this RSI (widened from 25 — was too tight)
-RSI_STRONG_THRESHOLD = 20      # Larger allocation below this
-SMA_PERIOD = 20                # SMA(20) — short enough for IEX data availability
-VOLUME_SPIKE_RATIO = 0.8       # Volume >= 80% of 20-day avg (IEX underreports volume)
-MIN_BARS_FOR_SMA = 20          # Skip SMA filter if fewer bars available
-
-# Add-to-winners: deploy idle cash into best existing positions
-ADD_TO_WINNERS_CASH_PCT = 0.40  # Trigger when cash > 40% of equity
-ADD_TO_WINNER_MIN_PLPC = 0.02  # Position must be +2% or better
-ADD_TO_WINNER_ALLOC = 0.04     # Add 4% equity per top-up
-ADD_TO_WINNER_MAX_PCT = 0.15   # Don't grow any position beyond 15% of portfolio
-
-# Exit — profit taking
-PROFIT_TAKE_FULL_PCT = 0.08    # +8% → sell entire position
-PROFIT_TAKE_HALF_PCT = 0.04    # +4% → sell half
-TRAILING_ACTIVATE_PCT = 0.05   # Activate trailing stop once +5% reached
-TRAILING_STOP_PCT = 0.02       # Trail -2% from peak once activated
-
-# Exit — stop loss
-STOP_LOSS_PCT = -0.03          # -3% → sell all
-
-# RSI-based exits
-RSI_SELL_ALL = 70              # RSI > 70 → sell all
-RSI_SELL_HALF = 60             # RSI > 60 → sell half
-
-# Circuit breaker
-DAILY_DRAWDOWN_HALT = -0.02    # Halt buys if down >2% intraday
-
-_COOLDOWN_FILE = LOGS_DIR / "cooldown.json"
-_PARTIAL_SELL_FILE = LOGS_DIR / "partial_sell_today.json"
-_PEAK_FILE = LOGS_DIR / "trailing_peaks.json"
-_CHART_TS_FILE = LOGS_DIR / "last_chart_post.txt"
 CHART_INTERVAL_SEC = 1800     # Post chart at most once per 30 minutes
 
-
-def _load_partial_sell_today(today: str) -> set:
-    """Tickers already half-sold today. Prevents the halving spiral when scan runs repeatedly."""
-    if not _PARTIAL_SELL_FILE.exists():
-        return set()
-    try:
-        data = json.loads(_PARTIAL_SELL_FILE.read_text())
-        if data.get("date") == today:
-            return set(data.get("tickers", []))
-    except Exception:
-        pass
-    return set()
-
-
-def _save_partial_sell_today(today: str, tickers: set):
-    LOGS_DIR.mkdir(parents=True, exist_ok=True)
-    _PARTIAL_SELL_FILE.write_text(json.dumps({"date": today, "tickers": sorted(tickers)}))
+# Stream mode (--stream): re-sync positions/state files from the broker this often
+STREAM_REFRESH_SEC = 60
 
 
-def _load_cooldown(today: str) -> set:
-    """Load tickers on stop-loss cooldown today. Resets automatically on new day."""
-    if not _COOLDOWN_FILE.exists():
-        return set()
-    try:
-        data = json.loads(_COOLDOWN_FILE.read_text())
-        if data.get("date") == today:
-            return set(data.get("tickers", []))
-    except Exception:
-        pass
-    return set()
+# Per-ticker Wilder RSI state (lib.rsi.RSIState): loaded once per process, so the
+# daemon keeps it in memory across cycles; saved after every cycle
+_rsi_states = None
 
 
-def _save_cooldown(today: str, tickers: set):
-    LOGS_DIR.mkdir(parents=True, exist_ok=True)
-    _COOLDOWN_FILE.write_text(json.dumps({"date": today, "tickers": sorted(tickers)}))
+def _load_rsi_states():
+    global _rsi_states
+    if _rsi_states is None:
+        from lib.rsi import load_rsi_states
+        _rsi_states = load_rsi_states()
+    return _rsi_states
 
 
-def _load_peaks() -> dict:
-    """Load trailing-stop peak prices {ticker: peak_price}."""
-    if not _PEAK_FILE.exists():
-        return {}
+def _save_rsi_states():
+    from lib.rsi import save_rsi_states
     try:
-        return json.loads(_PEAK_FILE.read_text())
-    except Exception:
-        return {}
-
-
-def _save_peaks(peaks: dict):
-    LOGS_DIR.mkdir(parents=True, exist_ok=True)
-    _PEAK_FILE.write_text(json.dumps(peaks))
-
-
-def _total_market_value(positions):
-    return sum(float(p.get("market_value", 0)) for p in positions)
+        save_rsi_states(_rsi_states)
+    except OSError as e:
+        logger.warning("Could not save RSI state: %s", e)
 
 
 def _sync_sim_trades(sell_candidates, buy_candidates, positions, now, sim_mode):
-    """Sync all trades from this cycle into the sim portfolio.
+    """Sync all trades from this cycle into the sim portfolio in one session (one write).
 
     sell_candidates: [(ticker, qty, rsi, reason), ...]
     buy_candidates: [(ticker, notional, rsi, reason), ...]  (notional = $ amount)
+    Returns the committed SimSession (None outside sim mode).
     """
     if not sim_mode:
-        return
+        return None
     price_map = {p["ticker"]: float(p.get("current_price", 0)) for p in positions}
-    for ticker, qty, _, _ in sell_candidates:
-        price = price_map.get(ticker, 0)
-        if price > 0:
-            sim_sell(ticker, qty, price, now)
-    for ticker, notional, _, _ in buy_candidates:
-        price = price_map.get(ticker, 0)
-        if price > 0 and notional > 0:
-            sim_buy(ticker, notional, price, now)
-
-
-def _check_pdt(ticker, side, today, todays_decisions, pdt_active):
-    """Return True if this trade is safe from PDT. False = blocked."""
-    if not pdt_active:
-        return True
-    if not would_be_day_trade(ticker, side, today, todays_decisions):
-        return True
-    remaining = day_trades_remaining()
-    if remaining <= 0:
-        logger.warning("PDT BLOCKED %s %s: 0 day trades remaining", side.upper(), ticker)
-        return False
-    logger.warning("PDT: %s %s would use day trade (%d remaining)",
-                   side.upper(), ticker, remaining)
-    record_day_trade(ticker, today)
-    return True
+    with sim_session() as sim:
+        for ticker, qty, _, _ in sell_candidates:
+            price = price_map.get(ticker, 0)
+            if price > 0:
+                sim.sell(ticker, qty, price, now)
+        for ticker, notional, _, _ in buy_candidates:
+            price = price_map.get(ticker, 0)
+            if price > 0 and notional > 0:
+                sim.buy(ticker, notional, price, now)
+    return sim
+
+
+def _day_open_equity(today, opens_at, decisions, fallback):
+    """Account equity at today's calendar session open, cached per day in the state store.
+
+    Read from the broker's 1-minute portfolio history at opens_at. Before the
+    open, or until history has a point at/after it, falls back to the first
+    decision logged since the open, then to fallback (current equity).
+    """
+    saved = state_store.get(state_store.DAY_OPEN_EQUITY) or {}
+    if saved.get("date") == today:
+        return float(saved["equity"])
+    if opens_at is not None and datetime.now(timezone.utc) >= opens_at:
+        try:
+            hist = get_portfolio_history(period="1D", timeframe="1Min")
+        except Exception as e:
+            logger.warning("Day-open equity: portfolio history failed: %s", e)
+        else:
+            open_ts = opens_at.timestamp()
+            for ts, eq in zip(hist["timestamp"], hist["equity"]):
+                if ts >= open_ts and eq:
+                    state_store.put(state_store.DAY_OPEN_EQUITY, {"date": today, "equity": eq})
+                    return eq
+    return decisions.day_open_equity if decisions.day_open_equity is not None else fallback
 
 
 def _post_chart_throttled(now_iso):
     """Post equity chart to Discord, but at most once per CHART_INTERVAL_SEC."""
-    import time as _time
-    now_ts = _time.time()
-    if _CHART_TS_FILE.exists():
-        try:
-            last_ts = float(_CHART_TS_FILE.read_text().strip())
-            if now_ts - last_ts < CHART_INTERVAL_SEC:
-                logger.debug("Chart post throttled (last %.0fs ago)",
-                             now_ts - last_ts)
-                return
-        except (ValueError, OSError):
-            pass
+    now_ts = time.time()
+    last_ts = state_store.get(state_store.LAST_CHART_POST)
+    if last_ts is not None and now_ts - float(last_ts) < CHART_INTERVAL_SEC:
+        logger.debug("Chart post throttled (last %.0fs ago)", now_ts - float(last_ts))
+        return
     try:
-        from lib.chart import equity_chart_png
+        from lib.chart import equity_chart_png, history_digest
         hist = get_portfolio_history(period="1M", timeframe="1D")
-        if hist.get("equity"):
-            png = equity_chart_png(hist)
-            if png and update_chart(png, content="📈 Portfolio — 1M"):
-                LOGS_DIR.mkdir(parents=True, exist_ok=True)
-                _CHART_TS_FILE.write_text(str(now_ts))
+        digest = history_digest(hist)
+        if digest is None:
+            return
+        if digest == state_store.get(state_store.CHART_DIGEST):
+            # Same history as the posted chart: no render, no matplotlib import
+            logger.debug("Chart unchanged, skipping render")
+            state_store.put(state_store.LAST_CHART_POST, now_ts)
+            return
+        png = equity_chart_png(hist)
+        if png and update_chart(png, content="📈 Portfolio — 1M"):
+            with state_store.StateBatch() as batch:
+                batch.put(state_store.LAST_CHART_POST, now_ts)
+                batch.put(state_store.CHART_DIGEST, digest)
     except Exception as e:
         logger.warning("Chart error: %s", e)
 
 
+def _run_protective(now, today):
+    """Broker circuit open: stop-loss / trailing-stop exits only, one attempt each, no bars/dashboard."""
+    since = datetime.utcfromtimestamp(broker_circuit.opened_at or time.time()).strftime("%H:%M")
+    sim_mode = SIMULATED_BALANCE > 0
+    with essential_calls():
+        try:
+            state = MarketState().refresh()
+        except Exception as e:
+            print(f"⚡ Broker circuit OPEN since {since} UTC — cycle skipped ({e})")
+            return
+        equity = SIMULATED_BALANCE if sim_mode else state.equity
+        params = DEFAULT_PARAMS.for_sim() if sim_mode else DEFAULT_PARAMS
+        positions = [dict(p) for p in state.positions]
+        ctx = load_context(today, equity)
+        orders = [o for o in evaluate_cycle(state, None, params, ctx, indicators={})
+                  if o.kind in PROTECTIVE_EXITS]
+        report = execute_orders(orders, state, ctx, now, reconcile=False)
+    _sync_sim_trades(report.sells, [], positions, now, sim_mode)
+    lines = [f"⚡ Broker circuit OPEN since {since} UTC — protective mode "
+             f"({len(positions)} pos, {len(report.sells)} protective sells)"]
+    if report.sells:
+        lines.append("Sold: " + ", ".join(f"{t} ×{q} ({label.split('(')[0].strip()})"
+                                          for t, q, _, label in report.sells))
+        post_trades("\n".join(f"🔴 SELL {t} ×{q} — {label} (broker degraded)"
+                              for t, q, _, label in report.sells))
+    if report.errors:
+        lines.append("Errors: " + " | ".join(report.errors[:2]))
+    print("\n".join(lines))
+
+
 def main():
     validate_env()
+    reset_retry_budget()
     now = datetime.utcnow().isoformat() + "Z"
     today = now[:10]
 
-    order_errors = []
+    # Broker outage: skip the full cycle, only let protective stop-losses through
+    if broker_circuit.load().state == "open":
+        _run_protective(now, today)
+        return
 
-    account = get_account()
-    if not account:
+    # One snapshot per cycle; orders below update it locally instead of re-fetching
+    state = MarketState().refresh()
+    if not state.account:
         logger.error("Failed to get account")
         print("Failed to get account", file=sys.stderr)
         return
-    actual_equity = float(account.get("equity", 0))
+    actual_equity = state.equity
     equity = SIMULATED_BALANCE if SIMULATED_BALANCE > 0 else actual_equity
-    positions = get_positions()
+    # Pre-trade P&L per ticker, for the #trades message after positions are sold
+    entry_plpc = {p["ticker"]: float(p.get("unrealized_plpc", 0) or 0)
+                  for p in state.positions}
 
     sim_mode = SIMULATED_BALANCE > 0
+    params = DEFAULT_PARAMS.for_sim() if sim_mode else DEFAULT_PARAMS
     if sim_mode:
         sim_init(SIMULATED_BALANCE)
         logger.info("SIMULATED BALANCE: $%.2f (actual account: $%.2f)",
@@ -266,413 +301,84 @@ def main():
 
     # PDT protection — always enforced when equity (sim or real) is under $25K
     pdt_active = is_pdt_restricted(equity)
-    if pdt_active or LIVE_MODE:
+    pdt_ledger = PDTLedger.load(today) if pdt_active or LIVE_MODE else None
+    if pdt_ledger is not None:
         logger.info("%s — PDT %s (equity $%.0f, %d day trades used)",
                     "LIVE" if LIVE_MODE else "SIM",
                     "ACTIVE" if pdt_active else "exempt (>$25K)",
-                    equity, count_day_trades())
-        cleanup_old_records()
-
-    cooldown_tickers = _load_cooldown(today)
-    if cooldown_tickers:
-        logger.info("Cooldown active today for: %s", ", ".join(sorted(cooldown_tickers)))
-
-    # Tickers already half-sold today — skip further half-sells to prevent halving spiral
-    partial_sell_today = _load_partial_sell_today(today)
+                    equity, pdt_ledger.count())
+        pdt_ledger.compact()
 
-    peaks = _load_peaks()
+    ctx = load_context(today, equity)
+    ctx.sim_mode = sim_mode
+    if ctx.cooldown_tickers:
+        logger.info("Cooldown active today for: %s", ", ".join(sorted(ctx.cooldown_tickers)))
 
     # Daily loss circuit breaker (always uses actual equity, not simulated)
-    todays_decisions = [d for d in load_recent_decisions(limit=500)
-                        if d.get("timestamp", "")[:10] == today]
-    day_open_equity = (float(todays_decisions[0].get("portfolio_value", actual_equity))
-                       if todays_decisions else actual_equity)
+    session = session_bounds(today)
+    ctx.decisions = decisions = DecisionIndex.load(today, opens_at=session and session[0])
+    day_open_equity = _day_open_equity(today, session and session[0], decisions, actual_equity)
     day_drawdown = ((actual_equity - day_open_equity) / day_open_equity
                     if day_open_equity > 0 else 0)
-    buys_halted = day_drawdown <= DAILY_DRAWDOWN_HALT
+    ctx.buys_halted = buys_halted = day_drawdown <= params.daily_drawdown_halt
+    if pdt_active:
+        ctx.pdt = PDTBudget.from_ledger(pdt_ledger, decisions)
     if buys_halted:
         logger.warning(
             "Circuit breaker: portfolio down %.2f%% today — no new buys",
             day_drawdown * 100)
 
-    buy_candidates = []
-    sell_candidates = []
     groups = load_watchlist()
-    all_rsi = {}
-
-    # === PHASE 1: Stop-loss, trailing stop, and profit-taking ===
-    for pos in positions:
-        ticker = pos["ticker"]
-        qty = float(pos["qty"])
-        available_qty = pos.get("available_qty", qty)
-        plpc = float(pos.get("unrealized_plpc", 0) or 0)
-        cur_price = float(pos.get("current_price", 0))
-
-        if available_qty <= 0:
-            logger.warning("Skipping %s: %d shares held by open orders", ticker, qty)
-            continue
-
-        # Update trailing-stop peak tracker
-        if plpc >= TRAILING_ACTIVATE_PCT:
-            prev_peak = peaks.get(ticker, cur_price)
-            peaks[ticker] = max(prev_peak, cur_price)
-        elif ticker in peaks and plpc < 0:
-            del peaks[ticker]
-
-        # Hard stop-loss: -3%
-        if plpc < STOP_LOSS_PCT:
-            sell_qty = min(qty, available_qty)
-            sell(ticker, sell_qty)
-            sell_candidates.append((ticker, sell_qty, 0, "stop-loss"))
-            log_decision({"timestamp": now, "action": "sell", "ticker": ticker,
-                          "shares": sell_qty,
-                          "reason": f"stop-loss {STOP_LOSS_PCT * 100:.0f}%",
-                          "plpc": plpc, "price": cur_price,
-                          "portfolio_value": equity})
-            log_outcome({"timestamp": now, "ticker": ticker, "action": "sell",
-                         "reason": "stop-loss", "plpc": plpc, "shares": sell_qty})
-            cooldown_tickers.add(ticker)
-            _save_cooldown(today, cooldown_tickers)
-            peaks.pop(ticker, None)
-            logger.info("STOP-LOSS %s at %.2f%%, added to cooldown", ticker, plpc * 100)
-            continue
-
-        # Trailing stop: price dropped >2% from tracked peak
-        if ticker in peaks and cur_price > 0:
-            peak = peaks[ticker]
-            drop_from_peak = (cur_price - peak) / peak
-            if drop_from_peak < -TRAILING_STOP_PCT:
-                sell_qty = min(qty, available_qty)
-                sell(ticker, sell_qty)
-                reason = f"trailing-stop (peak ${peak:.2f}, now ${cur_price:.2f})"
-                sell_candidates.append((ticker, sell_qty, 0, reason))
-                log_decision({"timestamp": now, "action": "sell", "ticker": ticker,
-                              "shares": sell_qty, "reason": reason, "plpc": plpc,
-                              "price": cur_price, "portfolio_value": equity})
-                log_outcome({"timestamp": now, "ticker": ticker, "action": "sell",
-                             "reason": "trailing-stop", "plpc": plpc, "shares": sell_qty})
-                peaks.pop(ticker, None)
-                logger.info("TRAILING-STOP %s: peak=$%.2f now=$%.2f (%.1f%% from peak)",
-                            ticker, peak, cur_price, drop_from_peak * 100)
-                continue
-
-        # Profit-take full: +8% (PDT-checked — skip if it would waste a day trade)
-        if plpc >= PROFIT_TAKE_FULL_PCT:
-            if not _check_pdt(ticker, "sell", today, todays_decisions, pdt_active):
-                continue
-            sell_qty = min(qty, available_qty)
-            sell(ticker, sell_qty)
-            sell_candidates.append((ticker, sell_qty, 0, "profit-take-full"))
-            log_decision({"timestamp": now, "action": "sell", "ticker": ticker,
-                          "shares": sell_qty,
-                          "reason": f"profit-take +{PROFIT_TAKE_FULL_PCT * 100:.0f}%",
-                          "plpc": plpc, "price": cur_price,
-                          "portfolio_value": equity})
-            log_outcome({"timestamp": now, "ticker": ticker, "action": "sell",
-                         "reason": "profit-take-full", "plpc": plpc, "shares": sell_qty})
-            peaks.pop(ticker, None)
-            continue
-
-        # Profit-take half: +4% (PDT-checked, max once per ticker per day)
-        if plpc >= PROFIT_TAKE_HALF_PCT:
-            if ticker in partial_sell_today:
-                logger.info("Skipping profit-take-half %s: already half-sold today", ticker)
-                continue
-            if not _check_pdt(ticker, "sell", today, todays_decisions, pdt_active):
-                continue
-            sell_qty = min(qty / 2, available_qty)
-            if sell_qty > 0.0001:
-                sell(ticker, sell_qty)
-                partial_sell_today.add(ticker)
-                _save_partial_sell_today(today, partial_sell_today)
-                sell_candidates.append((ticker, sell_qty, 0, "profit-take-half"))
-                log_decision({"timestamp": now, "action": "sell", "ticker": ticker,
-                              "shares": sell_qty,
-                              "reason": f"profit-take +{PROFIT_TAKE_HALF_PCT * 100:.0f}% half",
-                              "plpc": plpc, "price": cur_price,
-                              "portfolio_value": equity})
-                log_outcome({"timestamp": now, "ticker": ticker, "action": "sell",
-                             "reason": "profit-take-half", "plpc": plpc,
-                             "shares": sell_qty})
-
-    _save_peaks(peaks)
-    positions = get_positions()
-
-    # === PHASE 1b: Dust cleanup — sell tiny positions that can't be managed ===
-    dust_threshold = equity * DUST_THRESHOLD_PCT
-    for pos in positions:
-        ticker = pos["ticker"]
-        mv = float(pos.get("market_value", 0))
-        qty = float(pos["qty"])
-        available_qty = pos.get("available_qty", qty)
-        if mv < dust_threshold and available_qty > 0 and qty > 0:
-            plpc = float(pos.get("unrealized_plpc", 0) or 0)
-            sell(ticker, min(qty, available_qty))
-            sell_candidates.append((ticker, qty, 0, "dust-cleanup"))
-            log_decision({"timestamp": now, "action": "sell", "ticker": ticker,
-                          "shares": qty, "reason": "dust-cleanup (< 0.5% of portfolio)",
-                          "plpc": plpc, "price": pos.get("current_price"),
-                          "portfolio_value": equity})
-            log_outcome({"timestamp": now, "ticker": ticker, "action": "sell",
-                         "reason": "dust-cleanup", "plpc": plpc, "shares": qty})
-            peaks.pop(ticker, None)
-            logger.info("DUST-CLEANUP %s: $%.0f < $%.0f threshold", ticker, mv,
-                        dust_threshold)
-
-    _save_peaks(peaks)
-    positions = get_positions()
-    held_tickers = {p["ticker"] for p in positions}
-
-    # === PHASE 2: RSI-based sells and buys ===
-    acct = get_account()
-    remaining_bp = float(acct.get("buying_power", 0)) if acct else 0
-    current_exposure = _total_market_value(positions)
-    n_positions = len(positions)
+    ctx.watchlist = [t for tickers in groups for t in tickers]
     sim_limits_line = None
 
     # In sim mode, use sim portfolio for buy limits so we can open positions with $100
     if sim_mode:
-        sim_data = sim_get_portfolio()
+        ctx.buying_power = state.buying_power
+        sim_start = sim_session()
+        sim_data = sim_start.data
         if sim_data:
             pos_prices = {p["ticker"]: float(p.get("current_price", 0))
-                          for p in positions}
+                          for p in state.positions}
             sim_pos = sim_data.get("positions", {})
             for t, pos in sim_pos.items():
                 if t not in pos_prices:
                     pos_prices[t] = float(pos.get("avg_entry", 0))
-            sim_sum = sim_get_summary(pos_prices)
-            remaining_bp = sim_sum.get("cash", sim_data.get("cash", 0))
-            current_exposure = sim_sum.get("market_value", 0)
-            n_positions = sim_sum.get("position_count", 0)
-            held_tickers = set(sim_pos.keys())
+            sim_sum = sim_start.summary(pos_prices)
+            ctx.buying_power = sim_sum.get("cash", sim_data.get("cash", 0))
+            ctx.exposure = sim_sum.get("market_value", 0)
+            ctx.n_positions = sim_sum.get("position_count", 0)
+            ctx.held = set(sim_pos.keys())
             logger.info("SIM — using sim portfolio for buy limits (cash $%.2f, exposure $%.2f, %d pos)",
-                        remaining_bp, current_exposure, n_positions)
+                        ctx.buying_power, ctx.exposure, ctx.n_positions)
             sim_limits_line = (
-                f"SIM buy limits: cash ${remaining_bp:,.2f}, "
-                f"exposure ${current_exposure:,.2f}, {n_positions} pos"
+                f"SIM buy limits: cash ${ctx.buying_power:,.2f}, "
+                f"exposure ${ctx.exposure:,.2f}, {ctx.n_positions} pos"
             )
 
-    # In sim mode, track why we skip each low-RSI ticker so we can report "why no buy" in Discord
-    skip_reasons = []
-
-    for tickers in groups:
-        bars_data = get_bars(tickers, days=60)
-        if not bars_data:
-            continue
-        for ticker in tickers:
-            if ticker not in bars_data:
-                continue
-            bars = bars_data[ticker]
-            close_prices = [float(b["close"]) for b in bars]
-            rsi = compute_rsi(close_prices)
-            if rsi is None:
-                continue
-            all_rsi[ticker] = rsi
-
-            if ticker in held_tickers:
-                pos = next((p for p in positions if p["ticker"] == ticker), None)
-                if not pos:
-                    continue
-                qty = float(pos["qty"])
-                available_qty = pos.get("available_qty", qty)
-                if available_qty <= 0:
-                    logger.warning("Skipping RSI sell %s: %d shares held by open orders",
-                                   ticker, qty)
-                    continue
-                sell_qty = 0
-                reason = ""
-                if rsi > RSI_SELL_ALL:
-                    sell_qty = min(qty, available_qty)
-                    reason = f"RSI sell-all ({rsi:.1f})"
-                elif rsi > RSI_SELL_HALF:
-                    if ticker in partial_sell_today:
-                        logger.info("Skipping RSI sell-half %s: already half-sold today", ticker)
-                    else:
-                        sell_qty = min(qty / 2, available_qty)
-                        reason = f"RSI sell-half ({rsi:.1f})"
-                if sell_qty > 0.0001:
-                    if not _check_pdt(ticker, "sell", today, todays_decisions,
-                                      pdt_active):
-                        continue
-                    sell(ticker, sell_qty)
-                    if "half" in reason:
-                        partial_sell_today.add(ticker)
-                        _save_partial_sell_today(today, partial_sell_today)
-                    sell_candidates.append((ticker, sell_qty, rsi, reason))
-                    log_decision({"timestamp": now, "action": "sell", "ticker": ticker,
-                                  "shares": sell_qty, "reason": reason, "rsi": rsi,
-                                  "price": pos.get("current_price"),
-                                  "portfolio_value": equity})
-                    log_outcome({"timestamp": now, "ticker": ticker, "action": "sell",
-                                 "reason": reason, "rsi": rsi, "shares": sell_qty})
-            else:
-                # ── Entry filters (all must pass) ──
-                rsi_buy_threshold = 35 if sim_mode else RSI_BUY_THRESHOLD  # sim: allow RSI<35 for more activity
-                if rsi >= rsi_buy_threshold:
-                    continue
-                # From here, ticker has RSI below threshold — track skip reason for "why no buy" in sim mode
-                if ticker in cooldown_tickers:
-                    if sim_mode:
-                        skip_reasons.append((ticker, rsi, "cooldown"))
-                    logger.info("Skipping buy %s: on stop-loss cooldown today", ticker)
-                    continue
-                if buys_halted:
-                    if sim_mode:
-                        skip_reasons.append((ticker, rsi, "circuit_breaker"))
-                    logger.info("Skipping buy %s: circuit breaker active", ticker)
-                    continue
-                if n_positions >= MAX_POSITIONS:
-                    if sim_mode:
-                        skip_reasons.append((ticker, rsi, "max_pos"))
-                    logger.info("Skipping buy %s: at max %d positions",
-                                ticker, MAX_POSITIONS)
-                    continue
-                if current_exposure >= equity * MAX_EXPOSURE_PCT:
-                    if sim_mode:
-                        skip_reasons.append((ticker, rsi, "exposure"))
-                    logger.info("Skipping buy %s: exposure %.1f%% >= %.0f%% cap",
-                                ticker, current_exposure / equity * 100,
-                                MAX_EXPOSURE_PCT * 100)
-                    continue
-
-                # SMA trend filter: only buy dips in uptrends (skip if insufficient data)
-                sma = None
-                cur_close = close_prices[-1] if close_prices else 0
-                if len(close_prices) >= MIN_BARS_FOR_SMA:
-                    sma = compute_sma(close_prices, SMA_PERIOD)
-                sma_max_drawdown = 0.15 if sim_mode else 0.05
-                if sma and cur_close < sma * (1 - sma_max_drawdown):
-                    if sim_mode:
-                        skip_reasons.append((ticker, rsi, "below_sma"))
-                    logger.info("Skipping buy %s: price $%.2f > %.0f%% below SMA%d $%.2f",
-                                ticker, cur_close, sma_max_drawdown * 100, SMA_PERIOD, sma)
-                    continue
-
-                # Volume confirmation (sim: 25% of avg ok so IEX underreport / low-volume names can trade)
-                vol_avg = avg_volume(bars, 20)
-                last_vol = bars[-1].get("volume", 0) if bars else 0
-                vol_ratio_required = 0.25 if sim_mode else VOLUME_SPIKE_RATIO
-                if vol_avg and vol_avg > 0 and last_vol < vol_avg * vol_ratio_required:
-                    if sim_mode:
-                        skip_reasons.append((ticker, rsi, "low_vol"))
-                    logger.info("Skipping buy %s: volume %d < %.0f (%.1fx avg required)",
-                                ticker, last_vol, vol_avg * vol_ratio_required,
-                                vol_ratio_required)
-                    continue
-
-                # RSI momentum: must be turning up (in sim mode we allow flat/falling to get more activity)
-                if not sim_mode and not rsi_turning_up(close_prices):
-                    logger.info("Skipping buy %s: RSI %.1f still falling", ticker, rsi)
-                    continue
-                if sim_mode and not rsi_turning_up(close_prices):
-                    skip_reasons.append((ticker, rsi, "rsi_falling"))
-                    # In sim we still allow the buy (don't continue) so the $100 sim stays active
-
-                # ── Sizing (notional / dollar-based for fractional share support) ──
-                alloc_pct = ALLOC_STRONG if rsi < RSI_STRONG_THRESHOLD else ALLOC_NORMAL
-                max_new_exposure = equity * MAX_EXPOSURE_PCT - current_exposure
-                if max_new_exposure <= 0:
-                    if sim_mode:
-                        skip_reasons.append((ticker, rsi, "exposure"))
-                    continue
-                # In sim mode use only sim cash; otherwise cap by real buying power
-                if sim_mode:
-                    buying_power = remaining_bp * BUY_BUFFER
-                else:
-                    acct = get_account()
-                    fresh_bp = float(acct.get("buying_power", 0)) if acct else 0
-                    buying_power = min(remaining_bp, fresh_bp) * BUY_BUFFER
-                notional = equity * alloc_pct
-                notional = min(notional, max_new_exposure, buying_power)
-                if notional < 1.0:
-                    if sim_mode:
-                        skip_reasons.append((ticker, rsi, "notional<1"))
-                    logger.info("Skipping buy %s: notional $%.2f too small", ticker,
-                                notional)
-                    continue
-                if not _check_pdt(ticker, "buy", today, todays_decisions, pdt_active):
-                    if sim_mode:
-                        skip_reasons.append((ticker, rsi, "pdt"))
-                    continue
-
-                try:
-                    buy_notional(ticker, notional)
-                except Exception as e:
-                    logger.error("BUY FAILED %s $%.2f: %s", ticker, notional, e)
-                    order_errors.append(f"BUY FAILED {ticker} ${notional:,.2f}: {e}")
-                    continue
-                remaining_bp = max(0, remaining_bp - notional)
-                current_exposure += notional
-                n_positions += 1
-                buy_candidates.append((ticker, notional, rsi,
-                                       f"RSI buy ${notional:.0f} ({rsi:.1f})"))
-                log_decision({"timestamp": now, "action": "buy", "ticker": ticker,
-                              "notional": round(notional, 2), "rsi": rsi,
-                              "allocation_pct": alloc_pct, "portfolio_value": equity,
-                              "filters": {
-                                  "sma": round(sma, 2) if sma else None,
-                                  "vol_ratio": round(last_vol / vol_avg, 2) if vol_avg else None,
-                              }})
-                log_outcome({"timestamp": now, "ticker": ticker, "action": "buy",
-                             "reason": f"RSI {rsi:.1f}", "notional": round(notional, 2)})
-                if sim_mode:
-                    held_tickers.add(ticker)
-
-    # === PHASE 3: Add to winners when cash is too high ===
-    if not buys_halted:
-        acct = get_account()
-        cash_now = remaining_bp if sim_mode else (float(acct.get("cash", 0)) if acct else 0)
-        positions = get_positions()
-        if not sim_mode:
-            current_exposure = _total_market_value(positions)
-        if cash_now > equity * ADD_TO_WINNERS_CASH_PCT:
-            candidate_positions = positions if not sim_mode else [p for p in positions if p["ticker"] in held_tickers]
-            winners = [p for p in candidate_positions
-                       if float(p.get("unrealized_plpc", 0) or 0) >= ADD_TO_WINNER_MIN_PLPC]
-            winners.sort(key=lambda x: -float(x.get("unrealized_plpc", 0) or 0))
-            for pos in winners[:3]:
-                ticker = pos["ticker"]
-                mv = float(pos.get("market_value", 0))
-                if mv >= equity * ADD_TO_WINNER_MAX_PCT:
-                    continue
-                if current_exposure >= equity * MAX_EXPOSURE_PCT:
-                    break
-                price = float(pos.get("current_price", 0))
-                if price <= 0:
-                    continue
-                notional = min(
-                    equity * ADD_TO_WINNER_ALLOC,
-                    equity * ADD_TO_WINNER_MAX_PCT - mv,
-                    equity * MAX_EXPOSURE_PCT - current_exposure,
-                    cash_now * BUY_BUFFER)
-                if notional < 1.0:
-                    continue
-                try:
-                    buy_notional(ticker, notional)
-                except Exception as e:
-                    logger.error("BUY FAILED %s $%.2f (add-to-winner): %s", ticker, notional, e)
-                    order_errors.append(f"BUY FAILED {ticker} ${notional:,.2f} (add-to-winner): {e}")
-                    continue
-                current_exposure += notional
-                plpc = float(pos.get("unrealized_plpc", 0) or 0)
-                buy_candidates.append((ticker, notional, 0,
-                                       f"add-to-winner ${notional:.0f}"
-                                       f" ({plpc * 100:+.1f}%)"))
-                log_decision({"timestamp": now, "action": "buy", "ticker": ticker,
-                              "notional": round(notional, 2),
-                              "reason": f"add-to-winner (cash"
-                                        f" {cash_now / equity * 100:.0f}%)",
-                              "portfolio_value": equity})
-                log_outcome({"timestamp": now, "ticker": ticker, "action": "buy",
-                             "reason": "add-to-winner",
-                             "notional": round(notional, 2)})
-                logger.info("ADD-TO-WINNER %s: +$%.2f (was %+.1f%%)",
-                            ticker, notional, plpc * 100)
+    # === Decide (Phases 1, 1b, 2, 3 — lib.strategy), then submit and record ===
+    bars_data = get_bars_many(groups, days=60)
+    from lib.indicators import compute_indicators
+    indicators = compute_indicators(bars_data, sma_period=params.sma_period, volume_period=20,
+                                    rsi_states=_load_rsi_states())
+    _save_rsi_states()
+    all_rsi = {t: ind["rsi"] for t, ind in indicators.items() if ind["rsi"] is not None}
+    orders = evaluate_cycle(state, bars_data, params, ctx, indicators=indicators)
+    report = execute_orders(orders, state, ctx, now)
+    sell_candidates = report.sells
+    buy_candidates = report.buys
+    order_errors = report.errors
+    # In sim mode, track why we skipped each low-RSI ticker so we can report "why no buy" in Discord
+    skip_reasons = ctx.skip_reasons
+    cooldown_tickers = ctx.cooldown_tickers
 
     # === Sync sim portfolio ===
-    final_account = get_account()
-    final_positions = get_positions()
-    _sync_sim_trades(sell_candidates, buy_candidates, final_positions, now, sim_mode)
+    # Broker truth is only needed for the summary when orders went out this cycle
+    if sell_candidates or buy_candidates:
+        state.refresh()
+    final_account = state.account
+    final_positions = state.positions
+    sim = _sync_sim_trades(sell_candidates, buy_candidates, final_positions, now, sim_mode)
 
     # === Summary & Discord output ===
     final_equity = float(final_account.get("equity", 0)) if final_account else equity
@@ -682,7 +388,7 @@ def main():
     if sim_mode:
         _sim_price_map = {p["ticker"]: float(p.get("current_price", 0))
                           for p in final_positions}
-        sim_summary = sim_get_summary(_sim_price_map)
+        sim_summary = sim.summary(_sim_price_map)
         daily_pl = sim_summary.get("unrealized_pl", 0)
         n_pos = sim_summary.get("position_count", 0)
         exposure = sim_summary.get("market_value", 0)
@@ -693,7 +399,7 @@ def main():
         sim_summary = None
         daily_pl = sum(float(p.get("unrealized_pl", 0) or 0) for p in final_positions)
         n_pos = len(final_positions)
-        exposure = _total_market_value(final_positions)
+        exposure = state.total_market_value()
         display_equity = final_equity
         exposure_pct = (exposure / display_equity * 100) if display_equity > 0 else 0
         from_start = final_equity - 100_000
@@ -718,10 +424,9 @@ def main():
     if had_trades:
         trades_lines = []
         for t, q, r, reason in sell_candidates:
-            pos = next((p for p in positions if p["ticker"] == t), None)
             plpc_str = ""
-            if pos:
-                plpc_str = f" ({float(pos.get('unrealized_plpc', 0)) * 100:+.1f}%)"
+            if t in entry_plpc:
+                plpc_str = f" ({entry_plpc[t] * 100:+.1f}%)"
             trades_lines.append(f"🔴 SELL {t} ×{q}{plpc_str} — {reason}")
         for t, q, r, reason in buy_candidates:
             trades_lines.append(f"🟢 BUY {t} — {reason}")
@@ -735,7 +440,12 @@ def main():
         cycle_lines.append(sim_limits_line)
     if order_errors:
         cycle_lines.append("Errors: " + " | ".join(order_errors[:2]))
-    if sim_mode and not buy_candidates and (remaining_bp or 0) >= 1:
+    retries = retry_metrics()
+    if retries["retries"] or retries["budget_exhausted"]:
+        logger.info("API retries this cycle: %s", retries)
+        cycle_lines.append(f"API retries: {retries['retries']} ({retries['retry_sleep_sec']:.1f}s)"
+                           + (" · retry budget spent" if retries["budget_exhausted"] else ""))
+    if sim_mode and not buy_candidates and (ctx.buying_power or 0) >= 1:
         if skip_reasons:
             why = "; ".join(f"{t} RSI{r:.0f}({reason})" for t, r, reason in skip_reasons[:5])
             cycle_lines.append("No buy: " + why)
@@ -767,15 +477,13 @@ def main():
         pass
 
     # ── Self-improvement logging (always) ──
-    decisions_today = [d for d in load_recent_decisions(limit=500)
-                       if d.get("timestamp", "")[:10] == today]
     append_daily_review({
         "date": today,
         "equity": final_equity,
         "daily_pl": daily_pl,
-        "trades": len([d for d in decisions_today if d.get("action") in ("buy", "sell")]),
-        "buys": len([d for d in decisions_today if d.get("action") == "buy"]),
-        "sells": len([d for d in decisions_today if d.get("action") == "sell"]),
+        "trades": decisions.counts["buy"] + decisions.counts["sell"],
+        "buys": decisions.counts["buy"],
+        "sells": decisions.counts["sell"],
         "positions": n_pos,
         "exposure_pct": round(exposure_pct, 1),
     })
@@ -832,5 +540,223 @@ def main():
     _post_chart_throttled(now)
 
 
+def run_once(wait=0.0, mode="scan"):
+    """Run one cycle under the scan lock. If another run holds it (after waiting up
+    to `wait` seconds), record the skip and print a one-line notice instead."""
+    lock = ScanLock(mode)
+    started = time.monotonic()
+    if not lock.acquire(wait):
+        rec = record_skip(lock, time.monotonic() - started)
+        print(f"Skipped: {rec['holder_mode'] or 'scan'} run still in progress "
+              f"(pid {rec['holder_pid']}, {rec['holder_runtime_sec'] or 0:.0f}s)"
+              + (" — holder looks stuck" if rec["holder_stuck"] else ""))
+        return False
+    try:
+        main()
+    finally:
+        lock.release()
+    return True
+
+
+_stop_event = threading.Event()
+
+
+def _handle_stop(signum, _frame):
+    logger.info("Daemon: received signal %s, stopping after current cycle", signum)
+    _stop_event.set()
+
+
+def _confirm_session(mode):
+    """Check a calendar-only "open" against the broker clock (cached until the next transition)."""
+    try:
+        decision = session_gate.confirm(get_clock(), mode)
+    except Exception as e:
+        logger.warning("Market clock unavailable, trusting calendar: %s", e)
+        return True
+    if not decision.open:
+        print(f"Skipped: {decision.reason}")
+    return decision.open
+
+
+def run_daemon(interval=DAEMON_INTERVAL_SEC, session="regular"):
+    """Resident scanner: run main() every `interval` seconds while the market is open.
+
+    Keeps the interpreter, imported SDKs, Alpaca clients and caches warm across
+    cycles. Open/closed comes from lib.session_gate: the local calendar, with
+    the Alpaca clock fetched once per session transition to confirm. While
+    closed the loop sleeps until the next open, waking at least every
+    DAEMON_MAX_IDLE_SEC. Each cycle prints the same stdout summary as a
+    one-shot run.
+    """
+    signal.signal(signal.SIGTERM, _handle_stop)
+    signal.signal(signal.SIGINT, _handle_stop)
+    validate_env()
+    logger.info("Daemon: started (interval %ss, %s session)", interval, session)
+    while not _stop_event.is_set():
+        now_dt = datetime.now(timezone.utc)
+        decision = session_gate.check(session, now_dt)
+        if decision.verify:
+            try:
+                decision = session_gate.confirm(get_clock(), session, now_dt)
+            except Exception as e:
+                logger.warning("Daemon: clock unavailable, trusting calendar: %s", e)
+        if not decision.open:
+            wait = ((decision.until - now_dt).total_seconds() if decision.until
+                    else DAEMON_MAX_IDLE_SEC)
+            wait = min(max(wait, 1), DAEMON_MAX_IDLE_SEC)
+            logger.info("Daemon: %s (sleeping %.0fs)", decision.reason, wait)
+            _stop_event.wait(wait)
+            continue
+        started = time.monotonic()
+        try:
+            run_once(mode="daemon")
+        except Exception:
+            logger.exception("Daemon: cycle failed")
+        sys.stdout.flush()
+        _stop_event.wait(max(0.0, interval - (time.monotonic() - started)))
+    logger.info("Daemon: stopped")
+
+
+def _stream_reload(ctx, state):
+    """Refresh broker snapshot and per-day state files for stream mode."""
+    reset_retry_budget()
+    state.refresh()
+    now = datetime.utcnow().isoformat() + "Z"
+    today = now[:10]
+    actual_equity = state.equity
+    equity = SIMULATED_BALANCE if SIMULATED_BALANCE > 0 else actual_equity
+    loaded = time.time()
+    cycle = load_context(today, equity)
+    session = session_bounds(today)
+    cycle.decisions = DecisionIndex.load(today, opens_at=session and session[0])
+    if is_pdt_restricted(equity):
+        cycle.pdt = PDTBudget.from_ledger(PDTLedger.load(today), cycle.decisions)
+    # peaks_dirty: tickers whose peak changed in memory and isn't written yet
+    ctx.update({"cycle": cycle, "refreshed": time.monotonic(), "loaded": loaded,
+                "peaks_dirty": set()})
+
+
+def run_stream(stream=None):
+    """Event-driven exits: run Phase 1 checks on every streamed price for held positions.
+
+    Subscribes to minute bars for held + watchlist tickers and to trades for held
+    tickers (lib.stream), reprices the position from each event and applies the
+    same stop-loss / trailing-stop / profit-take rules as main(). Entries stay on
+    the regular cycle. Events are handled on the feed's worker thread; each
+    reload re-syncs the trade subscriptions with current holdings. Pass a
+    lib.stream.ReplayStream to run without a network.
+    """
+    validate_env()
+    sim_mode = SIMULATED_BALANCE > 0
+    state = MarketState()
+    ctx = {"lock_missed": False}
+    _stream_reload(ctx, state)
+    from lib.stream import PriceFeed
+
+    def reload():
+        _stream_reload(ctx, state)
+        feed.set_trade_symbols(state.held_tickers())
+
+    def flush_peaks():
+        """Write changed peaks key by key onto the stored dict, under the scan lock.
+
+        If anything else wrote the peaks since our load (a scan ran), our
+        positions and peaks may be stale: reload instead, and let the next price
+        event recompute them.
+        """
+        lock = ScanLock("stream")
+        if not lock.acquire():
+            return  # retried on the next price event
+        try:
+            if (state_store.updated(state_store.TRAILING_PEAKS) or 0) > ctx["loaded"]:
+                reload()
+                return
+            cycle, dirty = ctx["cycle"], ctx["peaks_dirty"]
+
+            def merge(peaks):
+                for t in dirty:
+                    if t in cycle.peaks:
+                        peaks[t] = cycle.peaks[t]
+                    else:
+                        peaks.pop(t, None)
+                return peaks
+
+            state_store.update(state_store.TRAILING_PEAKS, merge, {})
+            ctx["loaded"] = time.time()
+            dirty.clear()
+        finally:
+            lock.release()
+
+    def on_price(symbol, price, _ts):
+        if time.monotonic() - ctx["refreshed"] >= STREAM_REFRESH_SEC:
+            reload()
+        pos = state.position(symbol)
+        if not pos or price <= 0:
+            return
+        mark_price(pos, price)
+        cycle = ctx["cycle"]
+        prev_peak = cycle.peaks.get(symbol)
+        sig = exit_signal(pos, cycle.peaks, cycle.partial_sell_today)
+        if not sig:
+            if cycle.peaks.get(symbol) != prev_peak:
+                ctx["peaks_dirty"].add(symbol)
+            if ctx["peaks_dirty"]:
+                flush_peaks()
+            return
+        # Exits take the scan lock so they never interleave with a running cycle.
+        # Don't wait for it: the next price event for the symbol retries.
+        lock = ScanLock("stream")
+        if not lock.acquire():
+            if not ctx["lock_missed"]:
+                record_skip(lock)
+                logger.warning("Stream exit %s deferred: scan lock busy", symbol)
+            ctx["lock_missed"] = True
+            return
+        ctx["lock_missed"] = False
+        try:
+            # Stream exits are protective: they get their one attempt with the circuit open
+            with essential_calls():
+                # Re-read broker state, cooldown / half-sold / peaks and the PDT budget
+                # before deciding: a scan may have traded since the last reload
+                reload()
+                pos = state.position(symbol)
+                if not pos:
+                    return
+                mark_price(pos, price)
+                cycle = ctx["cycle"]
+                sig = exit_signal(pos, cycle.peaks, cycle.partial_sell_today)
+                if not sig:
+                    return
+                day_trade = False
+                if sig.needs_pdt and cycle.pdt is not None:
+                    ok, day_trade = cycle.pdt.check(symbol, "sell")
+                    if not ok:
+                        return
+                now = datetime.utcnow().isoformat() + "Z"
+                report = execute_orders([exit_order(sig, pos, cycle.equity, day_trade)],
+                                        state, cycle, now)
+                ctx["loaded"] = time.time()
+        finally:
+            lock.release()
+        if not report.sells:
+            return
+        _sync_sim_trades(report.sells, [], [pos], now, sim_mode)
+        short = sig.label.split("(")[0].strip().replace("profit-take-", "TP-")
+        line = f"Sold: {symbol} ×{sig.qty} ({short}) @ ${price:,.2f}"
+        print(line, flush=True)
+        post_trades(f"🔴 SELL {symbol} ×{sig.qty} — {sig.label} (stream @ ${price:,.2f})")
+
+    feed = PriceFeed(on_price, stream)
+    held = state.held_tickers()
+    watch = {t for group in load_watchlist() for t in group}
+    feed.run(held | watch, held)
+
+
 if __name__ == "__main__":
-    main()
+    args = _args
+    if args.stream:
+        run_stream()
+    elif args.daemon:
+        run_daemon(args.interval, args.session)
+    elif _gate is None or not _gate.verify or _confirm_session(args.session):
+        run_once(wait=args.wait)
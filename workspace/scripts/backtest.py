@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Backtest the scan strategy over a local daily-bar dataset.
+Run from workspace root: python scripts/backtest.py --bars bars.json
+
+bars.json is {ticker: [{"date", "open", "high", "low", "close", "volume"}, ...]}
+(e.g. tools/alpaca_tool.py bars output). Prints a JSON summary.
+"""
+import argparse
+import json
+import logging
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from lib.backtest import BarMatrix, run_backtest
+from lib.strategy import DEFAULT_PARAMS
+
+logging.basicConfig(
+    level=logging.WARNING,
+    format="%(asctime)s [%(levelname)s] %(message)s",
+    datefmt="%Y-%m-%d %H:%M:%S",
+    stream=sys.stderr,
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backtest the RSI scan strategy")
+    parser.add_argument("--bars", required=True, help="Path to {ticker: [bars]} JSON")
+    parser.add_argument("--cash", type=float, default=100_000.0, help="Starting cash")
+    parser.add_argument("--slippage", type=float, default=0.0,
+                        help="Fractional slippage per fill (e.g. 0.001)")
+    parser.add_argument("--sim", action="store_true", help="Use relaxed sim-mode params")
+    parser.add_argument("--trades", action="store_true", help="Include the trade list")
+    args = parser.parse_args()
+
+    t0 = time.monotonic()
+    matrix = BarMatrix.load_json(args.bars)
+    params = DEFAULT_PARAMS.for_sim() if args.sim else DEFAULT_PARAMS
+    result = run_backtest(matrix, params, initial_cash=args.cash, slippage=args.slippage)
+    out = result.summary()
+    out.update({
+        "symbols": len(matrix.tickers),
+        "days": len(matrix.dates),
+        "start": matrix.dates[0] if matrix.dates else None,
+        "end": matrix.dates[-1] if matrix.dates else None,
+        "elapsed_sec": round(time.monotonic() - t0, 3),
+    })
+    if args.trades:
+        out["trade_list"] = result.trades
+    print(json.dumps(out, indent=2))
+
+
+if __name__ == "__main__":
+    main()
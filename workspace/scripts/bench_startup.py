@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Measure scan_autotrader.py cold-start cost and guard its import budget.
+Run from workspace root:
+  python scripts/bench_startup.py [--runs 10] [--gate-budget-ms 40] [--scan-budget-ms 150]
+
+Uses `python -X importtime` in fresh interpreters for two paths:
+  gate  - what an off-hours cron run imports before it exits (lib.session_gate)
+  scan  - importing scan_autotrader itself, before a cycle runs
+Each path has a time budget and a list of modules it must not load (the broker
+SDK, numpy, matplotlib, asyncio, Discord). Also reports median wall-clock
+startup against a bare interpreter. Exits 1 if any check fails.
+"""
+import argparse
+import compileall
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+WORKSPACE = Path(__file__).resolve().parent.parent
+
+# module -> packages it must not pull in at import time
+FORBIDDEN = {
+    "lib.session_gate": ["alpaca", "numpy", "matplotlib", "asyncio", "pydantic",
+                         "lib.alpaca_client", "lib.discord_post", "urllib.request"],
+    "scan_autotrader": ["alpaca", "numpy", "matplotlib", "asyncio", "pydantic",
+                        "lib.indicators", "lib.stream", "lib.discord_post", "lib.chart"],
+}
+
+
+def import_profile(module):
+    """(cumulative import µs for module, {imported module names}) in a fresh interpreter."""
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                          cwd=WORKSPACE, capture_output=True, text=True, env=_env())
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{proc.stderr[-2000:]}")
+    total, names = None, set()
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if not cumulative.strip().isdigit():
+            continue
+        names.add(name.strip())
+        if name.strip() == module and not name[1:].startswith(" "):
+            total = int(cumulative)
+    return total, names
+
+
+def wall_ms(code, runs):
+    """Median wall-clock ms to start an interpreter and run code."""
+    times = []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        subprocess.run([sys.executable, "-c", code], cwd=WORKSPACE, env=_env(), check=True,
+                       stdout=subprocess.DEVNULL)
+        times.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(times)
+
+
+def _env():
+    return {**os.environ, "PYTHONPATH": str(WORKSPACE)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scan cold-start / import-time benchmark")
+    parser.add_argument("--runs", type=int, default=10, help="Wall-clock samples per path")
+    parser.add_argument("--gate-budget-ms", type=float, default=40.0,
+                        help="Max import time for the off-hours gate path")
+    parser.add_argument("--scan-budget-ms", type=float, default=150.0,
+                        help="Max import time for scan_autotrader")
+    args = parser.parse_args()
+
+    # Cron runs use cached bytecode; don't measure compilation
+    compileall.compile_dir(WORKSPACE / "lib", quiet=1)
+    compileall.compile_file(WORKSPACE / "scan_autotrader.py", quiet=1)
+
+    budgets = {"lib.session_gate": args.gate_budget_ms, "scan_autotrader": args.scan_budget_ms}
+    failed = False
+    for module, budget in budgets.items():
+        samples = [import_profile(module) for _ in range(3)]
+        ms = statistics.median(s[0] for s in samples) / 1000
+        names = samples[0][1]
+        leaked = sorted(n for n in names for bad in FORBIDDEN[module]
+                        if n == bad or n.startswith(bad + "."))
+        ok = ms <= budget and not leaked
+        failed |= not ok
+        print(f"{'ok  ' if ok else 'FAIL'} import {module}: {ms:.1f} ms (budget {budget:.0f} ms), "
+              f"{len(names)} modules")
+        if leaked:
+            print(f"     loads {', '.join(leaked[:10])}" + (" ..." if len(leaked) > 10 else ""))
+
+    bare = wall_ms("pass", args.runs)
+    gate = wall_ms("import lib.session_gate", args.runs)
+    scan = wall_ms("import scan_autotrader", args.runs)
+    print(f"wall (median of {args.runs}): interpreter {bare:.0f} ms, "
+          f"gate +{gate - bare:.0f} ms, scan import +{scan - bare:.0f} ms")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
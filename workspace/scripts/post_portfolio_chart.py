@@ -28,7 +28,8 @@ for env_path in [
         break
 
 from lib.alpaca_client import get_portfolio_history
-from lib.chart import equity_chart_png
+from lib import state_store
+from lib.chart import equity_chart_png, history_digest
 from lib.discord_post import update_chart
 
 logging.basicConfig(
@@ -57,6 +58,9 @@ def main():
     caption = f"📈 Portfolio equity — last {period}"
     if update_chart(png, content=caption):
         logger.info("Posted portfolio chart to Discord")
+        if (period, timeframe) == ("1M", "1D"):
+            # Same chart the scan posts; let it skip until the history changes
+            state_store.put(state_store.CHART_DIGEST, history_digest(hist))
         return 0
     logger.error("Failed to post chart to Discord")
     return 1
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Grid-search strategy parameters with the backtester across all cores.
+Run from workspace root:
+  python scripts/sweep.py --bars bars.json \
+      --grid alloc_strong=0.10,0.15,0.20 --grid sma_period=10,20,50 --out sweep.csv
+
+--grid takes any StrategyParams field (lowercase constant name from lib/strategy.py).
+Writes a CSV ranked by Sharpe and prints the top rows.
+"""
+import argparse
+import logging
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from lib.backtest import BarMatrix
+from lib.strategy import DEFAULT_PARAMS
+from lib.sweep import expand_grid, parse_value, run_sweep, write_results
+
+logging.basicConfig(
+    level=logging.WARNING,
+    format="%(asctime)s [%(levelname)s] %(message)s",
+    datefmt="%Y-%m-%d %H:%M:%S",
+    stream=sys.stderr,
+)
+
+
+def _parse_grid(items):
+    spec = {}
+    for item in items:
+        name, _, values = item.partition("=")
+        name = name.strip()
+        spec[name] = [parse_value(name, v) for v in values.split(",") if v.strip()]
+    return spec
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parallel strategy parameter sweep")
+    parser.add_argument("--bars", required=True, help="Path to {ticker: [bars]} JSON")
+    parser.add_argument("--grid", action="append", required=True, metavar="PARAM=V1,V2,...",
+                        help="Parameter values to sweep (repeatable)")
+    parser.add_argument("--out", default="sweep_results.csv", help="Ranked CSV output path")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: all cores)")
+    parser.add_argument("--cash", type=float, default=100_000.0, help="Starting cash")
+    parser.add_argument("--slippage", type=float, default=0.0, help="Fractional slippage per fill")
+    parser.add_argument("--sim", action="store_true", help="Sweep around sim-mode params")
+    parser.add_argument("--top", type=int, default=10, help="Rows to print")
+    args = parser.parse_args()
+
+    try:
+        spec = _parse_grid(args.grid)
+        combos = expand_grid(spec)
+    except ValueError as e:
+        parser.error(str(e))
+    base = DEFAULT_PARAMS.for_sim() if args.sim else DEFAULT_PARAMS
+    matrix = BarMatrix.load_json(args.bars)
+    print(f"Sweeping {len(combos)} combinations over {len(matrix.tickers)} symbols x "
+          f"{len(matrix.dates)} days", file=sys.stderr)
+
+    t0 = time.monotonic()
+    rows = run_sweep(matrix, combos, workers=args.workers, base=base,
+                     initial_cash=args.cash, slippage=args.slippage)
+    write_results(rows, args.out, list(spec))
+    print(f"Done in {time.monotonic() - t0:.1f}s -> {args.out}", file=sys.stderr)
+
+    for rank, row in enumerate(rows[:args.top], 1):
+        params = " ".join(f"{n}={row[n]}" for n in spec)
+        print(f"{rank:>3}. sharpe={row['sharpe']:.2f} return={row['total_return']:+.2%} "
+              f"maxdd={row['max_drawdown']:.2%} trades={row['trades']}  {params}")
+
+
+if __name__ == "__main__":
+    main()